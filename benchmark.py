@@ -17,15 +17,48 @@
 # limitations under the License.
 
 import os
+import re
+import sys
+import json
+import time
+import math
+import statistics
 import yaml
 import glob
-import queue
-import threading
 import subprocess
 import pathlib
+import tempfile
+import concurrent.futures
 
 import click
 
+# The final metrics recorded for every design
+FINAL_METRICS = [
+    "design__die__area",
+    "design__core__area",
+    "design__instance__count",
+    "design__instance__utilization",
+    "dffram__logic__density",
+    "dffram__suggested__core_width",
+    "dffram__suggested__core_height",
+    "route__wirelength",
+    "timing__setup__ws",
+    "timing__hold__ws",
+]
+
+# What compare gates on: whether a higher value is worse, and which threshold
+# applies. Steps are gated like the wall time.
+GATED_MEASUREMENTS = {
+    "wall_time": (True, "runtime"),
+    "cpu_time": (True, "runtime"),
+    "peak_rss": (True, "runtime"),
+    "design__core__area": (True, "qor"),
+    "dffram__suggested__core_width": (True, "qor"),
+    "dffram__suggested__core_height": (True, "qor"),
+    "dffram__logic__density": (False, "qor"),
+    "timing__setup__ws": (False, "slack"),
+}
+
 
 class Design(object):
     def __init__(self, count, width, variant):
@@ -36,7 +69,7 @@ class Design(object):
     @staticmethod
     def from_yaml_object(yaml_object):
         return Design(
-            yaml_object["count"], yaml_object["width"], yaml_object["variant"]
+            int(yaml_object["count"]), int(yaml_object["width"]), yaml_object["variant"]
         )
 
     @staticmethod
@@ -46,8 +79,8 @@ class Design(object):
         gha = yaml.safe_load(gha_string)
 
         jobs = gha["jobs"]
-        test_flow = jobs["test_flow"]
-        designs = test_flow["strategy"]["matrix"]["include"]
+        harden = jobs["harden"]
+        designs = harden["strategy"]["matrix"]["include"]
 
         return [Design.from_yaml_object(design) for design in designs]
 
@@ -59,12 +92,75 @@ class Design(object):
     def tag(self):
         return f"{self.size}_{self.variant}"
 
-    def get_density(self, build_folder):
-        density_file = glob.glob(os.path.join(build_folder, self.tag, "*.density.txt"))[
-            0
-        ]
-        density = float(open(density_file).read())
-        return density
+    @property
+    def building_blocks(self):
+        # As in CI: the register file has a variant of its own
+        return "rf" if self.variant == "2R1W" else "ram"
+
+
+def run_design(design, run_tag, log_folder):
+    """
+    Hardens ``design`` with ``dffram.py`` and returns its resource usage and
+    final metrics.
+    """
+    # Imported here: the other commands do not need librelane
+    from librelane_plugin_dffram.results import step_resources
+
+    tag = f"{run_tag}_{design.tag}"
+    log_path = os.path.join(log_folder, f"{design.tag}.log")
+    result = {
+        "size": design.size,
+        "words": design.count,
+        "width": design.width,
+        "bits": design.count * design.width,
+        "variant": design.variant,
+        "building_blocks": design.building_blocks,
+        "run_tag": tag,
+        "log": log_path,
+    }
+
+    start = time.time()
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "./dffram.py",
+                design.size,
+                "-v",
+                design.variant,
+                "-b",
+                design.building_blocks,
+                "--run-tag",
+                tag,
+                "--hide-progress-bar",
+            ],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        # Unlike Popen.wait, wait4 also returns the resources used by the
+        # flow and every tool it ran
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    result["wall_time"] = time.time() - start
+    result["cpu_time"] = usage.ru_utime + usage.ru_stime
+    # The largest of the flow and the tools, in KiB on Linux
+    result["peak_rss"] = usage.ru_maxrss * 1024
+    if process.returncode != 0:
+        result["error"] = f"dffram.py exited with code {process.returncode}"
+
+    run_dirs = glob.glob(os.path.join("build", "*", "*", "runs", tag))
+    if len(run_dirs) == 0:
+        result.setdefault("error", "No run directory was created")
+        return result
+    run_dir = run_dirs[0]
+    result["run_dir"] = run_dir
+    result["steps"] = step_resources(run_dir)
+
+    metrics_file = os.path.join(run_dir, "final", "metrics.json")
+    if os.path.isfile(metrics_file):
+        metrics = json.load(open(metrics_file))
+        result["metrics"] = {name: metrics.get(name) for name in FINAL_METRICS}
+    return result
 
 
 @click.group()
@@ -76,77 +172,512 @@ def start():
 @click.option(
     "-w",
     "--worker-count",
-    required=not os.getenv("WORKERS"),
-    default=os.getenv("WORKERS"),
+    default=os.getenv("WORKERS") or 1,
+    type=int,
+    help="How many designs to harden at once.",
+)
+@click.option(
+    "-s",
+    "--size",
+    "sizes",
+    multiple=True,
+    help="Only benchmark designs of this size (ex. 32x32). May be repeated.",
+)
+@click.option(
+    "-o",
+    "--output",
+    default=None,
+    help="JSON file to write the results to. Defaults to ./benchmark_build/designs/<run tag>.json.",
 )
-def run_designs(worker_count):
-    worker_count = int(worker_count)
+def run_designs(worker_count, sizes, output):
+    """
+    Hardens every design of the CI matrix with ``dffram.py``, as many at once
+    as there are workers, and writes the wall time, CPU time and peak RSS of
+    every design and of each of its steps, along with its area, density,
+    wirelength and worst slacks, as JSON.
+    """
+    designs = [
+        design for design in Design.get_all() if not len(sizes) or design.size in sizes
+    ]
+    run_tag = time.strftime("benchmark-%Y-%m-%d_%H-%M-%S")
+    output = output or os.path.join(
+        ".", "benchmark_build", "designs", f"{run_tag}.json"
+    )
+    log_folder = os.path.join(".", "benchmark_build", run_tag)
+    pathlib.Path(log_folder).mkdir(parents=True, exist_ok=True)
+
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], encoding="utf8", stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        commit = None
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=worker_count) as pool:
+        futures = {}
+        for design in designs:
+            print(f"Started {design.tag}...")
+            futures[pool.submit(run_design, design, run_tag, log_folder)] = design
+        for future in concurrent.futures.as_completed(futures):
+            design = futures[future]
+            result = future.result()
+            results.append(result)
+            if "error" in result:
+                print(f"Failed {design.tag}: {result['error']}, see {result['log']}.")
+                continue
+            density = (result.get("metrics") or {}).get("dffram__logic__density")
+            print(
+                f"Finished {design.tag}: {result['wall_time']:.1f}s, CPU {result['cpu_time']:.1f}s, peak RSS {result['peak_rss'] / 1024 / 1024:.1f}MiB, density {density}."
+            )
+
+    results.sort(key=lambda result: (result["bits"], result["variant"]))
+    pathlib.Path(os.path.dirname(os.path.abspath(output))).mkdir(
+        parents=True, exist_ok=True
+    )
+    with open(output, "w") as f:
+        json.dump(
+            {"commit": commit, "run_tag": run_tag, "designs": results}, f, indent=2
+        )
+    print(f"Wrote {len(results)} results to {output}.")
 
-    designs = Design.get_all()
+    if any("error" in result for result in results):
+        exit(os.EX_SOFTWARE)
 
-    q = queue.Queue()
-    for design in designs:
-        q.put(design)
 
-    def run_design():
-        while not q.empty():
-            design = q.get(timeout=3)
+start.add_command(run_designs)
 
-            build_folder = os.path.join("./benchmark_build", design.tag)
-            print(f"Started {design.tag}...")
 
-            pathlib.Path(build_folder).mkdir(parents=True, exist_ok=True)
-            stdout = open(os.path.join(build_folder, "stdout.log"), "w")
-            stderr = open(os.path.join(build_folder, "stderr.log"), "w")
-            try:
-                subprocess.check_call(
+@click.command("compile_results")
+@click.argument("results_file", required=True, nargs=1)
+@click.option(
+    "-o",
+    "--output",
+    default="./benchmark_build/results.csv",
+    help="CSV file to write the table to.",
+)
+def compile_results(results_file, output):
+    """
+    Tabulates the results written by run_designs as CSV, one row per design,
+    by number of bits.
+    """
+    results = json.load(open(results_file))
+    with open(output, "w") as f:
+        print(
+            ",".join(
+                ["tag", "words", "width", "bits", "wall_time", "cpu_time", "peak_rss"]
+                + FINAL_METRICS
+            ),
+            file=f,
+        )
+        for result in results["designs"]:
+            if "error" in result:
+                continue
+            metrics = result.get("metrics") or {}
+            row = [
+                f"{result['size']}_{result['variant']}",
+                result["words"],
+                result["width"],
+                result["bits"],
+                result["wall_time"],
+                result["cpu_time"],
+                result["peak_rss"],
+            ] + [metrics.get(name) for name in FINAL_METRICS]
+            print(
+                ",".join("" if value is None else str(value) for value in row), file=f
+            )
+    print(f"Wrote {output}.")
+
+
+start.add_command(compile_results)
+
+
+def measurements(result):
+    """
+    The resource usage and final metrics of one result of run_designs, with
+    the wall time of every step as ``step:<step>``, without its ordinal.
+    """
+    values = {
+        name: result[name]
+        for name in ["wall_time", "cpu_time", "peak_rss"]
+        if result.get(name) is not None
+    }
+    for step in result.get("steps") or []:
+        name = step["step"].split("-", 1)[-1]
+        values[f"step:{name}"] = step["wall_time"]
+    for name, value in (result.get("metrics") or {}).items():
+        if value is not None:
+            values[name] = value
+    return values
+
+
+def load_samples(results_files):
+    """
+    Every measurement of every design that succeeded in ``results_files``,
+    by design tag and measurement, one sample per file.
+    """
+    samples = {}
+    for results_file in results_files:
+        for result in json.load(open(results_file))["designs"]:
+            if "error" in result:
+                continue
+            design = samples.setdefault(f"{result['size']}_{result['variant']}", {})
+            for name, value in measurements(result).items():
+                design.setdefault(name, []).append(value)
+    return samples
+
+
+def is_significant(baseline, current, t_threshold):
+    """
+    Whether the means of two sets of samples differ by at least
+    ``t_threshold`` by Welch's t-test. Without two samples on either side
+    there is no variance to go by, and any difference is significant.
+    """
+    if len(baseline) < 2 or len(current) < 2:
+        return True
+    error = math.sqrt(
+        statistics.variance(baseline) / len(baseline)
+        + statistics.variance(current) / len(current)
+    )
+    difference = abs(statistics.mean(current) - statistics.mean(baseline))
+    if error == 0:
+        return difference != 0
+    return difference / error >= t_threshold
+
+
+@click.command("compare")
+@click.option(
+    "-b",
+    "--baseline",
+    "baseline_files",
+    multiple=True,
+    required=True,
+    help="A results file of run_designs to compare against. May be repeated for repeated runs.",
+)
+@click.option(
+    "--runtime-threshold",
+    default=10.0,
+    show_default=True,
+    help="How much longer, in percent, the wall time, CPU time, peak RSS or a step may take.",
+)
+@click.option(
+    "--qor-threshold",
+    default=1.0,
+    show_default=True,
+    help="How much worse, in percent, the core area and size or the density may be.",
+)
+@click.option(
+    "--slack-threshold",
+    default=0.1,
+    show_default=True,
+    help="How much lower, in ns, the worst setup slack may be.",
+)
+@click.option(
+    "--min-time",
+    default=1.0,
+    show_default=True,
+    help="Steps taking less than this many seconds in the baseline are not gated on.",
+)
+@click.option(
+    "-t",
+    "--t-threshold",
+    default=3.0,
+    show_default=True,
+    help="The Welch's t statistic a change must reach to count when both sides have repeated runs.",
+)
+@click.argument("results_files", required=True, nargs=-1)
+def compare(
+    baseline_files,
+    runtime_threshold,
+    qor_threshold,
+    slack_threshold,
+    min_time,
+    t_threshold,
+    results_files,
+):
+    """
+    Compares the results of run_designs in RESULTS_FILES against a stored
+    baseline, design by design, and exits with a non-zero status if any
+    runtime or quality of results measurement regressed beyond its
+    threshold, or a design of the baseline did not finish.
+
+    Passing the results of several runs on either side averages them and
+    only counts changes that are significant given their spread.
+    """
+    baseline = load_samples(baseline_files)
+    current = load_samples(results_files)
+
+    rows = []
+    for design in sorted(baseline):
+        if design not in current:
+            rows.append((design, "*", "", "", "", "REGRESSION (missing)"))
+            continue
+        for name, baseline_values in sorted(baseline[design].items()):
+            current_values = current[design].get(name)
+            if current_values is None:
+                continue
+            key = "wall_time" if name.startswith("step:") else name
+            if key not in GATED_MEASUREMENTS:
+                continue
+            higher_is_worse, kind = GATED_MEASUREMENTS[key]
+            before = statistics.mean(baseline_values)
+            after = statistics.mean(current_values)
+            if name.startswith("step:") and before < min_time:
+                continue
+
+            worsening = after - before if higher_is_worse else before - after
+            if kind == "slack":
+                change = f"{after - before:+.3f}"
+                threshold = slack_threshold
+            else:
+                if before == 0:
+                    continue
+                change = f"{(after - before) / abs(before) * 100:+.1f}%"
+                worsening = worsening / abs(before) * 100
+                threshold = runtime_threshold if kind == "runtime" else qor_threshold
+
+            if abs(worsening) <= threshold or not is_significant(
+                baseline_values, current_values, t_threshold
+            ):
+                continue
+            verdict = "REGRESSION" if worsening > 0 else "improvement"
+            rows.append(
+                (design, name, f"{before:.4g}", f"{after:.4g}", change, verdict)
+            )
+
+    regressions = [row for row in rows if row[-1].startswith("REGRESSION")]
+    if len(rows):
+        header = ("design", "measurement", "baseline", "current", "change", "")
+        widths = [max(len(row[i]) for row in rows + [header]) for i in range(6)]
+        for row in [header] + rows:
+            print(
+                "  ".join(
+                    cell.ljust(width) for cell, width in zip(row, widths)
+                ).rstrip()
+            )
+    print(
+        f"{len(regressions)} regression(s), {len(rows) - len(regressions)} improvement(s) over {len(baseline)} design(s)."
+    )
+
+    if len(regressions):
+        exit(os.EX_SOFTWARE)
+
+
+start.add_command(compare)
+
+
+def def_components(def_file):
+    with open(def_file) as f:
+        content = f.read()
+    match = re.search(r"^COMPONENTS.+?^END COMPONENTS", content, re.M | re.S)
+    return match[0] if match is not None else None
+
+
+@click.command("compare_apply")
+@click.option("-s", "--size", required=True, help="RAM Size (ex. 8x32, 16x32…)")
+@click.option(
+    "-b",
+    "--building-blocks",
+    default="sky130A:sky130_fd_sc_hd:ram",
+    help="Format <pdk>:<scl>:<name> : Name of the building blocks to use.",
+)
+@click.option("-r", "--repeat", default=3, help="Runs per backend.")
+@click.option("--openroad", default="openroad", help="OpenROAD executable.")
+@click.argument("odb_in", required=True, nargs=1)
+def compare_apply(size, building_blocks, repeat, openroad, odb_in):
+    """
+    Places ODB_IN (a floorplanned, unplaced ODB as passed to DFFRAM.PlaceRAM)
+    with each placement apply backend and compares their run times and
+    results.
+    """
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.path.abspath(
+        os.path.join("librelane_plugin_dffram", "scripts", "odbpy")
+    )
+    applied_rx = re.compile(r"Applied placement of (\d+) cells .+ in ([\d\.]+)s")
+
+    with tempfile.TemporaryDirectory() as build_folder:
+        components = {}
+        for backend in ["instance", "def"]:
+            apply_times = []
+            total_times = []
+            for i in range(repeat):
+                output_def = os.path.join(build_folder, f"{backend}.def")
+                start = time.time()
+                result = subprocess.run(
                     [
-                        "python3",
-                        "./dffram.py",
-                        "--variant",
-                        design.variant,
+                        openroad,
+                        "-exit",
+                        "-no_splash",
+                        "-python",
+                        "-m",
+                        "placeram",
+                        "--building-blocks",
+                        building_blocks,
                         "--size",
-                        f"{design.count}x{design.width}",
-                        "--output-dir",
-                        "./benchmark_build",
+                        size,
+                        "--apply-backend",
+                        backend,
+                        "--output-odb",
+                        os.path.join(build_folder, f"{backend}.odb"),
+                        "--output-def",
+                        output_def,
+                        odb_in,
                     ],
-                    stdout=stdout,
-                    stderr=stderr,
+                    env=env,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    encoding="utf8",
                 )
-
-                print(
-                    f"Finished {design.tag}: Density {design.get_density('./benchmark_build')}."
+                total_times.append(time.time() - start)
+                applied = applied_rx.search(result.stdout)
+                if result.returncode != 0 or applied is None:
+                    print(result.stdout, file=sys.stderr)
+                    print(f"Placement with the {backend} backend failed.")
+                    exit(os.EX_SOFTWARE)
+                apply_times.append(float(applied[2]))
+            components[backend] = def_components(output_def)
+            print(
+                f"{backend}: {applied[1]} cells, apply {min(apply_times):.3f}s (best of {repeat}), total {min(total_times):.3f}s"
+            )
+
+    if components["instance"] != components["def"]:
+        print("Mismatch: the backends produced different placements.")
+        exit(os.EX_SOFTWARE)
+    print("Both backends produced identical placements.")
+
+
+start.add_command(compare_apply)
+
+
+def model_designs(models):
+    """
+    Every (building blocks, size, variant) in ``models/*/config.yml``, or in
+    the configs of ``models`` only if it is not empty.
+    """
+    designs = []
+    for config_file in sorted(
+        glob.glob(os.path.join(".", "models", "*", "config.yml"))
+    ):
+        model = os.path.basename(os.path.dirname(config_file))
+        if len(models) and model not in models:
+            continue
+        config = yaml.safe_load(open(config_file))
+        for variant in config.get("variants") or [None]:
+            for count in config["counts"]:
+                for width in config["widths"]:
+                    designs.append(
+                        (
+                            f"sky130A:sky130_fd_sc_hd:{model}",
+                            f"{count}x{width}",
+                            variant,
+                        )
+                    )
+    return designs
+
+
+@click.command("placer")
+@click.option(
+    "-m",
+    "--model",
+    "models",
+    multiple=True,
+    help="Only benchmark the designs of this model (ex. ram). May be repeated.",
+)
+@click.option(
+    "-s",
+    "--size",
+    "sizes",
+    multiple=True,
+    help="Only benchmark designs of this size (ex. 32x32). May be repeated.",
+)
+@click.option(
+    "--trace-memory/--no-trace-memory",
+    default=False,
+    help="Record the peak memory of every phase with tracemalloc. Phases run considerably slower.",
+)
+@click.option(
+    "-o",
+    "--output",
+    default="./benchmark_build/placer.json",
+    help="JSON file to write the results to.",
+)
+def placer(models, sizes, trace_memory, output):
+    """
+    Times placeram on a synthetic netlist and a mock database for every size
+    and variant of the models, without OpenROAD or a PDK, and writes the
+    wall time, peak memory and per-phase times of each as JSON.
+
+    Every design is placed in a process of its own so that their peak memory
+    usages are independent.
+    """
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.path.abspath(
+        os.path.join("librelane_plugin_dffram", "scripts", "odbpy")
+    )
+
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], encoding="utf8", stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        commit = None
+
+    results = []
+    with tempfile.TemporaryDirectory() as build_folder:
+        for building_blocks, size, variant in model_designs(models):
+            if len(sizes) and size not in sizes:
+                continue
+            tag = f"{building_blocks.split(':')[-1]}_{size}_{variant or 'DEFAULT'}"
+            output_json = os.path.join(build_folder, f"{tag}.json")
+            result = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "placeram.bench",
+                    "--building-blocks",
+                    building_blocks,
+                    "--size",
+                    size,
+                    "--trace-memory" if trace_memory else "--no-trace-memory",
+                    "--output",
+                    output_json,
+                ]
+                + (["--variant", variant] if variant is not None else []),
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                encoding="utf8",
+            )
+            if result.returncode != 0:
+                print(f"Failed {tag}.")
+                results.append(
+                    {
+                        "building_blocks": building_blocks,
+                        "size": size,
+                        "variant": variant,
+                        "error": result.stdout,
+                    }
                 )
-            except Exception:
-                print(f"Failed {design.tag}.")
-
-            stdout.close()
-            stderr.close()
-
-    worker_threads = []
-    for i in range(worker_count):
-        worker_threads.append(threading.Thread(target=run_design))
-        worker_threads[i].start()
+                continue
+            with open(output_json) as f:
+                results.append(json.load(f))
+            print(
+                f"Finished {tag}: {results[-1]['time']:.3f}s, peak RSS {results[-1]['peak_rss'] / 1024 / 1024:.1f}MiB."
+            )
 
-    for i in range(worker_count):
-        while worker_threads[i].is_alive():
-            worker_threads[i].join(100)
-        print(f"Exiting thread {i}...")
+    pathlib.Path(os.path.dirname(os.path.abspath(output))).mkdir(
+        parents=True, exist_ok=True
+    )
+    with open(output, "w") as f:
+        json.dump({"commit": commit, "designs": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {output}.")
 
-
-start.add_command(run_designs)
-
-
-@click.command("compile_densities")
-def compile_densities():
-    designs = Design.get_all()
-    with open("./benchmark_build/densities.csv", "w") as f:
-        print("tag,density", file=f)
-        for design in designs:
-            print(f"{design.tag},{design.get_density('./benchmark_build')}", file=f)
+    if any("error" in result for result in results):
+        exit(os.EX_SOFTWARE)
 
 
-start.add_command(compile_densities)
+start.add_command(placer)
 
 if __name__ == "__main__":
     start()
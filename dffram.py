@@ -5,20 +5,57 @@
 # Copyright ©2023 Efabless Corporation
 import os
 import re
+import sys
+import time
+import sqlite3
 from fnmatch import fnmatch
 from decimal import Decimal
 
 import yaml
 import cloup
 from librelane.common import mkdirp
-from librelane.logging import err
+from librelane.logging import err, warn
 from librelane.flows import cloup_flow_opts, Flow
 
+from librelane_plugin_dffram.banks import (
+    DEFAULT_BANK_WORDS,
+    BankedRAM,
+    bank_count,
+    die_size,
+    macro_config,
+)
+from librelane_plugin_dffram.batch import Job, run_batch
+from librelane_plugin_dffram.results import DEFAULT_DATABASE, git_commit, record
+from librelane_plugin_dffram.steps import calculate_halo, estimate_core_size
+from placeram.synthetic import SyntheticNetlist, read_lef_sites
+
+
+def expand(patterns, choices):
+    """
+    Replaces the wildcard patterns among ``patterns`` with the ``choices``
+    they match, keeping the order and dropping duplicates.
+    """
+    result = []
+    for pattern in patterns:
+        if any(c in pattern for c in "*?["):
+            matched = [choice for choice in choices if fnmatch(choice, pattern)]
+            if len(matched) == 0:
+                err(f"'{pattern}' does not match any of {', '.join(choices)}.")
+                exit(os.EX_USAGE)
+        else:
+            matched = [pattern]
+        result += [choice for choice in matched if choice not in result]
+    return result
+
 
 @cloup.command()
 @cloup.option("-b", "--building-blocks", default="ram")
 @cloup.option(
-    "-v", "--variant", default=None, help="Use design variants (such as 1RW1R)"
+    "-v",
+    "--variant",
+    "variants",
+    multiple=True,
+    help="Use design variants (such as 1RW1R). May be repeated, or a wildcard such as '*'; DEFAULT is the default variant",
 )
 @cloup.option(
     "-C",
@@ -48,8 +85,68 @@ from librelane.flows import cloup_flow_opts, Flow
     help="Minimum height in µm",
 )
 @cloup.option("--latch/--dff", default=True, help="Whether to use latches or dffs")
+@cloup.option(
+    "--storage",
+    "storages",
+    multiple=True,
+    type=cloup.Choice(["latch", "dff"]),
+    help="Harden with latches, dffs or, if repeated, both. Overrides --latch/--dff",
+)
+@cloup.option(
+    "--max-memory",
+    default=None,
+    type=float,
+    help="The memory, in GiB, a batch of several designs may use at once [default: the available memory]",
+)
+@cloup.option(
+    "--estimate",
+    is_flag=True,
+    default=False,
+    help="Only print the predicted core and die area, without running the flow",
+)
+@cloup.option(
+    "--step-cache",
+    default=None,
+    help="A directory to cache step results in: steps whose inputs have not changed are restored from it instead of being rerun",
+)
+@cloup.option(
+    "--plan-cache",
+    default=os.path.join("build", "plan_cache"),
+    show_default=True,
+    help="A directory to cache placement plans in, so designs placed before are not placed again",
+)
+@cloup.option(
+    "--no-plan-cache",
+    is_flag=True,
+    default=False,
+    help="Always place, without reading or writing the placement plan cache",
+)
+@cloup.option(
+    "--profile-placer",
+    is_flag=True,
+    default=False,
+    help="Report where PlaceRAM's time goes as dffram__placer__* metrics, and write a trace of it to its step directory",
+)
+@cloup.option(
+    "--results-db",
+    default=DEFAULT_DATABASE,
+    show_default=True,
+    help="A SQLite database to add the timings and metrics of every run to",
+)
+@cloup.option(
+    "--no-results-db",
+    is_flag=True,
+    default=False,
+    help="Do not record runs in the results database",
+)
+@cloup.option(
+    "--bank-words",
+    default=None,
+    type=int,
+    help=f"Harden RAMs with more words than this hierarchically, from banks of this many words hardened once. RAMs with more words than the building blocks support are banked by {DEFAULT_BANK_WORDS} words unless given",
+)
 @cloup_flow_opts(accept_config_files=False)
-@cloup.argument("size", default="32x32", nargs=1)
+@cloup.argument("sizes", nargs=-1)
 def main(
     pdk,
     scl,
@@ -59,9 +156,9 @@ def main(
     tag,
     last_run,
     with_initial_state,
-    size,
+    sizes,
     building_blocks,
-    variant,
+    variants,
     horizontal_halo,
     vertical_halo,
     default_clock_period,
@@ -69,11 +166,18 @@ def main(
     flow_name,
     pdk_root,
     latch,
+    storages,
+    max_memory,
+    estimate,
+    step_cache,
+    plan_cache,
+    no_plan_cache,
+    profile_placer,
+    results_db,
+    no_results_db,
+    bank_words,
     **kwargs,
 ):
-    if variant == "DEFAULT":
-        variant = None
-
     scl = scl or "sky130_fd_sc_hd"
     platform = f"{pdk}:{scl}"
 
@@ -93,117 +197,434 @@ def main(
     platform_config = yaml.safe_load(open(platform_config_file))
 
     pin_order_file = os.path.join(bb_dir, "pin_order.cfg")
-    m = re.match(r"(\d+)x(\d+)", size)
-    if m is None:
-        err(f"Invalid RAM size '{size}'.")
-        exit(os.EX_USAGE)
-
-    words = int(m[1])
-    word_width = int(m[2])
-    word_width_bytes = word_width // 8
-
-    if os.getenv("FORCE_ACCEPT_SIZE") != 1:
-        if (
-            words not in platform_config["counts"]
-            or word_width not in platform_config["widths"]
-        ):
-            err("Size %s not supported by %s." % (size, building_blocks))
-            exit(os.EX_USAGE)
 
-        if variant not in platform_config["variants"]:
-            err("Variant %s is unsupported by %s." % (variant, building_blocks))
+    supported_sizes = [
+        f"{count}x{width}"
+        for count in platform_config["counts"]
+        for width in platform_config["widths"]
+    ]
+    supported_variants = [
+        variant or "DEFAULT" for variant in platform_config["variants"]
+    ]
+    jobs = []
+    for size in expand(sizes or ["32x32"], supported_sizes):
+        m = re.match(r"(\d+)x(\d+)", size)
+        if m is None:
+            err(f"Invalid RAM size '{size}'.")
             exit(os.EX_USAGE)
 
-    variant_string = ("_%s" % variant) if variant is not None else ""
-    design_name_template = platform_config["design_name_template"]
-    design = os.getenv("FORCE_DESIGN_NAME") or design_name_template.format(
-        **{
-            "count": words,
-            "width": word_width,
-            "width_bytes": word_width_bytes,
-            "variant": variant_string,
-        }
-    )
+        words = int(m[1])
+        word_width = int(m[2])
 
-    build_dir = os.path.join(
-        "build", f"{pdk}-{scl}-{'latch' if latch else 'dff'}", design
-    )
-    mkdirp(build_dir)
+        size_bank_words = None
+        if words > max(platform_config["counts"]) or (
+            bank_words is not None and words > bank_words
+        ):
+            size_bank_words = bank_words or DEFAULT_BANK_WORDS
+            if (
+                platform_config.get("register_file")
+                or size_bank_words not in platform_config["counts"]
+                or bank_count(words, size_bank_words) is None
+            ):
+                err(
+                    f"Size {size} cannot be composed of {size_bank_words}-word banks of {building_blocks}."
+                )
+                exit(os.EX_USAGE)
+
+        for variant in expand(variants or ["DEFAULT"], supported_variants):
+            if variant == "DEFAULT":
+                variant = None
+
+            if os.getenv("FORCE_ACCEPT_SIZE") != 1:
+                if (
+                    size_bank_words is None and words not in platform_config["counts"]
+                ) or word_width not in platform_config["widths"]:
+                    err("Size %s not supported by %s." % (size, building_blocks))
+                    exit(os.EX_USAGE)
+
+                if variant not in platform_config["variants"]:
+                    err("Variant %s is unsupported by %s." % (variant, building_blocks))
+                    exit(os.EX_USAGE)
+
+            for storage in storages or ["latch" if latch else "dff"]:
+                jobs.append(
+                    Job(
+                        building_blocks,
+                        words,
+                        word_width,
+                        variant,
+                        storage == "latch",
+                        size_bank_words,
+                    )
+                )
+
+    if len(jobs) > 1 and not estimate:
+
+        def command(job, threads):
+            cmd = [
+                sys.executable,
+                os.path.abspath(__file__),
+                job.size,
+                "--building-blocks",
+                job.building_blocks,
+                "--variant",
+                job.variant or "DEFAULT",
+                "--latch" if job.latch else "--dff",
+                "--clock-period",
+                str(default_clock_period),
+                "--horizontal-halo",
+                str(horizontal_halo),
+                "--vertical-halo",
+                str(vertical_halo),
+                "--min-height",
+                str(min_height),
+                # The PDK is resolved once, here
+                "--pdk",
+                pdk,
+                "--scl",
+                scl,
+                "--manual-pdk",
+                "--pdk-root",
+                pdk_root,
+                "--jobs",
+                str(threads),
+                "--hide-progress-bar",
+            ]
+            for flag, value in [
+                ("--flow", flow_name),
+                ("--from", frm),
+                ("--to", to),
+                ("--run-tag", tag),
+                ("--with-initial-state", with_initial_state),
+                ("--step-cache", step_cache and os.path.abspath(step_cache)),
+                ("--plan-cache", os.path.abspath(plan_cache)),
+            ]:
+                if value is not None:
+                    cmd += [flag, str(value)]
+            for step in skip or []:
+                cmd += ["--skip", step]
+            if last_run:
+                cmd.append("--last-run")
+            if no_plan_cache:
+                cmd.append("--no-plan-cache")
+            if profile_placer:
+                cmd.append("--profile-placer")
+            if no_results_db:
+                cmd.append("--no-results-db")
+            else:
+                cmd += ["--results-db", os.path.abspath(results_db)]
+            if job.bank_words is not None:
+                cmd += ["--bank-words", str(job.bank_words)]
+            return cmd
+
+        succeeded = run_batch(
+            jobs,
+            command,
+            os.path.join("build", "batch"),
+            memory=max_memory and int(max_memory * (1 << 30)),
+        )
+        exit(0 if succeeded else os.EX_SOFTWARE)
 
     tech_info_path = os.path.join(".", "platforms", pdk, scl, "tech.yml")
     tech_info = yaml.safe_load(open(tech_info_path))
+    rt_max_layer = tech_info["metal_layers"]["rt-max-layer"]
 
-    clock_period = default_clock_period
-    block_clock_periods = tech_info["sta"]["clock_periods"].get(building_blocks)
-    if block_clock_periods is not None:
-        for wildcard, period in block_clock_periods.items():
-            if fnmatch(size, wildcard):
-                clock_period = period
-                break
+    def design_name(words, word_width, variant):
+        variant_string = ("_%s" % variant) if variant is not None else ""
+        design_name_template = platform_config["design_name_template"]
+        return design_name_template.format(
+            **{
+                "count": words,
+                "width": word_width,
+                "width_bytes": word_width // 8,
+                "variant": variant_string,
+            }
+        )
 
-    logical_width = word_width_bytes
-    if building_blocks == "rf":
-        logical_width = word_width
+    def clock_period_for(size):
+        block_clock_periods = tech_info["sta"]["clock_periods"].get(building_blocks)
+        if block_clock_periods is not None:
+            for wildcard, period in block_clock_periods.items():
+                if fnmatch(size, wildcard):
+                    return period
+        return default_clock_period
 
-    rt_max_layer = tech_info["metal_layers"]["rt-max-layer"]
+    def find_cell_lefs():
+        if pdk_root is None:
+            return []
+        cell_lef = os.path.join(pdk_root, pdk, "libs.ref", scl, "lef", f"{scl}.lef")
+        return [cell_lef] if os.path.isfile(cell_lef) else []
 
-    TargetFlow = Flow.factory.get(flow_name) or Flow.factory.get("DFFRAMFlow")
-    dffram_flow = TargetFlow(
-        {
-            "DESIGN_NAME": design,
-            "CLOCK_PORT": "CLK",
-            "CLOCK_PERIOD": clock_period,
-            "GPL_CELL_PADDING": 0,
-            "DPL_CELL_PADDING": 0,
-            "RT_MAX_LAYER": rt_max_layer,
-            "GRT_ALLOW_CONGESTION": True,
+    def banked_logic_sites(banked, cell_lefs, site_width):
+        # Measured on the top level itself, with the built-in widths of the
+        # cells where there is no LEF for them
+        sites = SyntheticNetlist().library()
+        sites.update(read_lef_sites([str(lef) for lef in cell_lefs], float(site_width)))
+        with open(block_definitions_used, encoding="utf8") as f:
+            definitions = f.read()
+        defines = [f"PDK_{pdk}", f"SCL_{scl}", "__librelane__", "__pnr__"]
+        return banked.logic_sites(definitions, sites, defines)
+
+    def estimate_die(size, variant, latch):
+        cell_lefs = find_cell_lefs()
+        config = {
             "PDK": pdk,
             "STD_CELL_LIBRARY": scl,
-            "RAM_SIZE": size,
             "BUILDING_BLOCKS": building_blocks,
-            "VERILOG_FILES": [
-                block_definitions_used,
-                bb_used,
-            ],
-            "SYNTH_ELABORATE_ONLY": True,
-            "SYNTH_ELABORATE_FLATTEN": True,
-            "SYNTH_PARAMETERS": [f"WSIZE={logical_width}", f"USE_LATCH={int(latch)}"],
-            "GRT_REPAIR_ANTENNAS": False,
-            "MINIMUM_HEIGHT": min_height,
-            "VERTICAL_HALO": vertical_halo,
+            "RAM_SIZE": size,
+            "RAM_VARIANT": variant,
+            "RAM_USE_LATCH": latch,
+            "CELL_LEFS": cell_lefs,
             "HORIZONTAL_HALO": horizontal_halo,
-            "CLOCK_PERIOD": clock_period,
-            # IO Placement
-            "FP_PIN_ORDER_CFG": pin_order_file,
-            "FP_IO_VTHICKNESS_MULT": Decimal(2),
-            "FP_IO_HTHICKNESS_MULT": Decimal(2),
-            "FP_IO_HEXTEND": Decimal(0),
-            "FP_IO_VEXTEND": Decimal(0),
-            "FP_IO_VLENGTH": 2,
-            "FP_IO_HLENGTH": 2,
-            # PDN
-            "FP_PDN_MULTILAYER": False,
-        },
-        design_dir=os.path.abspath(build_dir),
-        pdk_root=pdk_root,
-    )
-
-    final_state = dffram_flow.start(
-        frm=frm,
-        to=to,
-        skip=skip,
-        tag=tag,
-        last_run=last_run,
-        with_initial_state=with_initial_state,
-    )
-
-    mkdirp("products")
-    final_state.save_snapshot(
-        os.path.join(
-            "products",
-            design,
+            "VERTICAL_HALO": vertical_halo,
+        }
+        core_size = estimate_core_size(config)
+        if core_size is None:
+            exit(os.EX_DATAERR)
+        core_width, core_height = core_size
+        halo_x, halo_y, site_width, site_height = calculate_halo(config)
+        die_width = core_width + halo_x * 2
+        die_height = max(core_height + halo_y * 2, min_height)
+        return (
+            core_size,
+            (die_width, die_height),
+            (halo_x, halo_y, site_width, site_height),
+        )
+
+    def save_products(design, final_state):
+        mkdirp("products")
+        final_state.save_snapshot(
+            os.path.join(
+                "products",
+                design,
+            )
+        )
+
+    commit = git_commit(os.path.dirname(os.path.abspath(__file__)))
+
+    def save_results(flow, started, **fields):
+        if no_results_db:
+            return
+        try:
+            record(
+                results_db,
+                flow.run_dir,
+                commit=commit,
+                wall_time=time.time() - started,
+                **fields,
+            )
+        except sqlite3.Error as e:
+            warn(f"Failed to record the run in '{results_db}': {e}")
+
+    def harden(design, size, variant, latch, frm, to, skip, with_initial_state):
+        words, word_width = [int(value) for value in size.split("x")]
+        build_dir = os.path.join(
+            "build", f"{pdk}-{scl}-{'latch' if latch else 'dff'}", design
+        )
+        mkdirp(build_dir)
+
+        logical_width = word_width // 8
+        if building_blocks == "rf":
+            logical_width = word_width
+
+        clock_period = clock_period_for(size)
+
+        TargetFlow = Flow.factory.get(flow_name) or Flow.factory.get("DFFRAMFlow")
+        dffram_flow = TargetFlow(
+            {
+                "DESIGN_NAME": design,
+                "CLOCK_PORT": "CLK",
+                "CLOCK_PERIOD": clock_period,
+                "GPL_CELL_PADDING": 0,
+                "DPL_CELL_PADDING": 0,
+                "RT_MAX_LAYER": rt_max_layer,
+                "GRT_ALLOW_CONGESTION": True,
+                "PDK": pdk,
+                "STD_CELL_LIBRARY": scl,
+                "RAM_SIZE": size,
+                "RAM_VARIANT": variant,
+                "RAM_USE_LATCH": latch,
+                "BUILDING_BLOCKS": building_blocks,
+                "VERILOG_FILES": [
+                    block_definitions_used,
+                    bb_used,
+                ],
+                "SYNTH_ELABORATE_ONLY": True,
+                "SYNTH_ELABORATE_FLATTEN": True,
+                "SYNTH_PARAMETERS": [
+                    f"WSIZE={logical_width}",
+                    f"USE_LATCH={int(latch)}",
+                ],
+                "GRT_REPAIR_ANTENNAS": False,
+                "MINIMUM_HEIGHT": min_height,
+                "VERTICAL_HALO": vertical_halo,
+                "HORIZONTAL_HALO": horizontal_halo,
+                "CLOCK_PERIOD": clock_period,
+                # IO Placement
+                "FP_PIN_ORDER_CFG": pin_order_file,
+                "FP_IO_VTHICKNESS_MULT": Decimal(2),
+                "FP_IO_HTHICKNESS_MULT": Decimal(2),
+                "FP_IO_HEXTEND": Decimal(0),
+                "FP_IO_VEXTEND": Decimal(0),
+                "FP_IO_VLENGTH": 2,
+                "FP_IO_HLENGTH": 2,
+                # PDN
+                "FP_PDN_MULTILAYER": False,
+                # Caching
+                "DFFRAM_STEP_CACHE": step_cache and os.path.abspath(step_cache),
+                "DFFRAM_PLAN_CACHE": (
+                    None if no_plan_cache else os.path.abspath(plan_cache)
+                ),
+                "DFFRAM_PLACER_PROFILE": profile_placer,
+            },
+            design_dir=os.path.abspath(build_dir),
+            pdk_root=pdk_root,
+        )
+
+        started = time.time()
+        final_state = dffram_flow.start(
+            frm=frm,
+            to=to,
+            skip=skip,
+            tag=tag,
+            last_run=last_run,
+            with_initial_state=with_initial_state,
+        )
+        save_products(design, final_state)
+        save_results(dffram_flow, started)
+        return final_state, dffram_flow.config
+
+    def harden_banked(banked, variant, latch):
+        # The bank is hardened whole, whatever --from, --to and --skip say
+        bank_size = f"{banked.bank_words}x{banked.width}"
+        bank_state, bank_config = harden(
+            banked.bank_design, bank_size, variant, latch, None, None, None, None
+        )
+
+        build_dir = os.path.join(
+            "build", f"{pdk}-{scl}-{'latch' if latch else 'dff'}", banked.design
+        )
+        mkdirp(build_dir)
+        top_file = os.path.join(build_dir, f"{banked.design}.v")
+        with open(top_file, "w", encoding="utf8") as f:
+            banked.write_verilog(f, bank_config["VDD_PIN"], bank_config["GND_PIN"])
+
+        bank_width, bank_height = die_size(bank_state)
+        halo_x, halo_y, site_width, site_height = calculate_halo(bank_config)
+        logic_sites = banked_logic_sites(banked, bank_config["CELL_LEFS"], site_width)
+        (die_width, die_height), locations = banked.floorplan(
+            bank_width,
+            bank_height,
+            site_width,
+            site_height,
+            halo_x,
+            halo_y,
+            logic_sites,
         )
-    )
+
+        # The decoders and multiplexers are instantiated by hand, like the
+        # rest of DFFRAM, and placed around the banks like any other cells
+        top_flow = Flow.factory.get("Classic")(
+            {
+                "DESIGN_NAME": banked.design,
+                "CLOCK_PORT": "CLK",
+                "CLOCK_PERIOD": clock_period_for(f"{banked.words}x{banked.width}"),
+                "RT_MAX_LAYER": rt_max_layer,
+                "GRT_ALLOW_CONGESTION": True,
+                "GRT_REPAIR_ANTENNAS": False,
+                "PDK": pdk,
+                "STD_CELL_LIBRARY": scl,
+                "VERILOG_FILES": [block_definitions_used, top_file],
+                "SYNTH_ELABORATE_ONLY": True,
+                "SYNTH_ELABORATE_FLATTEN": True,
+                "RUN_LINTER": False,
+                "FP_SIZING": "absolute",
+                "DIE_AREA": [0, 0, die_width, die_height],
+                "MACROS": {
+                    banked.bank_design: macro_config(bank_state, locations),
+                },
+                "FP_PIN_ORDER_CFG": pin_order_file,
+            },
+            design_dir=os.path.abspath(build_dir),
+            pdk_root=pdk_root,
+        )
+        started = time.time()
+        final_state = top_flow.start(
+            frm=frm,
+            to=to,
+            skip=skip,
+            tag=tag,
+            last_run=last_run,
+            with_initial_state=with_initial_state,
+        )
+        save_products(banked.design, final_state)
+        # The top level's configuration does not say what it is
+        save_results(
+            top_flow,
+            started,
+            building_blocks=building_blocks,
+            size=f"{banked.words}x{banked.width}",
+            variant=variant,
+            storage="latch" if latch else "dff",
+        )
+
+    for job in jobs:
+        size = job.size
+        variant = job.variant
+        latch = job.latch
+
+        design = os.getenv("FORCE_DESIGN_NAME") or design_name(
+            job.words, job.width, variant
+        )
+        banked = None
+        if job.bank_words is not None:
+            banked = BankedRAM(
+                design,
+                design_name(job.bank_words, job.width, variant),
+                job.words,
+                job.bank_words,
+                job.width,
+                variant,
+            )
+
+        if estimate:
+            if banked is None:
+                (core_width, core_height), (die_width, die_height), _ = estimate_die(
+                    size, variant, latch
+                )
+                print(
+                    f"{design}: core {core_width}µm x {core_height}µm, die {die_width}µm x {die_height}µm"
+                )
+                continue
+            (
+                _,
+                (bank_width, bank_height),
+                (
+                    halo_x,
+                    halo_y,
+                    site_width,
+                    site_height,
+                ),
+            ) = estimate_die(f"{banked.bank_words}x{banked.width}", variant, latch)
+            logic_sites = banked_logic_sites(banked, find_cell_lefs(), site_width)
+            (die_width, die_height), _ = banked.floorplan(
+                bank_width,
+                bank_height,
+                site_width,
+                site_height,
+                halo_x,
+                halo_y,
+                logic_sites,
+            )
+            print(
+                f"{design}: {banked.count} {banked.bank_design} banks of {bank_width}µm x {bank_height}µm, die {die_width}µm x {die_height}µm"
+            )
+            continue
+
+        if banked is not None:
+            harden_banked(banked, variant, latch)
+        else:
+            harden(design, size, variant, latch, frm, to, skip, with_initial_state)
 
 
 if __name__ == "__main__":
@@ -1,2 +1,11 @@
-from . import steps as DFFRAM  # noqa: F401
-from . import flows  # noqa: F401
+import os
+import sys
+
+# placeram runs under OpenROAD in the steps, but most of it does not need it
+# and the plugin uses it too
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts", "odbpy")
+)
+
+from . import steps as DFFRAM  # noqa: F401,E402
+from . import flows  # noqa: F401,E402
@@ -0,0 +1,311 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+"""
+Hierarchical hardening: a RAM with more words than is practical to harden
+flat is composed of copies of a smaller one, a bank, which is hardened once
+and placed as a hard macro.
+
+The top level only holds the decoders that enable one bank and the
+multiplexers that pick its output, the same ones the models use between
+their own banks, so placement, routing and sign-off only see the macros and
+the nets between them, and take time roughly in proportion to the number of
+banks.
+"""
+
+import math
+from decimal import Decimal
+from io import StringIO
+from typing import Any, Dict, Iterable, List, Mapping, Optional, TextIO, Tuple
+
+from librelane.state import DesignFormat, State
+from placeram.netlist import generate
+
+DEFAULT_BANK_WORDS = 512
+
+# How densely the top-level logic may be placed between banks, leaving room
+# for the buffers repair_design adds
+LOGIC_UTILIZATION = Decimal("0.3")
+
+# Room for the power straps and the buses between two banks at the least, µm
+MINIMUM_CHANNEL = Decimal(20)
+
+
+def bank_count(words: int, bank_words: int) -> Optional[int]:
+    """
+    Returns how many banks of ``bank_words`` words make up ``words`` words,
+    or None if it is not a power of two greater than one.
+
+    >>> bank_count(4096, 512)
+    8
+    >>> bank_count(3072, 512) is None
+    True
+    """
+    if words % bank_words != 0:
+        return None
+    count = words // bank_words
+    if count < 2 or count & (count - 1) != 0:
+        return None
+    return count
+
+
+class BankedRAM(object):
+    """
+    A ``words``x``width`` RAM made of ``bank_design``, a RAM of
+    ``bank_words`` words of the same width and variant.
+    """
+
+    def __init__(
+        self,
+        design: str,
+        bank_design: str,
+        words: int,
+        bank_words: int,
+        width: int,
+        variant: Optional[str],
+    ):
+        count = bank_count(words, bank_words)
+        if count is None:
+            raise ValueError(
+                f"{words} words cannot be split into a power of two of {bank_words}-word banks."
+            )
+        self.design = design
+        self.bank_design = bank_design
+        self.words = words
+        self.bank_words = bank_words
+        self.width = width
+        self.count = count
+        self.address_bits = int(math.log2(words))
+        self.bank_bits = int(math.log2(bank_words))
+        self.select_bits = self.address_bits - self.bank_bits
+        # Every read port has an enable, an address and an output of its own
+        self.ports = ["0", "1"] if variant == "1RW1R" else ["0"]
+
+    @property
+    def instances(self) -> List[str]:
+        return [f"BANK{i}" for i in range(self.count)]
+
+    def decoder(
+        self, name: str, enable: str, address: str, low: int, bits: int, select: str
+    ) -> List[str]:
+        """
+        Decodes ``bits`` bits of ``address`` from ``low`` into ``select``,
+        with DEC3x8s below a smaller decoder beyond three bits.
+        """
+        if bits == 1:
+            return [
+                f"    DEC1x2 {name} (.EN({enable}), .A({address}[{low}]), .SEL({select}));"
+            ]
+        if bits <= 3:
+            return [
+                f"    DEC{bits}x{2 ** bits} {name} (.EN({enable}), .A({address}[{low + bits - 1}:{low}]), .SEL({select}));"
+            ]
+        high = bits - 3
+        lines = [f"    wire [{2 ** high - 1}:0] {name}_EN;"]
+        lines += self.decoder(f"{name}_H", enable, address, low + 3, high, f"{name}_EN")
+        for i in range(2**high):
+            lines.append(
+                f"    DEC3x8 {name}_{i} (.EN({name}_EN[{i}]), .A({address}[{low + 2}:{low}]), .SEL({select}[{i * 8 + 7}:{i * 8}]));"
+            )
+        return lines
+
+    def multiplexer(self, port: str) -> List[str]:
+        """
+        Picks the output of the addressed bank for ``port`` with a tree of
+        MUX4x1s, and a MUX2x1 for an odd select bit.
+        """
+        lines = []
+        inputs = [f"Do{port}_pre[{i}]" for i in range(self.count)]
+        bit = self.bank_bits
+        level = 0
+        while len(inputs) > 1:
+            fan_in = 4 if len(inputs) >= 4 else 2
+            count = len(inputs) // fan_in
+            if count == 1:
+                outputs = [f"Do{port}"]
+            else:
+                lines.append(
+                    f"    wire [{self.width - 1}:0] Do{port}_L{level} [{count - 1}:0];"
+                )
+                outputs = [f"Do{port}_L{level}[{i}]" for i in range(count)]
+            for i, output in enumerate(outputs):
+                group = inputs[i * fan_in : (i + 1) * fan_in]
+                connections = ", ".join(
+                    f".A{j}({input})" for j, input in enumerate(group)
+                )
+                if fan_in == 4:
+                    select = f"A{port}[{bit + 1}:{bit}]"
+                else:
+                    select = f"A{port}[{bit}]"
+                lines.append(
+                    f"    MUX{fan_in}x1 #(.WIDTH({self.width})) Do{port}MUX_{level}_{i} ({connections}, .S({select}), .X({output}));"
+                )
+            inputs = outputs
+            bit += int(math.log2(fan_in))
+            level += 1
+        return lines
+
+    def write_verilog(self, file: TextIO, vdd: str, gnd: str):
+        """
+        Writes the top level, with the banks connected to the power nets
+        ``vdd`` and ``gnd`` when ``USE_POWER_PINS`` is defined.
+        """
+        write_enables = self.width // 8
+        ports = [
+            "    input CLK",
+            f"    input [{write_enables - 1}:0] WE0",
+        ]
+        for port in self.ports:
+            ports += [
+                f"    input EN{port}",
+                f"    input [{self.address_bits - 1}:0] A{port}",
+            ]
+        ports.append(f"    input [{self.width - 1}:0] Di0")
+        ports += [f"    output [{self.width - 1}:0] Do{port}" for port in self.ports]
+
+        lines = [
+            f"// {self.design}: {self.count} {self.bank_design} banks of {self.bank_words} words",
+            "`default_nettype none",
+            f"module {self.design} (",
+            "`ifdef USE_POWER_PINS",
+            f"    inout {vdd},",
+            f"    inout {gnd},",
+            "`endif",
+            ",\n".join(ports),
+            ");",
+        ]
+        for port in self.ports:
+            lines += [
+                f"    wire [{self.count - 1}:0] SEL{port};",
+                f"    wire [{self.width - 1}:0] Do{port}_pre [{self.count - 1}:0];",
+            ]
+            lines += self.decoder(
+                f"DEC{port}",
+                f"EN{port}",
+                f"A{port}",
+                self.bank_bits,
+                self.select_bits,
+                f"SEL{port}",
+            )
+
+        for i, instance in enumerate(self.instances):
+            connections = [".CLK(CLK)", ".WE0(WE0)", ".Di0(Di0)"]
+            for port in self.ports:
+                connections += [
+                    f".EN{port}(SEL{port}[{i}])",
+                    f".A{port}(A{port}[{self.bank_bits - 1}:0])",
+                    f".Do{port}(Do{port}_pre[{i}])",
+                ]
+            lines += [
+                f"    {self.bank_design} {instance} (",
+                "`ifdef USE_POWER_PINS",
+                f"        .{vdd}({vdd}),",
+                f"        .{gnd}({gnd}),",
+                "`endif",
+                ",\n".join(f"        {connection}" for connection in connections),
+                "    );",
+            ]
+
+        for port in self.ports:
+            lines += self.multiplexer(port)
+        lines.append("endmodule")
+        file.write("\n".join(lines) + "\n")
+
+    def logic_sites(
+        self,
+        definitions: str,
+        sites: Mapping[str, int],
+        defines: Iterable[str] = (),
+    ) -> int:
+        """
+        Returns the width in sites of the cells of the top level, elaborated
+        from its Verilog over the building blocks' ``definitions`` (see
+        :func:`placeram.netlist.generate`), with ``sites`` the width of
+        every master.
+        """
+        top = StringIO()
+        self.write_verilog(top, "VPWR", "VGND")
+        netlist = generate([definitions, top.getvalue()], self.design, {}, defines)
+        return sum(
+            sites[cell.master]
+            for cell in netlist.cells
+            if cell.master != self.bank_design
+        )
+
+    def floorplan(
+        self,
+        bank_width: Decimal,
+        bank_height: Decimal,
+        site_width: Decimal,
+        site_height: Decimal,
+        horizontal_halo: Decimal,
+        vertical_halo: Decimal,
+        logic_sites: int,
+    ) -> Tuple[Tuple[Decimal, Decimal], Dict[str, Tuple[Decimal, Decimal]]]:
+        """
+        Lays the banks out in a grid as close to square in banks as the
+        count allows, with channels between the columns and rows wide
+        enough for ``logic_sites`` sites of top-level logic (see
+        :meth:`logic_sites`.) Returns the die size and the location of every
+        bank instance, in µm.
+        """
+        columns = 2 ** math.ceil(self.select_bits / 2)
+        rows = self.count // columns
+
+        logic_area = logic_sites * site_width * site_height / LOGIC_UTILIZATION
+        span = (columns - 1) * rows * bank_height + (rows - 1) * columns * bank_width
+        channel = max(MINIMUM_CHANNEL, logic_area / span)
+
+        def snap(value: Decimal, pitch: Decimal) -> Decimal:
+            return math.ceil(value / pitch) * pitch
+
+        pitch_x = snap(bank_width + channel, site_width)
+        pitch_y = snap(bank_height + channel, site_height)
+        locations = {}
+        for i, instance in enumerate(self.instances):
+            column, row = i % columns, i // columns
+            locations[instance] = (
+                horizontal_halo + column * pitch_x,
+                vertical_halo + row * pitch_y,
+            )
+        die = (
+            snap(
+                horizontal_halo * 2 + (columns - 1) * pitch_x + bank_width, site_width
+            ),
+            snap(vertical_halo * 2 + (rows - 1) * pitch_y + bank_height, site_height),
+        )
+        return die, locations
+
+
+def die_size(state: State) -> Tuple[Decimal, Decimal]:
+    """
+    The width and height of a hardened design's die, in µm.
+    """
+    x0, y0, x1, y1 = [
+        Decimal(str(value)) for value in str(state.metrics["design__die__bbox"]).split()
+    ]
+    return x1 - x0, y1 - y0
+
+
+def macro_config(
+    state: State, locations: Dict[str, Tuple[Decimal, Decimal]]
+) -> Dict[str, Any]:
+    """
+    Returns the ``MACROS`` entry for a hardened bank, from the views in its
+    final state, placing an instance at each of ``locations``.
+    """
+    macro: Dict[str, Any] = {
+        "gds": [str(state[DesignFormat.GDS])],
+        "lef": [str(state[DesignFormat.LEF])],
+        "nl": [str(state[DesignFormat.NETLIST])],
+        "pnl": [str(state[DesignFormat.POWERED_NETLIST])],
+        "instances": {
+            instance: {"location": [x, y], "orientation": "N"}
+            for instance, (x, y) in locations.items()
+        },
+    }
+    for format, key in [(DesignFormat.LIB, "lib"), (DesignFormat.SPEF, "spef")]:
+        views = state.get(format)
+        if isinstance(views, dict):
+            macro[key] = {corner: [str(view)] for corner, view in views.items()}
+    return macro
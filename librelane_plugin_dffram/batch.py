@@ -0,0 +1,203 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+"""
+Hardens a batch of designs side by side, each in a ``dffram.py`` process of
+its own, without starting more of them than the machine has the memory and
+cores for.
+
+How much memory a job peaks at and how many threads it can put to use both
+grow with its number of cells, which is close to proportional to its number
+of bits (about 3.2 cells a bit for every model and variant.) The figures
+below are deliberately on the high side: overestimating only serializes a
+few jobs, underestimating runs the machine out of memory.
+"""
+
+import os
+import math
+import time
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from librelane.logging import err, info
+
+CELLS_PER_BIT = 3.25
+
+# The peak of the flow, with the sign-off checks running at the same time
+BASE_MEMORY = 1 << 30
+MEMORY_PER_CELL = 24 << 10
+
+# Fewer cells than this per thread and more threads stop paying off
+CELLS_PER_THREAD = 20000
+
+
+class Job(object):
+    """
+    One design of a batch: ``words``x``width`` bits of ``building_blocks``,
+    ``variant`` (None for the default one) with latches or flip-flops, made
+    of banks of ``bank_words`` words if given.
+    """
+
+    def __init__(
+        self,
+        building_blocks: str,
+        words: int,
+        width: int,
+        variant: Optional[str],
+        latch: bool,
+        bank_words: Optional[int] = None,
+    ):
+        self.building_blocks = building_blocks
+        self.words = words
+        self.width = width
+        self.variant = variant
+        self.latch = latch
+        self.bank_words = bank_words
+
+    @property
+    def size(self) -> str:
+        return f"{self.words}x{self.width}"
+
+    @property
+    def tag(self) -> str:
+        storage = "latch" if self.latch else "dff"
+        return (
+            f"{self.building_blocks}_{self.size}_{self.variant or 'DEFAULT'}_{storage}"
+        )
+
+    @property
+    def cells(self) -> int:
+        # A banked design peaks while hardening its bank: the top level only
+        # holds a few cells per bit
+        words = self.bank_words or self.words
+        return math.ceil(words * self.width * CELLS_PER_BIT)
+
+    @property
+    def memory(self) -> int:
+        """
+        The estimated peak memory of the job, in bytes.
+        """
+        return BASE_MEMORY + self.cells * MEMORY_PER_CELL
+
+    def useful_threads(self, cpus: int) -> int:
+        return max(1, min(cpus, math.ceil(self.cells / CELLS_PER_THREAD)))
+
+
+def available_memory() -> int:
+    """
+    The memory that is free for the batch, in bytes, or all of it where the
+    free memory cannot be queried.
+    """
+    try:
+        pages = os.sysconf("SC_AVPHYS_PAGES")
+    except (ValueError, OSError):
+        pages = os.sysconf("SC_PHYS_PAGES")
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def backfill(jobs: List[Job], memory: int) -> int:
+    """
+    Returns how many of ``jobs``, smallest first, fit in ``memory`` bytes.
+    """
+    count = 0
+    for job in sorted(jobs, key=lambda job: job.memory):
+        memory -= job.memory
+        if memory < 0:
+            break
+        count += 1
+    return count
+
+
+def schedule(
+    jobs: List[Job],
+    cpus: int,
+    memory: int,
+    run: Callable[[Job, int], int],
+) -> Dict[str, int]:
+    """
+    Calls ``run(job, threads)`` for every job, as many at a time as fit in
+    ``cpus`` threads and ``memory`` bytes, and returns the exit code of each
+    job by tag.
+
+    The largest jobs are started first, and smaller ones fill the room they
+    leave: a job leaves a thread for each of the other pending jobs that
+    would fit in memory next to it. A job that fits nowhere is run on its
+    own, with every thread.
+    """
+    pending = sorted(jobs, key=lambda job: job.memory, reverse=True)
+    running: Dict[Future, Tuple[Job, int]] = {}
+    used_cpus = 0
+    used_memory = 0
+    results: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(cpus, len(jobs)))) as tpe:
+        while len(pending) or len(running):
+            for job in list(pending):
+                free_cpus = cpus - used_cpus
+                alone = len(running) == 0
+                if not alone and (free_cpus < 1 or used_memory + job.memory > memory):
+                    continue
+                others = [other for other in pending if other is not job]
+                reserved = backfill(others, memory - used_memory - job.memory)
+                threads = job.useful_threads(
+                    max(1, (cpus if alone else free_cpus) - reserved)
+                )
+                info(
+                    f"Starting {job.tag} with {threads} thread(s), expecting {job.memory / (1 << 30):.1f} GiB at most…"
+                )
+                pending.remove(job)
+                running[tpe.submit(run, job, threads)] = job, threads
+                used_cpus += threads
+                used_memory += job.memory
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job, threads = running.pop(future)
+                used_cpus -= threads
+                used_memory -= job.memory
+                try:
+                    results[job.tag] = future.result()
+                except OSError as e:
+                    err(f"Could not start {job.tag}: {e}")
+                    results[job.tag] = -1
+    return results
+
+
+def run_batch(
+    jobs: List[Job],
+    command: Callable[[Job, int], List[str]],
+    log_dir: str,
+    cpus: Optional[int] = None,
+    memory: Optional[int] = None,
+) -> bool:
+    """
+    Runs ``command(job, threads)`` for every job, logging each to a file in
+    ``log_dir``, and returns whether they all succeeded.
+    """
+    cpus = cpus or os.cpu_count() or 1
+    memory = memory or available_memory()
+    os.makedirs(log_dir, exist_ok=True)
+
+    def run(job: Job, threads: int) -> int:
+        env = os.environ.copy()
+        # The default thread count of every step of the flow
+        env["_OPENLANE_MAX_CORES"] = str(threads)
+        log_path = os.path.join(log_dir, f"{job.tag}.log")
+        start = time.time()
+        with open(log_path, "w", encoding="utf8") as log:
+            returncode = subprocess.call(
+                command(job, threads),
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+        if returncode == 0:
+            info(f"Finished {job.tag} in {time.time() - start:.0f}s.")
+        else:
+            err(f"Failed {job.tag}: see '{log_path}'.")
+        return returncode
+
+    results = schedule(jobs, cpus, memory, run)
+    failed = [tag for tag, returncode in results.items() if returncode != 0]
+    info(f"{len(results) - len(failed)} of {len(results)} designs hardened.")
+    return len(failed) == 0
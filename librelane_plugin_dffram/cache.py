@@ -0,0 +1,394 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+"""
+A content-addressed cache of step results, kept in a plain local directory.
+
+A step's result is keyed by everything it can see: the contents of every file
+in its input state, its metrics, its configuration (with the contents of the
+files it names), its implementation and the versions of the tools it may run.
+The plugin's own steps are also keyed by every file of the plugin and by the
+platform and building blocks files they read from the working directory.
+On a hit, the files the step produced are copied back into its directory and
+the step is skipped.
+
+Checkers are never cached: they do not produce anything, and the point of
+running them is to fail the flow.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import librelane
+from librelane.common import GenericDictEncoder, Path
+from librelane.config import Variable
+from librelane.logging import info, warn
+from librelane.steps import Step
+
+__file_dir__ = os.path.dirname(os.path.abspath(__file__))
+
+step_cache = Variable(
+    "DFFRAM_STEP_CACHE",
+    Optional[str],
+    "A local directory to cache the results of steps in. Steps whose inputs, configuration and tools have not changed since they were cached are restored from it instead of being run. Caching is disabled if unset.",
+)
+step_cache_size = Variable(
+    "DFFRAM_STEP_CACHE_SIZE",
+    int,
+    "The size the step cache is kept under: the least recently used results are evicted beyond it.",
+    default=10240,
+    units="MiB",
+)
+
+HITS = "dffram__step_cache__hits"
+MISSES = "dffram__step_cache__misses"
+
+# Any of these changing may change the outcome of any step.
+TOOLS = ["yosys", "openroad", "magic", "klayout", "netgen"]
+
+# Written by Step.start itself before the step runs
+STEP_FILES = ["state_in.json", "config.json"]
+
+# Reported by PlaceRAM for information only: no step reads them, and those
+# of --profile-placer are times that change on every run.
+UNKEYED_METRICS = "dffram__placer__"
+
+# A batch runs many flows in one process, each with files of its own, so only
+# the digests of the most recently hashed files are kept.
+MAX_DIGESTS = 4096
+_digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+
+def file_digest(path: str) -> str:
+    """
+    Hashes the contents of a file, remembering the digest for as long as its
+    size and modification time do not change and it was recently hashed.
+    """
+    stat = os.stat(path)
+    memo = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    if memo in _digests:
+        _digests.move_to_end(memo)
+        return _digests[memo]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    _digests[memo] = digest.hexdigest()
+    if len(_digests) > MAX_DIGESTS:
+        _digests.popitem(last=False)
+    return _digests[memo]
+
+
+def tool_fingerprint(tool: str) -> Optional[List[Any]]:
+    """
+    Identifies the binary of a tool by path, size and modification time, which
+    is far cheaper than asking it for its version and changes whenever it is
+    updated.
+    """
+    binary = shutil.which(tool)
+    if binary is None:
+        return None
+    binary = os.path.realpath(binary)
+    stat = os.stat(binary)
+    return [binary, stat.st_size, stat.st_mtime_ns]
+
+
+def tool_versions() -> Dict[str, Any]:
+    versions: Dict[str, Any] = {"librelane": librelane.__version__}
+    for tool in TOOLS:
+        versions[tool] = tool_fingerprint(tool)
+    return versions
+
+
+def plugin_digest() -> str:
+    """
+    Hashes every file of the plugin: its sources, and data such as
+    placeram's ``rx.yml``, which decides how the netlist is placed.
+    """
+    digest = hashlib.sha256()
+    for dir, dirs, files in os.walk(__file_dir__):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for file in sorted(files):
+            path = os.path.join(dir, file)
+            digest.update(os.path.relpath(path, __file_dir__).encode("utf8"))
+            digest.update(file_digest(path).encode("utf8"))
+    return digest.hexdigest()
+
+
+def platform_files(config) -> List[str]:
+    """
+    The platform's ``tech.yml`` and the building blocks' ``config.yml``,
+    which the plugin's steps read from the working directory rather than
+    from their configuration.
+    """
+    files = []
+    pdk, scl = config.get("PDK"), config.get("STD_CELL_LIBRARY")
+    if pdk is not None and scl is not None:
+        files.append(os.path.join(".", "platforms", pdk, scl, "tech.yml"))
+    blocks = config.get("BUILDING_BLOCKS")
+    if blocks is not None:
+        files.append(os.path.join(".", "models", blocks, "config.yml"))
+    return files
+
+
+def fingerprint(value: Any) -> Any:
+    """
+    Replaces every path to a file in ``value`` with a digest of its contents,
+    so the key depends on what the files hold rather than where they are.
+    """
+    if isinstance(value, dict):
+        return {str(k): fingerprint(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [fingerprint(v) for v in value]
+    if isinstance(value, (str, os.PathLike)) and os.path.isfile(value):
+        return {"sha256": file_digest(os.fspath(value))}
+    return value
+
+
+class StepCache(object):
+    """
+    A directory of entries named after their key, each holding the files a
+    step produced and an ``entry.json`` describing its state and metrics
+    updates. The modification time of ``entry.json`` records when the entry
+    was last used.
+    """
+
+    def __init__(self, root: str, max_size: int):
+        self.root = os.path.abspath(root)
+        self.max_size = max_size
+
+    def key(self, step: Step, state_in) -> str:
+        config = {
+            name: value
+            for name, value in step.config.items()
+            if name not in [step_cache.name, step_cache_size.name]
+        }
+        metrics = {
+            name: value
+            for name, value in state_in.metrics.items()
+            if name not in [HITS, MISSES] and not name.startswith(UNKEYED_METRICS)
+        }
+        inputs = {
+            "step": step.get_implementation_id(),
+            "config": fingerprint(config),
+            "views": fingerprint(dict(state_in)),
+            "metrics": metrics,
+            "tools": tool_versions(),
+        }
+        if type(step).__module__.startswith(__name__.rsplit(".", 1)[0]):
+            inputs["plugin"] = plugin_digest()
+            inputs["platform"] = fingerprint(platform_files(step.config))
+        serialized = json.dumps(inputs, cls=GenericDictEncoder, sort_keys=True)
+        return hashlib.sha256(serialized.encode("utf8")).hexdigest()
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def restore(
+        self, key: str, step_dir: str
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Copies the files of the entry for ``key`` into ``step_dir`` and returns
+        the step's views and metrics updates, or None if there is no entry.
+        """
+        entry_dir = self.entry_dir(key)
+        entry_path = os.path.join(entry_dir, "entry.json")
+        try:
+            with open(entry_path, encoding="utf8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        def resolve(value):
+            if isinstance(value, dict):
+                if "step_dir" in value:
+                    return Path(os.path.join(step_dir, value["step_dir"]))
+                return {k: resolve(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [resolve(v) for v in value]
+            return Path(value)
+
+        views_updates = {}
+        for id, value in entry["views"].items():
+            views_updates[id] = None if value is None else resolve(value)
+            for path in view_paths(views_updates[id]):
+                outside = os.path.commonpath([path, step_dir]) != step_dir
+                if outside and not os.path.exists(path):
+                    return None
+
+        shutil.copytree(
+            os.path.join(entry_dir, "files"),
+            step_dir,
+            symlinks=True,
+            dirs_exist_ok=True,
+        )
+        os.utime(entry_path)
+        return views_updates, entry["metrics"]
+
+    def store(
+        self,
+        key: str,
+        step_dir: str,
+        views_updates: Dict[Any, Any],
+        metrics_updates: Dict[str, Any],
+    ):
+        step_dir = os.path.abspath(step_dir)
+
+        def relative(value):
+            if isinstance(value, dict):
+                return {k: relative(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [relative(v) for v in value]
+            path = os.path.abspath(value)
+            if os.path.commonpath([path, step_dir]) == step_dir:
+                return {"step_dir": os.path.relpath(path, step_dir)}
+            return path
+
+        views = {}
+        for format, value in views_updates.items():
+            id = format if isinstance(format, str) else format.value.id
+            views[id] = None if value is None else relative(value)
+        entry = {
+            "views": views,
+            "metrics": {
+                name: value
+                for name, value in metrics_updates.items()
+                if name not in [HITS, MISSES]
+            },
+        }
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+        try:
+            shutil.copytree(
+                step_dir,
+                os.path.join(staging, "files"),
+                symlinks=True,
+                ignore=lambda dir, _: STEP_FILES if dir == step_dir else [],
+            )
+            entry["size"] = directory_size(staging)
+            if entry["size"] > self.max_size:
+                return
+            with open(os.path.join(staging, "entry.json"), "w", encoding="utf8") as f:
+                json.dump(entry, f, cls=GenericDictEncoder)
+            entry_dir = self.entry_dir(key)
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            try:
+                os.rename(staging, entry_dir)
+            except OSError:
+                # Stored concurrently by another run
+                return
+        finally:
+            if os.path.isdir(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """
+        Returns the last use, size and directory of every entry in the cache.
+        """
+        result = []
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if prefix.startswith(".") or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                entry_path = os.path.join(entry_dir, "entry.json")
+                try:
+                    with open(entry_path, encoding="utf8") as f:
+                        size = json.load(f)["size"]
+                    used = os.stat(entry_path).st_mtime
+                except (OSError, ValueError, KeyError):
+                    continue
+                result.append((used, size, entry_dir))
+        return result
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in its
+        maximum size.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+
+def view_paths(value: Any) -> List[str]:
+    if isinstance(value, dict):
+        return [path for v in value.values() for path in view_paths(v)]
+    if isinstance(value, list):
+        return [path for v in value for path in view_paths(v)]
+    if value is None:
+        return []
+    return [os.fspath(value)]
+
+
+def directory_size(path: str) -> int:
+    size = 0
+    for dir, _, files in os.walk(path):
+        for file in files:
+            size += os.lstat(os.path.join(dir, file)).st_size
+    return size
+
+
+def cached(Target: Type[Step]) -> Type[Step]:
+    """
+    Returns a subclass of ``Target`` that is restored from the step cache,
+    if one is configured, instead of being run when its inputs are unchanged.
+    """
+    if Target.id.startswith("Checker."):
+        return Target
+
+    def run(self, state_in, **kwargs):
+        counts = {name: state_in.metrics.get(name, 0) for name in [HITS, MISSES]}
+        if self.config[step_cache.name] is None:
+            return Target.run(self, state_in, **kwargs)
+
+        cache = StepCache(
+            self.config[step_cache.name],
+            self.config[step_cache_size.name] * 1024 * 1024,
+        )
+        try:
+            key = cache.key(self, state_in)
+        except OSError as e:
+            warn(f"Could not compute the step cache key of '{self.id}': {e}")
+            return Target.run(self, state_in, **kwargs)
+
+        restored = cache.restore(key, os.path.abspath(self.step_dir))
+        if restored is not None:
+            info(f"Restored '{self.id}' from the step cache ({key[:12]}).")
+            views_updates, metrics_updates = restored
+            metrics_updates[HITS] = counts[HITS] + 1
+            metrics_updates[MISSES] = counts[MISSES]
+            return views_updates, metrics_updates
+
+        views_updates, metrics_updates = Target.run(self, state_in, **kwargs)
+        try:
+            cache.store(key, self.step_dir, views_updates, metrics_updates)
+        except OSError as e:
+            warn(f"Could not store '{self.id}' in the step cache: {e}")
+        metrics_updates = dict(metrics_updates)
+        metrics_updates[HITS] = counts[HITS]
+        metrics_updates[MISSES] = counts[MISSES] + 1
+        return views_updates, metrics_updates
+
+    return type(
+        Target.__name__,
+        (Target,),
+        {
+            "__module__": Target.__module__,
+            "run": run,
+            "config_vars": Target.config_vars + [step_cache, step_cache_size],
+            "_implementation_id": Target.get_implementation_id(),
+        },
+    )
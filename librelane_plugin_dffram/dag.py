@@ -0,0 +1,254 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+"""
+A sequential flow whose steps declare the steps they depend on, so that the
+ones that do not depend on each other, such as the sign-off checks of the
+finished layout, run at the same time.
+
+Each step starts from the initial state updated by every step it depends on,
+directly or not, in the order the flow lists them, and the final state is the
+initial state updated by every step in that order: the result is the same
+however the steps happen to be scheduled.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from librelane.common import Filter, get_tpe, slugify
+from librelane.flows import FlowError, FlowException, SequentialFlow
+from librelane.logging import debug, info, success
+from librelane.state import State
+from librelane.steps import DeferredStepError, Step, StepError, StepException
+
+Updates = Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+class DAGFlow(SequentialFlow):
+    """
+    A :class:`SequentialFlow` that starts every step as soon as the steps it
+    depends on have finished. At most as many steps run at once as librelane
+    has workers (``-j``/``--jobs``.)
+
+    :cvar Dependencies: A mapping from the ID of a step to the IDs of the
+        earlier steps it depends on. Steps that are not listed depend on the
+        step before them, as in a :class:`SequentialFlow`.
+    :cvar Accumulated: Metrics that count something across steps. What each
+        step adds to them is summed, rather than the last value kept.
+    """
+
+    Steps: List[Type[Step]] = []
+    Dependencies: Dict[str, List[str]] = {}
+    Accumulated: List[str] = []
+
+    def dependencies(self) -> List[List[int]]:
+        """
+        Returns the indices of the steps each step depends on.
+        """
+        indices = {step.id: i for i, step in enumerate(self.Steps)}
+        result = []
+        for i, step in enumerate(self.Steps):
+            if step.id not in self.Dependencies:
+                result.append([] if i == 0 else [i - 1])
+                continue
+            dependencies = []
+            for id in self.Dependencies[step.id]:
+                if indices.get(id, i) >= i:
+                    raise FlowException(
+                        f"'{step.id}' depends on '{id}', which is not an earlier step of {self.name}."
+                    )
+                dependencies.append(indices[id])
+            result.append(dependencies)
+        return result
+
+    def updates(self, state_in: State, state_out: Optional[State]) -> Updates:
+        """
+        Returns the views and metrics a step changed.
+        """
+        if state_out is None:
+            # Deferred errors are raised before the step's state is updated
+            return {}, {}
+        views = {
+            id: value for id, value in state_out.items() if state_in.get(id) != value
+        }
+        metrics = {}
+        for name, value in state_out.metrics.items():
+            if name in self.Accumulated:
+                if value != state_in.metrics.get(name, 0):
+                    metrics[name] = value - state_in.metrics.get(name, 0)
+            elif name not in state_in.metrics or state_in.metrics[name] != value:
+                metrics[name] = value
+        return views, metrics
+
+    def merge(
+        self,
+        initial_state: State,
+        updates: Dict[int, Updates],
+        indices: Iterable[int],
+    ) -> State:
+        views: Dict[str, Any] = {}
+        metrics = dict(initial_state.metrics)
+        for i in sorted(indices):
+            views_updates, metrics_updates = updates[i]
+            views.update(views_updates)
+            for name, value in metrics_updates.items():
+                if name in self.Accumulated:
+                    value += metrics.get(name, 0)
+                metrics[name] = value
+        return initial_state.__class__(initial_state, overrides=views, metrics=metrics)
+
+    def selected(
+        self,
+        frm: Optional[str],
+        to: Optional[str],
+        skip: Optional[Iterable[str]],
+    ) -> List[bool]:
+        """
+        Returns whether each step is to be run, given the same ``frm``, ``to``
+        and ``skip`` arguments and gating variables a :class:`SequentialFlow`
+        takes.
+        """
+        ids = [step.id for step in self.Steps]
+        # Matched case-insensitively, as SequentialFlow does
+        lowered = [id.lower() for id in ids]
+
+        def resolve(matchable: str, multiple_ok: bool = False) -> List[int]:
+            matched = set(Filter([matchable.lower()]).filter(lowered))
+            if len(matched) == 0:
+                raise FlowException(
+                    f"Failed to process '{matchable}': no step(s) with ID '{matchable}' found in flow."
+                )
+            if len(matched) > 1 and not multiple_ok:
+                raise FlowException(f"{matchable} matched multiple steps.")
+            return [i for i, id in enumerate(lowered) if id in matched]
+
+        # Like SequentialFlow, run from the first step matching frm up to the
+        # first step matching to after it
+        first = 0 if frm is None else resolve(frm)[0]
+        last = len(ids) - 1
+        if to is not None:
+            last = next((i for i in resolve(to) if i >= first), last)
+        skipped: Set[int] = set()
+        for matchable in skip or []:
+            skipped.update(resolve(matchable, multiple_ok=True))
+        for pattern, variables in self.gating_config_vars.items():
+            gated = set(Filter([pattern]).filter(ids))
+            if all(self.config[variable] for variable in variables):
+                continue
+            for i, id in enumerate(ids):
+                if id in gated:
+                    info(
+                        f"Gating variable for step '{id}' set to 'False'- the step will be skipped."
+                    )
+                    skipped.add(i)
+        return [first <= i <= last and i not in skipped for i in range(len(ids))]
+
+    def run(
+        self,
+        initial_state: State,
+        frm: Optional[str] = None,
+        to: Optional[str] = None,
+        skip: Optional[Iterable[str]] = None,
+        reproducible: Optional[str] = None,
+        **kwargs,
+    ) -> Tuple[State, List[Step]]:
+        if reproducible is not None:
+            return super().run(
+                initial_state,
+                frm=frm,
+                to=to,
+                skip=skip,
+                reproducible=reproducible,
+                **kwargs,
+            )
+
+        assert self.run_dir is not None
+        debug(f"Starting run ▶ '{self.run_dir}'")
+        dependencies = self.dependencies()
+        ancestors: List[Set[int]] = []
+        for direct in dependencies:
+            ancestors.append(set(direct).union(*[ancestors[i] for i in direct]))
+        selected = self.selected(frm, to, skip)
+
+        self.progress_bar.set_max_stage_count(len(self.Steps))
+        info("Starting…")
+
+        # Numbered in order, as a SequentialFlow would, which is done before
+        # any step starts since they do not start in order
+        prefix = self.progress_bar.get_ordinal_prefix()
+        first, digits = int(prefix[:-1]), len(prefix) - 1
+        step_dirs: Dict[int, str] = {}
+        for i, Target in enumerate(self.Steps):
+            if selected[i]:
+                ordinal = str(first + len(step_dirs)).zfill(digits)
+                step_dirs[i] = os.path.join(
+                    self.run_dir, f"{ordinal}-{slugify(Target.id)}"
+                )
+
+        updates: Dict[int, Updates] = {}
+        steps: Dict[int, Step] = {}
+        states_in: Dict[int, State] = {}
+        running: Dict[Future, int] = {}
+        pending = list(range(len(self.Steps)))
+        errors: List[Tuple[int, StepError]] = []
+        deferred_errors: List[Tuple[int, str]] = []
+        while True:
+            ready = [
+                i
+                for i in pending
+                if len(errors) == 0 and all(d in updates for d in dependencies[i])
+            ]
+            skipped = False
+            for i in ready:
+                pending.remove(i)
+                if not selected[i]:
+                    skipped = True
+                    info(f"Skipping step '{self.Steps[i].id}'…")
+                    updates[i] = {}, {}
+                    self.progress_bar.end_stage(increment_ordinal=False)
+                    continue
+                states_in[i] = self.merge(initial_state, updates, ancestors[i])
+                steps[i] = self.Steps[i](config=self.config, state_in=states_in[i])
+                self.progress_bar.start_stage(steps[i].name)
+                future = get_tpe().submit(
+                    steps[i].start, toolbox=self.toolbox, step_dir=step_dirs[i]
+                )
+                running[future] = i
+            if skipped:
+                # Skipped steps may have readied others
+                continue
+            if len(running) == 0:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(finished, key=lambda future: running[future]):
+                i = running.pop(future)
+                try:
+                    future.result()
+                except DeferredStepError as e:
+                    deferred_errors.append((i, str(e)))
+                except StepError as e:
+                    errors.append((i, e))
+                updates[i] = self.updates(states_in[i], steps[i].state_out)
+                self.progress_bar.end_stage()
+
+        if len(errors) != 0:
+            _, error = min(errors, key=lambda error: error[0])
+            if isinstance(error, StepException):
+                raise FlowException(str(error)) from None
+            raise FlowError(str(error)) from None
+        if len(deferred_errors) != 0:
+            raise FlowError(
+                "One or more deferred errors were encountered:\n"
+                + "\n".join(message for _, message in sorted(deferred_errors))
+            )
+
+        debug(f"Run concluded ▶ '{self.run_dir}'")
+        final_state = self.merge(initial_state, updates, range(len(self.Steps)))
+        try:
+            final_state.save_snapshot(os.path.join(self.run_dir, "final"))
+        except Exception as e:
+            raise FlowException(f"Failed to save final views: {e}")
+        success("Flow complete.")
+        return final_state, [steps[i] for i in sorted(steps)]
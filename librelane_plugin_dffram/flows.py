@@ -2,46 +2,66 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright ©2020-2025, The American University in Cairo
 # Copyright ©2023 Efabless Corporation
-from librelane.flows import SequentialFlow, Flow
+from librelane.flows import Flow
 from librelane.steps import Yosys, OpenROAD, Magic, KLayout, Netgen, Odb, Checker, Misc
 
 from . import steps as DFFRAM
+from .cache import HITS, MISSES, cached
+from .dag import DAGFlow
 
 
 @Flow.factory.register()
-class DFFRAMFlow(SequentialFlow):
+class DFFRAMFlow(DAGFlow):
     Steps = [
-        Yosys.Synthesis,
-        Misc.LoadBaseSDC,
-        OpenROAD.STAPrePNR,
-        DFFRAM.Floorplan,
-        DFFRAM.PlaceRAM,
-        DFFRAM.Floorplan,
-        DFFRAM.PlaceRAM,
-        OpenROAD.IOPlacement,
-        Odb.CustomIOPlacement,
-        OpenROAD.GeneratePDN,
-        OpenROAD.STAMidPNR,
-        OpenROAD.GlobalRouting,
-        OpenROAD.STAMidPNR,
-        OpenROAD.DetailedRouting,
-        Checker.TrDRC,
-        Odb.ReportDisconnectedPins,
-        Checker.DisconnectedPins,
-        Odb.ReportWireLength,
-        Checker.WireLength,
-        OpenROAD.RCX,
-        OpenROAD.STAPostPNR,
-        OpenROAD.IRDropReport,
-        Magic.StreamOut,
-        Magic.WriteLEF,
-        KLayout.StreamOut,
-        KLayout.XOR,
-        Checker.XOR,
-        Magic.DRC,
-        Checker.MagicDRC,
-        Magic.SpiceExtraction,
-        Checker.IllegalOverlap,
-        Netgen.LVS,
-        Checker.LVS,
+        cached(Step)
+        for Step in [
+            Yosys.Synthesis,
+            Misc.LoadBaseSDC,
+            OpenROAD.STAPrePNR,
+            DFFRAM.Floorplan,
+            DFFRAM.PlaceRAM,
+            OpenROAD.IOPlacement,
+            Odb.CustomIOPlacement,
+            OpenROAD.GeneratePDN,
+            OpenROAD.STAMidPNR,
+            OpenROAD.GlobalRouting,
+            OpenROAD.STAMidPNR,
+            OpenROAD.DetailedRouting,
+            Checker.TrDRC,
+            Odb.ReportDisconnectedPins,
+            Checker.DisconnectedPins,
+            Odb.ReportWireLength,
+            Checker.WireLength,
+            OpenROAD.RCX,
+            OpenROAD.STAPostPNR,
+            OpenROAD.IRDropReport,
+            Magic.StreamOut,
+            Magic.WriteLEF,
+            KLayout.StreamOut,
+            KLayout.XOR,
+            Checker.XOR,
+            Magic.DRC,
+            Checker.MagicDRC,
+            Magic.SpiceExtraction,
+            Checker.IllegalOverlap,
+            Netgen.LVS,
+            Checker.LVS,
+        ]
     ]
+
+    # Once routed and checked, the layout is only read: parasitics, the
+    # streamed-out layouts and the checks of each run side by side. The
+    # layout KLayout streams out is the one checked, as it replaces Magic's
+    # in the state.
+    Dependencies = {
+        "OpenROAD.RCX": ["Checker.WireLength"],
+        "OpenROAD.IRDropReport": ["OpenROAD.RCX"],
+        "Magic.StreamOut": ["Checker.WireLength"],
+        "KLayout.StreamOut": ["Checker.WireLength"],
+        "KLayout.XOR": ["Magic.StreamOut", "KLayout.StreamOut"],
+        "Magic.DRC": ["KLayout.StreamOut"],
+        "Magic.SpiceExtraction": ["KLayout.StreamOut"],
+        "Checker.IllegalOverlap": ["Magic.SpiceExtraction"],
+        "Netgen.LVS": ["Magic.SpiceExtraction"],
+    }
+    Accumulated = [HITS, MISSES]
@@ -0,0 +1,212 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+"""
+Splits the elaboration of a model into pieces that can be shared across sizes.
+
+A piece is a module that passes the synthesis parameters on, unchanged
+(``RAM32 #(.USE_LATCH(USE_LATCH), .WSIZE(WSIZE))``), to submodules that pass
+them on in turn, so its flattened netlist only depends on its own source and
+on the values of those parameters: a RAM512 is the same in a 1024 and a
+2048-word RAM of the same width. Words and bytes are too small to be worth
+elaborating on their own, and are left to the pieces that instantiate them.
+Each piece is elaborated and flattened once, then instantiated by name, without
+parameters, wherever the model instantiated the module.
+
+Flattening a parent over flat pieces names cells exactly as flattening the
+whole model at once would, so the placer's patterns still match.
+"""
+
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+MODULE_RX = re.compile(r"^\s*module\s+(\w+)(.*?)^\s*endmodule", re.M | re.S)
+INSTANCE_RX = re.compile(r"\b(\w+)(\s*#\s*\(((?:\s*\.\w+\s*\(\s*\w+\s*\)\s*,?)+)\))")
+CONNECTION_RX = re.compile(r"\.(\w+)\s*\(\s*(\w+)\s*\)")
+
+Piece = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# What Yosys' proc does, as librelane runs it pass by pass
+PROC_PASSES = [
+    "proc_clean",
+    "proc_rmdead",
+    "proc_prune",
+    "proc_init",
+    "proc_arst",
+    "proc_rom",
+    "proc_mux",
+    "proc_dlatch",
+    "proc_dff",
+    "proc_memwr",
+    "proc_clean",
+    "opt_expr",
+]
+
+
+def parse_parameters(synth_parameters: Iterable[str]) -> Dict[str, str]:
+    """
+    >>> parse_parameters(["WSIZE=4", "USE_LATCH=1"])
+    {'WSIZE': '4', 'USE_LATCH': '1'}
+    """
+    result = {}
+    for parameter in synth_parameters:
+        name, value = parameter.split("=", 1)
+        result[name.strip()] = value.strip()
+    return result
+
+
+def forwarded(parameter_list: str, parameters: Mapping[str, str]) -> List[str]:
+    """
+    Returns the parameters a parameter list passes on unchanged, or an empty
+    list if it sets any parameter to anything else.
+
+    >>> forwarded(".USE_LATCH(USE_LATCH), .WSIZE(WSIZE)", {"WSIZE": "4", "USE_LATCH": "1"})
+    ['USE_LATCH', 'WSIZE']
+    >>> forwarded(".WIDTH(WSIZE)", {"WSIZE": "4"})
+    []
+    """
+    names = []
+    for name, value in CONNECTION_RX.findall(parameter_list):
+        if name != value or name not in parameters:
+            return []
+        names.append(name)
+    return names
+
+
+def piece_name(piece: Piece) -> str:
+    """
+    >>> piece_name(("RAM32", (("USE_LATCH", "1"), ("WSIZE", "4"))))
+    'RAM32__USE_LATCH_1__WSIZE_4'
+    """
+    module, parameters = piece
+    return "__".join([module] + [re.sub(r"\W", "_", f"{k}_{v}") for k, v in parameters])
+
+
+def elaboration_script(
+    top: str,
+    parameters: Mapping[str, str],
+    sources: Iterable[str],
+    libs: Iterable[str],
+    output: str,
+    defines: Iterable[str] = (),
+    includes: Iterable[str] = (),
+    piece: Optional[str] = None,
+) -> List[str]:
+    """
+    Returns the Yosys script librelane's synthesis runs to elaborate and
+    flatten ``top`` with ``SYNTH_ELABORATE_ONLY`` and
+    ``SYNTH_ELABORATE_FLATTEN``. With ``piece``, the flattened module is
+    renamed to it and written as is instead, to be read by the pieces above
+    it as one of their ``sources``.
+
+    >>> script = elaboration_script("RAM8", {"WSIZE": "1"}, ["ram.v"], [], "out.v")
+    >>> script[:3]
+    ['read_verilog -defer -noautowire -sv ram.v', 'chparam -set WSIZE 1 RAM8', 'hierarchy -check -top RAM8 -nokeep_prints -nokeep_asserts']
+    >>> script[-4:]
+    ['setattr -set keep 1', 'splitnets', 'opt_clean -purge', 'write_verilog -noattr -nohex -nodec -defparam out.v']
+    """
+    script = [
+        f"read_liberty -lib -ignore_miss_dir -setattr blackbox {lib}" for lib in libs
+    ]
+    flags = [f"-I{include}" for include in includes] + [f"-D{d}" for d in defines]
+    for source in sources:
+        script.append(
+            " ".join(
+                ["read_verilog", "-defer", "-noautowire", "-sv"] + flags + [source]
+            )
+        )
+    for name, value in parameters.items():
+        script.append(f"chparam -set {name} {value} {top}")
+    script += [
+        f"hierarchy -check -top {top} -nokeep_prints -nokeep_asserts",
+        f"rename -top {top}",
+        *PROC_PASSES,
+        "flatten -noscopeinfo",
+    ]
+    if piece is not None:
+        return script + [
+            f"rename -top {piece}",
+            f"write_verilog -noattr -nohex -nodec {output}",
+        ]
+    return script + [
+        "setattr -set keep 1",
+        "splitnets",
+        "opt_clean -purge",
+        f"write_verilog -noattr -nohex -nodec -defparam {output}",
+    ]
+
+
+class Model(object):
+    """
+    The modules of a set of Verilog sources, and the pieces each of them
+    instantiates for a given set of parameter values.
+    """
+
+    def __init__(self, sources: Iterable[str], parameters: Mapping[str, str]):
+        self.parameters = dict(parameters)
+        self.bodies: Dict[str, str] = {}
+        for source in sources:
+            for match in MODULE_RX.finditer(source):
+                self.bodies[match.group(1)] = match.group(2)
+
+        self.children: Dict[str, List[Piece]] = {}
+        for module, body in self.bodies.items():
+            children = []
+            for match in INSTANCE_RX.finditer(body):
+                child = self.piece_of(match)
+                if child is not None and child not in children:
+                    children.append(child)
+            self.children[module] = children
+
+        self.pieces: Set[str] = set()
+        for module, children in self.children.items():
+            if any(self.forwards(child) for child, _ in children):
+                self.pieces.add(module)
+
+    def piece_of(self, match: re.Match):
+        module = match.group(1)
+        names = forwarded(match.group(3), self.parameters)
+        if module not in self.bodies or len(names) == 0:
+            return None
+        return module, tuple((name, self.parameters[name]) for name in names)
+
+    def forwards(self, module: str) -> bool:
+        return len(self.children.get(module, [])) != 0
+
+    def pieces_of(self, module: str) -> List[Piece]:
+        """
+        Returns the pieces ``module`` instantiates directly.
+        """
+        return [child for child in self.children[module] if child[0] in self.pieces]
+
+    def order(self, top: str) -> List[Piece]:
+        """
+        Returns every piece under ``top``, each after the pieces it
+        instantiates.
+        """
+        result: List[Piece] = []
+
+        def visit(piece: Piece):
+            if piece in result:
+                return
+            for child in self.pieces_of(piece[0]):
+                visit(child)
+            result.append(piece)
+
+        for piece in self.pieces_of(top):
+            visit(piece)
+        return result
+
+    def rewrite(self, source: str) -> str:
+        """
+        Replaces every parameterized instance of a piece in ``source`` with an
+        instance of the piece's flattened module.
+        """
+
+        def replace(match: re.Match) -> str:
+            piece = self.piece_of(match)
+            if piece is None or piece[0] not in self.pieces:
+                return match.group(0)
+            return piece_name(piece)
+
+        return INSTANCE_RX.sub(replace, source)
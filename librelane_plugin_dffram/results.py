@@ -0,0 +1,422 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+"""
+A local SQLite store of hardening runs, so results across sweeps can be
+queried without rescanning run directories.
+
+``dffram.py`` adds a record after every run: the platform, building blocks,
+size, variant and storage type, the commit, the time, CPU time and peak RSS
+of every step and the final metrics, the placer's included. Run directories
+from before can be added with ``add``:
+
+    python3 -m librelane_plugin_dffram.results add build/*/*/runs/*
+
+and the store queried with ``best-density``, ``trend`` and ``slowest-steps``.
+"""
+
+import os
+import re
+import glob
+import json
+import sqlite3
+import datetime
+import subprocess
+from typing import Any, Dict, Iterable, List, Optional
+
+import click
+
+DEFAULT_DATABASE = os.path.join("build", "results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_dir TEXT UNIQUE NOT NULL,
+    recorded_at TEXT NOT NULL,
+    git_commit TEXT,
+    pdk TEXT,
+    scl TEXT,
+    building_blocks TEXT,
+    design TEXT,
+    size TEXT,
+    words INTEGER,
+    width INTEGER,
+    variant TEXT,
+    storage TEXT,
+    wall_time REAL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    ordinal TEXT NOT NULL,
+    step TEXT NOT NULL,
+    wall_time REAL,
+    cpu_time REAL,
+    peak_rss INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value
+);
+CREATE INDEX IF NOT EXISTS runs_design ON runs(size, variant, storage);
+CREATE INDEX IF NOT EXISTS steps_run ON steps(run_id);
+CREATE INDEX IF NOT EXISTS metrics_run_name ON metrics(run_id, name);
+"""
+
+SIZE_UNITS = {"B": 0, "KiB": 1, "MiB": 2, "GiB": 3, "TiB": 4, "PiB": 5, "EiB": 6}
+
+
+def parse_elapsed_time(string: str) -> float:
+    """
+    Parses librelane's ``HH:MM:SS.mmm`` into seconds.
+
+    >>> parse_elapsed_time("01:02:03.500")
+    3723.5
+    """
+    hours, minutes, seconds = string.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def parse_size(string: str) -> int:
+    """
+    Parses librelane's sizes into bytes. librelane rounds them down to a
+    whole unit.
+
+    >>> parse_size("512MiB")
+    536870912
+    """
+    match = re.fullmatch(r"(\d+)([A-Za-z]+)", string)
+    if match is None:
+        raise ValueError(f"Invalid size '{string}'.")
+    return int(match[1]) * 1024 ** SIZE_UNITS[match[2]]
+
+
+def step_resources(run_dir: str) -> List[Dict[str, Any]]:
+    """
+    The wall time, CPU time and peak RSS of every step in ``run_dir`` that
+    ran, from the ``runtime.txt`` and subprocess statistics librelane leaves
+    in step directories. Steps that run no subprocess, or were restored from
+    the step cache, have no CPU time or peak RSS.
+    """
+    steps = []
+    for step_dir in sorted(glob.glob(os.path.join(run_dir, "[0-9]*-*"))):
+        runtime_file = os.path.join(step_dir, "runtime.txt")
+        if not os.path.isfile(runtime_file):
+            continue
+        cpu_time: Optional[float] = None
+        peak_rss: Optional[int] = None
+        for stats_file in glob.glob(os.path.join(step_dir, "*.process_stats.json")):
+            with open(stats_file, encoding="utf8") as f:
+                stats = json.load(f)
+            process_cpu_time = parse_elapsed_time(
+                stats["time"]["cpu_time_user"]
+            ) + parse_elapsed_time(stats["time"]["cpu_time_system"])
+            process_peak_rss = parse_size(stats["peak_resources"]["memory_rss"])
+            cpu_time = (cpu_time or 0) + process_cpu_time
+            peak_rss = max(peak_rss or 0, process_peak_rss)
+        with open(runtime_file, encoding="utf8") as f:
+            wall_time = parse_elapsed_time(f.read().strip())
+        steps.append(
+            {
+                "step": os.path.basename(step_dir),
+                "wall_time": wall_time,
+                "cpu_time": cpu_time,
+                "peak_rss": peak_rss,
+            }
+        )
+    return steps
+
+
+def git_commit(path: str) -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=path,
+            encoding="utf8",
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return None
+
+
+def connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # Runs of a batch finish concurrently: wait for each other's writes
+    connection = sqlite3.connect(path, timeout=60)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def run_fields(run_dir: str) -> Dict[str, Any]:
+    """
+    The fields of a run of ``DFFRAMFlow``, from its resolved configuration.
+    """
+    with open(os.path.join(run_dir, "resolved.json"), encoding="utf8") as f:
+        config = json.load(f)
+    return {
+        "pdk": config.get("PDK"),
+        "scl": config.get("STD_CELL_LIBRARY"),
+        "building_blocks": config.get("BUILDING_BLOCKS"),
+        "design": config.get("DESIGN_NAME"),
+        "size": config.get("RAM_SIZE"),
+        "variant": config.get("RAM_VARIANT"),
+        "storage": "latch" if config.get("RAM_USE_LATCH") else "dff",
+    }
+
+
+def record(
+    database: str,
+    run_dir: str,
+    commit: Optional[str] = None,
+    wall_time: Optional[float] = None,
+    **fields,
+):
+    """
+    Adds the run in ``run_dir`` to ``database``, replacing any earlier record
+    of it. ``fields`` override those read from the run's configuration, for
+    flows other than ``DFFRAMFlow``.
+    """
+    run_dir = os.path.abspath(run_dir)
+    try:
+        run = run_fields(run_dir)
+    except (OSError, ValueError):
+        run = {}
+    run.update(fields)
+    if run.get("variant") is None:
+        run["variant"] = "DEFAULT"
+    words = width = None
+    if run.get("size") is not None:
+        words, width = [int(value) for value in run["size"].split("x")]
+
+    metrics: Dict[str, Any] = {}
+    metrics_file = os.path.join(run_dir, "final", "metrics.json")
+    if os.path.isfile(metrics_file):
+        with open(metrics_file, encoding="utf8") as f:
+            metrics = json.load(f)
+    recorded_at = datetime.datetime.fromtimestamp(
+        os.path.getmtime(metrics_file if metrics else run_dir)
+    ).isoformat(timespec="seconds")
+
+    connection = connect(database)
+    with connection:
+        connection.execute("DELETE FROM runs WHERE run_dir = ?", (run_dir,))
+        run_id = connection.execute(
+            "INSERT INTO runs (run_dir, recorded_at, git_commit, pdk, scl, building_blocks, design, size, words, width, variant, storage, wall_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_dir,
+                recorded_at,
+                commit,
+                run.get("pdk"),
+                run.get("scl"),
+                run.get("building_blocks"),
+                run.get("design"),
+                run.get("size"),
+                words,
+                width,
+                run["variant"],
+                run.get("storage"),
+                wall_time,
+            ),
+        ).lastrowid
+        connection.executemany(
+            "INSERT INTO steps (run_id, ordinal, step, wall_time, cpu_time, peak_rss) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id,
+                    *step["step"].split("-", 1),
+                    step["wall_time"],
+                    step["cpu_time"],
+                    step["peak_rss"],
+                )
+                for step in step_resources(run_dir)
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+            [
+                (
+                    run_id,
+                    name,
+                    (
+                        value
+                        if value is None or isinstance(value, (int, float, str))
+                        else json.dumps(value)
+                    ),
+                )
+                for name, value in metrics.items()
+            ],
+        )
+    connection.close()
+
+
+def print_table(header: Iterable[str], rows: Iterable[Iterable[Any]]):
+    def cell(value: Any) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, float):
+            return f"{value:.4g}"
+        return str(value)
+
+    table = [list(header)] + [[cell(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(table[0]))]
+    for row in table:
+        print(
+            "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        )
+
+
+def design_filter(size, variant, storage):
+    conditions = []
+    parameters = []
+    for column, value in [("size", size), ("variant", variant), ("storage", storage)]:
+        if value is not None:
+            conditions.append(f"runs.{column} = ?")
+            parameters.append(value)
+    return " AND ".join(conditions or ["1"]), parameters
+
+
+@click.group()
+@click.option(
+    "--database",
+    default=DEFAULT_DATABASE,
+    show_default=True,
+    help="The SQLite database the results are stored in.",
+)
+@click.pass_context
+def cli(ctx, database):
+    ctx.obj = database
+
+
+@cli.command("add")
+@click.option(
+    "--commit",
+    default=None,
+    help="The commit the runs were made at. Unknown unless given.",
+)
+@click.argument("run_dirs", nargs=-1, required=True)
+@click.pass_obj
+def add_cmd(database, commit, run_dirs):
+    """
+    Adds finished runs of DFFRAMFlow to the database.
+    """
+    added = 0
+    for run_dir in run_dirs:
+        if not os.path.isfile(os.path.join(run_dir, "resolved.json")):
+            print(f"Skipping '{run_dir}': not a run directory.")
+            continue
+        record(database, run_dir, commit=commit)
+        added += 1
+    print(f"Added {added} run(s) to '{database}'.")
+
+
+@cli.command("best-density")
+@click.option("-v", "--variant", default=None)
+@click.option("--storage", type=click.Choice(["latch", "dff"]), default=None)
+@click.pass_obj
+def best_density_cmd(database, variant, storage):
+    """
+    The best density reached for every size.
+    """
+    where, parameters = design_filter(None, variant, storage)
+    connection = connect(database)
+    rows = connection.execute(
+        f"""
+        SELECT runs.pdk, runs.scl, runs.building_blocks, runs.size, runs.variant,
+            runs.storage, MAX(metrics.value), runs.git_commit, runs.recorded_at
+        FROM runs JOIN metrics ON metrics.run_id = runs.id
+        WHERE metrics.name = 'dffram__logic__density' AND {where}
+        GROUP BY runs.pdk, runs.scl, runs.building_blocks, runs.size,
+            runs.variant, runs.storage
+        ORDER BY runs.words * runs.width, runs.size, runs.variant
+        """,
+        parameters,
+    ).fetchall()
+    print_table(
+        [
+            "pdk",
+            "scl",
+            "blocks",
+            "size",
+            "variant",
+            "storage",
+            "density",
+            "commit",
+            "recorded",
+        ],
+        [row[:7] + (row[7] and row[7][:10],) + row[8:] for row in rows],
+    )
+
+
+@cli.command("trend")
+@click.option("-s", "--size", default=None)
+@click.option("-v", "--variant", default=None)
+@click.option("--storage", type=click.Choice(["latch", "dff"]), default=None)
+@click.pass_obj
+def trend_cmd(database, size, variant, storage):
+    """
+    The wall time and density of every run, oldest first.
+    """
+    where, parameters = design_filter(size, variant, storage)
+    connection = connect(database)
+    rows = connection.execute(
+        f"""
+        SELECT runs.recorded_at, runs.git_commit, runs.size, runs.variant,
+            runs.storage, runs.wall_time,
+            (SELECT SUM(steps.wall_time) FROM steps WHERE steps.run_id = runs.id),
+            (SELECT metrics.value FROM metrics WHERE metrics.run_id = runs.id
+                AND metrics.name = 'dffram__logic__density')
+        FROM runs
+        WHERE {where}
+        ORDER BY runs.recorded_at
+        """,
+        parameters,
+    ).fetchall()
+    print_table(
+        [
+            "recorded",
+            "commit",
+            "size",
+            "variant",
+            "storage",
+            "wall time",
+            "step time",
+            "density",
+        ],
+        [row[:1] + (row[1] and row[1][:10],) + row[2:] for row in rows],
+    )
+
+
+@cli.command("slowest-steps")
+@click.option("-s", "--size", default=None)
+@click.option("-v", "--variant", default=None)
+@click.option("--storage", type=click.Choice(["latch", "dff"]), default=None)
+@click.option("-n", "--count", default=10, show_default=True)
+@click.pass_obj
+def slowest_steps_cmd(database, size, variant, storage, count):
+    """
+    The steps that take the longest on average.
+    """
+    where, parameters = design_filter(size, variant, storage)
+    connection = connect(database)
+    rows = connection.execute(
+        f"""
+        SELECT steps.step, COUNT(*), AVG(steps.wall_time), MAX(steps.wall_time),
+            AVG(steps.cpu_time), MAX(steps.peak_rss) / 1048576.0
+        FROM steps JOIN runs ON steps.run_id = runs.id
+        WHERE {where}
+        GROUP BY steps.step
+        ORDER BY AVG(steps.wall_time) DESC
+        LIMIT ?
+        """,
+        parameters + [count],
+    ).fetchall()
+    print_table(
+        ["step", "runs", "mean time", "max time", "mean CPU time", "peak RSS (MiB)"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,362 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+Times the placer on a synthetic netlist and a mock database, outside of
+OpenROAD:
+
+    python3 -m placeram.bench --size 32x32
+
+Everything the placer does between reading the ODB and applying the plan is
+run, one phase at a time, and the results are printed as JSON.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import resource
+import tracemalloc
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import click
+import yaml
+
+from . import mock_odb
+
+try:
+    import odb  # noqa: F401
+except ImportError:
+    # Placeram only needs odb's names to resolve; the database is the mock.
+    sys.modules["odb"] = mock_odb
+
+from . import data
+from .row import Row, RowArray
+from .plan import PlacementPlan
+from .masters import MasterTable
+from .reg_data import DFFRF
+from .classifier import Classifier
+from .util import eprint
+from .synthetic import SyntheticNetlist, read_lef_sites
+
+
+def max_rss_kib() -> int:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB everywhere else
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+class MissingMasterError(Exception):
+    pass
+
+
+class MockDesign(object):
+    """
+    A floorplanned, unplaced mock database for a synthetic netlist: a square
+    core of ``core_size`` µm (the size DFFRAM.Floorplan falls back to) cut
+    into alternately flipped rows.
+
+    ``library`` holds the width in sites of every master available, by
+    name; like in ``Placer``, the fill, decap and tap cells are picked out
+    of it with the platform's regular expressions.
+    """
+
+    def __init__(
+        self,
+        netlist: SyntheticNetlist,
+        tech: Dict,
+        library: Dict[str, int],
+        core_size: float = 20000,
+        halo: float = 2.5,
+        def_units: int = 1000,
+    ):
+        site = tech["site"]
+        self.site = mock_odb.dbSite(
+            site["name"],
+            round(site["width"] * def_units),
+            round(site["height"] * def_units),
+        )
+        self.block = mock_odb.dbBlock("top", def_units)
+        self.fill_cell_data: Dict[str, str] = tech["fills"]
+        self.tap_distance: int = tech["tap_distance"] * def_units
+
+        self.masters: Dict[str, mock_odb.dbMaster] = {
+            name: mock_odb.dbMaster(
+                name, sites * self.site.getWidth(), self.site.getHeight()
+            )
+            for name, sites in library.items()
+        }
+        for name, master in netlist.cells:
+            if master not in self.masters:
+                raise MissingMasterError(f"Master {master} not found.")
+            mock_odb.dbInst_create(self.block, self.masters[master], name)
+
+        self.fill_cells_by_sites: Dict[int, mock_odb.dbMaster] = {}
+        self.tap_width = None
+        for kind in ["fill", "decap", "tap"]:
+            for name, master in self.masters.items():
+                match_info = re.match(self.fill_cell_data[kind], name)
+                if match_info is None:
+                    continue
+                if kind == "tap":
+                    self.tap_width = library[name]
+                    self.fill_cells_by_sites[self.tap_width] = master
+                else:
+                    self.fill_cells_by_sites[int(match_info[1])] = master
+        if self.tap_width is None:
+            raise MissingMasterError("No tap cells found.")
+
+        margin = round(halo * def_units)
+        core = round(core_size * def_units)
+        row_sites = core // self.site.getWidth()
+        for i in range(core // self.site.getHeight()):
+            self.block.rows.append(
+                mock_odb.dbRow(
+                    f"ROW_{i}",
+                    self.site,
+                    margin,
+                    margin + i * self.site.getHeight(),
+                    "R0" if i % 2 == 0 else "MX",
+                    row_sites,
+                )
+            )
+        self.block.setDieArea(mock_odb.Rect(0, 0, core + 2 * margin, core + 2 * margin))
+
+
+class PhaseTimer(object):
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.phases: Dict[str, Dict] = {}
+
+    def run(self, name: str, fn: Callable, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        phase = {"time": elapsed}
+        if self.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            phase["peak_memory"] = peak
+        self.phases[name] = phase
+        return result
+
+
+def place(
+    design: MockDesign,
+    word_count: int,
+    register_file: bool,
+    timer: Optional[PhaseTimer] = None,
+) -> Tuple[MasterTable, PlacementPlan, RowArray, int]:
+    """
+    Places and fills ``design`` as ``Placer`` does, timing every phase with
+    ``timer`` if one is given.
+
+    Returns the master table, the plan, the rows and the number of rows
+    used.
+    """
+    timer = timer or PhaseTimer(False)
+    block = design.block
+    instances = block.getInsts()
+
+    def setup() -> Tuple[MasterTable, PlacementPlan, RowArray]:
+        masters = MasterTable(
+            design.masters.values(), design.site.getWidth(), design.fill_cell_data
+        )
+        masters.index_instances(instances)
+        plan = PlacementPlan.for_instances(instances)
+        fill_masters = {
+            sites: masters[cell.getName()]
+            for sites, cell in design.fill_cells_by_sites.items()
+        }
+        rows = Row.from_odb(
+            block.getRows(),
+            design.site,
+            design.tap_distance,
+            fill_masters,
+            design.tap_width,
+            plan,
+            masters,
+        )
+        return masters, plan, rows
+
+    if register_file:
+        kind, kwargs = DFFRF, {}
+    else:
+        kind, kwargs = data.hierarchy_kind(word_count)
+
+    masters, plan, rows = timer.run("setup", setup)
+    root = timer.run("sieve", lambda: Classifier(kind, **kwargs).classify(instances))
+    hierarchy = timer.run("hierarchy", kind, root, **kwargs)
+    del root
+    last_row = timer.run("place", hierarchy.place, rows)
+    timer.run("fill", Row.fill_rows, rows, 0, last_row)
+    return masters, plan, rows, last_row
+
+
+def benchmark(
+    design: MockDesign,
+    word_count: int,
+    register_file: bool,
+    trace_memory: bool = False,
+) -> Dict:
+    """
+    Runs the phases of ``Placer`` on ``design``, returning the time (and, if
+    ``trace_memory``, the peak traced memory) of each.
+    """
+    timer = PhaseTimer(trace_memory)
+    instances = design.block.getInsts()
+    baseline_rss = max_rss_kib()
+
+    start = time.perf_counter()
+    masters, plan, rows, last_row = place(design, word_count, register_file, timer)
+
+    def density() -> float:
+        width = rows.widest()
+        height = rows.ymax[last_row - 1] - rows[0].y
+        plan.width, plan.height = width, height
+        # The die the placer would suggest, with the same margins as the core
+        die_area = (width + 2 * rows.xmin[0]) * (height + 2 * rows.ymin[0])
+        logical_area = 0
+        for instance in instances:
+            master = masters.of(instance)
+            if not master.is_filler:
+                logical_area += master.area
+        return logical_area / die_area
+
+    result = timer.run("density", density)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "instances": len(instances),
+        "fills": len(plan.fill_kind),
+        "rows": last_row,
+        "width": plan.width,
+        "height": plan.height,
+        "density": result,
+        "fills_saved": Row.fills_saved,
+        "taps_saved": Row.taps_saved,
+        "time": elapsed,
+        "peak_rss": max_rss_kib() * 1024,
+        "rss_growth": (max_rss_kib() - baseline_rss) * 1024,
+        "phases": timer.phases,
+    }
+
+
+def load_design(
+    building_blocks: str,
+    size: str,
+    variant: Optional[str],
+    latch: bool,
+    input_lefs: Sequence[str],
+    core_size: float = 20000,
+) -> Tuple[MockDesign, int, bool]:
+    """
+    Builds the mock database for a design from the command-line options
+    shared by the offline tools, exiting on invalid ones.
+
+    Masters are read from ``input_lefs``, or the built-in widths are used
+    if there are none.
+    """
+    pdk, scl, blocks = building_blocks.split(":")
+    platform_tech_file = os.path.join(".", "platforms", pdk, scl, "tech.yml")
+    blocks_config_file = os.path.join(".", "models", blocks, "config.yml")
+    for file in [platform_tech_file, blocks_config_file]:
+        if not os.path.isfile(file):
+            eprint(f"{file} not found.")
+            exit(os.EX_NOINPUT)
+    platform_tech_config = yaml.safe_load(open(platform_tech_file))
+    blocks_config = yaml.safe_load(open(blocks_config_file))
+    register_file = blocks_config.get("register_file") or False
+
+    m = re.match(r"(\d+)x(\d+)", size)
+    if m is None:
+        eprint(f"Invalid RAM size '{size}'.")
+        exit(os.EX_USAGE)
+    words = int(m[1])
+    word_length = int(m[2])
+
+    netlist = SyntheticNetlist.for_model(
+        words, word_length, variant, register_file, latch
+    )
+    if len(input_lefs):
+        library = read_lef_sites(input_lefs, platform_tech_config["site"]["width"])
+    else:
+        library = netlist.library()
+
+    try:
+        design = MockDesign(netlist, platform_tech_config, library, core_size=core_size)
+    except MissingMasterError as e:
+        eprint(f"Cannot build {size} with {building_blocks}: {e}")
+        exit(os.EX_DATAERR)
+    return design, words, register_file
+
+
+@click.command()
+@click.option("-s", "--size", required=True, help="RAM Size (ex. 8x32, 16x32…)")
+@click.option(
+    "-v",
+    "--variant",
+    default=None,
+    help="Variant, as listed in the building blocks' config.yml.",
+)
+@click.option(
+    "-b",
+    "--building-blocks",
+    default="sky130A:sky130_fd_sc_hd:ram",
+    help="Format <pdk>:<scl>:<name> : Name of the building blocks to use.",
+)
+@click.option("--latch/--dff", default=True, help="Whether to use latches or dffs")
+@click.option(
+    "-l",
+    "--input-lef",
+    "input_lefs",
+    default=[],
+    help="LEF files to read the width of masters from. The built-in widths of sky130_fd_sc_hd are used if none are given.",
+    multiple=True,
+    type=str,
+)
+@click.option(
+    "--core-size",
+    default=20000.0,
+    help="Side of the square core the rows are cut from, in µm.",
+)
+@click.option(
+    "--trace-memory/--no-trace-memory",
+    default=False,
+    help="Record the peak memory of every phase with tracemalloc. Phases run considerably slower.",
+)
+@click.option("-o", "--output", default=None, help="JSON file to write to.")
+def cli(
+    size,
+    variant,
+    building_blocks,
+    latch,
+    input_lefs,
+    core_size,
+    trace_memory,
+    output,
+):
+    design, words, register_file = load_design(
+        building_blocks, size, variant, latch, input_lefs, core_size
+    )
+
+    result = {
+        "building_blocks": building_blocks,
+        "size": size,
+        "variant": variant,
+        "latch": latch,
+    }
+    result.update(benchmark(design, words, register_file, trace_memory))
+
+    if output is None:
+        print(json.dumps(result, indent=2))
+    else:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    cli()
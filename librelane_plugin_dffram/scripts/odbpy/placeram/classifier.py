@@ -0,0 +1,160 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+from odb import dbInst as Instance
+from typing import Dict, List, Tuple, Type, Optional
+
+from .placeable import Placeable, DataError
+
+Kind = Tuple[Type[Placeable], Dict]
+
+
+class SieveNode(object):
+    """
+    The instances sieved into one Placeable, indexed by variable.
+
+    Variables of sieves with a ``child`` hold SieveNodes (or nested
+    dictionaries of SieveNodes) instead of instances. Variables of sieves with
+    groups hold dictionaries nested once per group, keyed by group value.
+    """
+
+    __slots__ = ("kind", "sieves", "patterns", "variables", "elements")
+
+    def __init__(self, classifier: "Classifier", kind: Kind):
+        self.kind = kind
+        self.sieves, self.patterns, self.variables = classifier.sieves_for(kind)
+        self.elements: Dict[str, object] = {}
+        for sieve in self.sieves:
+            depth = len(sieve.groups)
+            if depth != 0:
+                self.elements[sieve.variable] = {}
+            elif sieve.child is not None:
+                self.elements[sieve.variable] = SieveNode(
+                    classifier, (sieve.child, sieve.child_args)
+                )
+            else:
+                self.elements[sieve.variable] = None
+
+    def store(self, sieve: Placeable.Sieve, access_order: List[str], value):
+        if len(access_order) == 0:
+            self.elements[sieve.variable] = value
+            return
+        last_access = access_order[-1]
+        accessible = self.elements[sieve.variable]
+        for access in access_order[:-1]:
+            accessible = accessible.setdefault(access, {})
+        accessible[last_access] = value
+
+    def descend(
+        self,
+        classifier: "Classifier",
+        sieve: Placeable.Sieve,
+        access_order: List[str],
+    ) -> "SieveNode":
+        if len(access_order) == 0:
+            return self.elements[sieve.variable]
+        accessible = self.elements[sieve.variable]
+        for access in access_order[:-1]:
+            accessible = accessible.setdefault(access, {})
+        child = accessible.get(access_order[-1])
+        if child is None:
+            child = SieveNode(classifier, (sieve.child, sieve.child_args))
+            accessible[access_order[-1]] = child
+        return child
+
+
+class Classifier(object):
+    """
+    Parses every instance name exactly once into its full hierarchical path,
+    building a tree of :class:`SieveNode` that Placeables are then constructed
+    from without any further regular expression work.
+
+    Two memos keep the per-instance cost independent of the hierarchy's depth:
+
+    * ``scopes`` maps a name prefix that ends in a child's match (e.g.
+      ``SLICE\\[1\\].RAM8.WORD\\[3\\]``) to the node it descended into, so
+      instances sharing a prefix skip straight to their deepest known scope.
+    * ``leaves`` maps a name suffix below a scope (e.g. ``].STORAGE``) to the
+      sieve it falls into, as the same suffixes repeat in every bit, byte and
+      word.
+    """
+
+    def __init__(self, kind: Type[Placeable], **kwargs):
+        self.kinds: Dict[Tuple, Tuple[List[Placeable.Sieve], List, Tuple]] = {}
+        self.scopes: Dict[str, Tuple[SieveNode, int]] = {}
+        self.leaves: Dict[Tuple[int, str], Tuple[Placeable.Sieve, List[str]]] = {}
+        self.root = SieveNode(self, (kind, kwargs))
+
+    def sieves_for(self, kind: Kind):
+        cls, kwargs = kind
+        key = (cls, tuple(sorted(kwargs.items())))
+        found = self.kinds.get(key)
+        if found is None:
+            sieves = cls.sieves(**kwargs)
+            regexes = Placeable.RegexDictionary[cls.__name__]
+            patterns = [(sieve, regexes[sieve.variable]) for sieve in sieves]
+            variables = tuple(sieve.variable for sieve in sieves)
+            found = (sieves, patterns, variables)
+            self.kinds[key] = found
+        return found
+
+    def classify(self, instances: List[Instance]) -> SieveNode:
+        for instance in instances:
+            self.add(instance)
+        return self.root
+
+    def add(self, instance: Instance):
+        name = instance.getName()
+
+        node = self.root
+        position = 0
+        cut = len(name)
+        while cut > 0:
+            cut = name.rfind(".", 0, cut)
+            if cut == -1:
+                break
+            scope = self.scopes.get(name[:cut])
+            if scope is not None:
+                node, position = scope
+                break
+
+        while True:
+            memo_key: Optional[Tuple[int, str]] = None
+            if position != 0:
+                # One character of context for \b and \B at the scope boundary
+                memo_key = (id(node.sieves), name[position - 1 :])
+                memoized = self.leaves.get(memo_key)
+                if memoized is not None:
+                    sieve, access_order = memoized
+                    node.store(sieve, access_order, instance)
+                    return
+
+            for sieve, rx in node.patterns:
+                result = rx.search(name, position)
+                if result is not None:
+                    break
+            else:
+                raise DataError(
+                    "Unknown element in %s: %s" % (node.kind[0].__name__, name)
+                )
+
+            access_order = [result.group(ordinal) for ordinal in sieve.groups_rx_order]
+            if sieve.child is None:
+                if memo_key is not None:
+                    self.leaves[memo_key] = (sieve, access_order)
+                node.store(sieve, access_order, instance)
+                return
+
+            node = node.descend(self, sieve, access_order)
+            position = result.end()
+            if name.startswith(".", position):
+                self.scopes[name[:position]] = (node, position)
+
+
+def sieve_instances(kind: Type[Placeable], instances: List[Instance], **kwargs):
+    """
+    Classifies ``instances`` in a single pass and builds the Placeable
+    hierarchy rooted at ``kind``.
+    """
+    root = Classifier(kind, **kwargs).classify(instances)
+    return kind(root, **kwargs)
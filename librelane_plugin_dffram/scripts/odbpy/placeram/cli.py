@@ -4,6 +4,9 @@
 
 import os
 import re
+import math
+import time
+import tempfile
 import traceback
 
 try:
@@ -11,13 +14,11 @@ try:
     import utl
     from openroad import Tech, Design
 except ImportError:
-    print(
-        """
+    print("""
         placeram needs to be inside OpenROAD:
 
         openroad -python -m placeram [args]
-        """
-    )
+        """)
     exit(os.EX_CONFIG)
 
 try:
@@ -34,9 +35,23 @@ except ImportError:
 
 from . import data
 from .row import Row
+from .plan import PlacementPlan, PlanError
+from .plan_cache import PlanCache, fingerprint
+from .masters import MasterTable
+from .profiling import Profiler
+from .utilization import row_metrics
 
 from .util import eprint
 from .reg_data import DFFRF
+from .classifier import sieve_instances
+
+
+def emit_metrics(metrics):
+    for name, value in metrics.items():
+        if isinstance(value, int):
+            utl.metric_integer(name, value)
+        else:
+            utl.metric_float(name, value)
 
 
 class Placer:
@@ -48,48 +63,59 @@ class Placer:
         register_file,
         fill_cell_data,
         tap_distance,
+        profiler=None,
     ):
+        self.profiler = profiler or Profiler()
+
         # Initialize Database
         self.ord_tech = Tech()
         self.design = Design(self.ord_tech)
         self.db = self.ord_tech.getDB()
 
-        odb.read_db(self.db, odb_in)
-
-        # Technology Setup
-        self.libs = self.db.getLibs()
-        self.sites = []
-        self.cells = []
-        for lib in self.libs:
-            self.sites += lib.getSites()
-            self.cells += lib.getMasters()
-
-        ## Extract the fill cells for later use
-        ### We use decap cells to substitute fills wherever possible.
-        raw_fill_cells = list(
-            filter(lambda x: re.match(fill_cell_data["fill"], x.getName()), self.cells)
-        )
-        raw_decap_cells = list(
-            filter(lambda x: re.match(fill_cell_data["decap"], x.getName()), self.cells)
-        )
-        raw_tap_cells = list(
-            filter(lambda x: re.match(fill_cell_data["tap"], x.getName()), self.cells)
-        )
-        self.fill_cells_by_sites = {}
-        tap_width = None
-        for cell in raw_fill_cells:
-            match_info = re.match(fill_cell_data["fill"], cell.getName())
-            site_count = int(match_info[1])
-            self.fill_cells_by_sites[site_count] = cell
-        for cell in raw_decap_cells:
-            match_info = re.match(fill_cell_data["decap"], cell.getName())
-            site_count = int(match_info[1])
-            self.fill_cells_by_sites[site_count] = cell
-        for cell in raw_tap_cells:
-            match_info = re.match(fill_cell_data["tap"], cell.getName())
-            site_count = cell.getWidth() / self.sites[0].getWidth()
-            self.fill_cells_by_sites[site_count] = cell
-            tap_width = site_count
+        with self.profiler.phase("read_db"):
+            odb.read_db(self.db, odb_in)
+
+        with self.profiler.phase("masters"):
+            # Technology Setup
+            self.libs = self.db.getLibs()
+            self.sites = []
+            self.cells = []
+            for lib in self.libs:
+                self.sites += lib.getSites()
+                self.cells += lib.getMasters()
+
+            ## Extract the fill cells for later use
+            ### We use decap cells to substitute fills wherever possible.
+            raw_fill_cells = list(
+                filter(
+                    lambda x: re.match(fill_cell_data["fill"], x.getName()), self.cells
+                )
+            )
+            raw_decap_cells = list(
+                filter(
+                    lambda x: re.match(fill_cell_data["decap"], x.getName()), self.cells
+                )
+            )
+            raw_tap_cells = list(
+                filter(
+                    lambda x: re.match(fill_cell_data["tap"], x.getName()), self.cells
+                )
+            )
+            self.fill_cells_by_sites = {}
+            tap_width = None
+            for cell in raw_fill_cells:
+                match_info = re.match(fill_cell_data["fill"], cell.getName())
+                site_count = int(match_info[1])
+                self.fill_cells_by_sites[site_count] = cell
+            for cell in raw_decap_cells:
+                match_info = re.match(fill_cell_data["decap"], cell.getName())
+                site_count = int(match_info[1])
+                self.fill_cells_by_sites[site_count] = cell
+            for cell in raw_tap_cells:
+                match_info = re.match(fill_cell_data["tap"], cell.getName())
+                site_count = cell.getWidth() / self.sites[0].getWidth()
+                self.fill_cells_by_sites[site_count] = cell
+                tap_width = site_count
 
         fill_cell_sizes = list(self.fill_cells_by_sites.keys())
 
@@ -103,51 +129,272 @@ class Placer:
         self.instances = self.block.getInsts()
         eprint("Found %i instances…" % len(self.instances))
 
-        def create_fill(name, sites=1):
-            fill_cell = self.fill_cells_by_sites[sites]
-            return odb.dbInst_create(self.block, fill_cell, name)
-
         self.micron_in_dbus: int = self.block.getDefUnits()
         tap_distance = self.micron_in_dbus * tap_distance
 
-        self.rows = Row.from_odb(
-            self.block.getRows(),
-            self.sites[0],
-            tap_distance,
-            create_fill,
-            fill_cell_sizes,
-            fill_cell_data["tap"],
-            tap_width,
-        )
-
-        if register_file:
-            self.hierarchy = DFFRF(self.instances)
-        else:
-            self.hierarchy = data.create_hierarchy(self.instances, word_count)
-
-        self.fill_cell_data = fill_cell_data
+        with self.profiler.phase("masters"):
+            self.masters = MasterTable(
+                self.cells, self.sites[0].getWidth(), fill_cell_data
+            )
+            self.masters.index_instances(self.instances)
+
+        with self.profiler.phase("plan"):
+            self.plan = PlacementPlan.for_instances(self.instances)
+
+        fill_masters = {
+            sites: self.masters[cell.getName()]
+            for sites, cell in self.fill_cells_by_sites.items()
+        }
+        with self.profiler.phase("rows"):
+            self.rows = Row.from_odb(
+                self.block.getRows(),
+                self.sites[0],
+                tap_distance,
+                fill_masters,
+                tap_width,
+                self.plan,
+                self.masters,
+            )
+
+        self.register_file = register_file
+        self.word_count = word_count
+        self.hierarchy = None
+
+    def create_fill(self, name, sites=1):
+        fill_cell = self.fill_cells_by_sites[sites]
+        return odb.dbInst_create(self.block, fill_cell, name)
+
+    def create_hierarchy(self):
+        if self.hierarchy is None:
+            if self.register_file:
+                self.hierarchy = sieve_instances(DFFRF, self.instances)
+            else:
+                self.hierarchy = data.create_hierarchy(self.instances, self.word_count)
+        return self.hierarchy
 
     def represent(self, file):
-        self.hierarchy.represent(file=file)
+        self.create_hierarchy().represent(file=file)
 
     def place(self):
         eprint("Starting placement…")
         print(f"Placing across {len(self.rows)} rows…")
-        last_row = self.hierarchy.place(self.rows)
+        with self.profiler.phase("hierarchy"):
+            hierarchy = self.create_hierarchy()
+        with self.profiler.phase("placement"):
+            last_row = hierarchy.place(self.rows)
 
         print(f"Placement concluded with {last_row} rows…")
-        Row.fill_rows(self.rows, 0, last_row)
+        with self.profiler.phase("fill_rows"):
+            Row.fill_rows(self.rows, 0, last_row)
+
+        # Savings over the previous greedy packing; the optimal packing may
+        # trade fills for taps, so only their sum is meaningful.
+        self.placement_metrics = {
+            "dffram__placer__filler_cells_saved": Row.fills_saved + Row.taps_saved
+        }
+        for name, value in self.placement_metrics.items():
+            utl.metric_integer(name, value)
+        eprint(
+            "Fill packing saved %i cells (%i fills, %i taps)."
+            % (Row.fills_saved + Row.taps_saved, Row.fills_saved, Row.taps_saved)
+        )
 
         # We can't rely on the fact that a placeable will probably fill
         # before returning and pick the width of the nth row or whatever.
-        width_dbus: int = 0
-        for row in self.rows:
-            width_dbus = max(row.width, width_dbus)
+        width_dbus: int = self.rows.widest()
+
+        height_dbus: int = self.rows.ymax[last_row - 1] - self.rows[0].y
+
+        eprint(
+            "Rows used: %i, utilization %.2f%%."
+            % (last_row, self.rows.utilization(0, last_row) * 100)
+        )
+
+        self.plan.width = width_dbus
+        self.plan.height = height_dbus
+
+    def load_plan(self, input):
+        with open(input, "rb") as f:
+            self.use_plan(PlacementPlan.load(f))
+
+    def use_plan(self, plan):
+        plan.check_fills(Row.fill_masters)
+        by_name = {instance.getName(): instance for instance in self.instances}
+        plan.resolve(by_name.get)
+        self.plan = plan
+
+    @property
+    def origin(self):
+        """
+        The lower left corner of the first row, which cached plans are stored
+        relative to.
+        """
+        return self.rows.xmin[0], self.rows.ymin[0]
+
+    def fingerprint(self, tech_file, blocks_file, settings):
+        x, y = self.origin
+        # The fills and taps are placed too
+        used = {self.masters.of(instance) for instance in self.instances}
+        used.update(Row.fill_masters.values())
+        rows = [
+            (
+                self.rows.xmin[i] - x,
+                self.rows.ymin[i] - y,
+                self.rows.xmax[i] - self.rows.xmin[i],
+                self.rows.ymax[i] - self.rows.ymin[i],
+                self.rows.orientations[i],
+            )
+            for i in range(len(self.rows))
+        ]
+        return fingerprint(
+            [
+                (instance.getName(), self.masters.of(instance).name)
+                for instance in self.instances
+            ],
+            [(master.name, master.width, master.height) for master in used],
+            rows,
+            tech_file,
+            blocks_file,
+            settings,
+        )
+
+    def save_plan(self, output):
+        with open(output, "wb") as f:
+            self.plan.save(f)
+
+    def apply_def(self):
+        """
+        Commits the plan in bulk: fills and taps are created, then every
+        location is loaded from a DEF COMPONENTS section in a single
+        ``read_def -incremental`` call.
+
+        OpenROAD only warns about components it cannot match, so every cell
+        is checked to be placed afterwards, and the plan is applied per
+        instance if any is not.
+        """
+        fills = self.plan.create_fills(self.create_fill)
+        masters = [self.masters.of(instance).name for instance in self.plan.instances]
+        fill_masters = {
+            sites: self.masters[cell.getName()].name
+            for sites, cell in self.fill_cells_by_sites.items()
+        }
+        with tempfile.NamedTemporaryFile("w", suffix=".def", delete=False) as f:
+            self.plan.write_def(
+                f,
+                self.block.getName(),
+                self.block.getDbUnitsPerMicron(),
+                masters,
+                fill_masters,
+            )
+        try:
+            self.design.evalTclString(f"read_def -incremental {{{f.name}}}")
+        except Exception as e:
+            eprint("Bulk placement failed, placing per instance instead: %s" % e)
+            self.plan.apply_locations(fills)
+            return
+        finally:
+            os.unlink(f.name)
+
+        unplaced = self.plan.unplaced(fills)
+        if len(unplaced) != 0:
+            eprint(
+                "Bulk placement left %i cells unplaced, such as %s; placing per instance instead."
+                % (len(unplaced), ", ".join(unplaced[:5]))
+            )
+            self.plan.apply_locations(fills)
+
+    def resize_floorplan(self, minimum_height: float = 0):
+        """
+        Shrinks the die to the placement, keeping the margins between the
+        die and the rows. Rows cannot be resized from Python, so they are
+        destroyed and the ones used are recreated with the width of the
+        placement; track grids are cut down to the new die.
+
+        If the die would be shorter than ``minimum_height`` µm, it is made
+        that tall and the rows (and placement) are moved up to center them.
+        """
+        site_height = self.sites[0].getHeight()
+        width_margin: int = self.rows.xmin[0]
+        height_margin: int = self.rows.ymin[0]
+        core_width: int = self.plan.width
+        core_height: int = self.plan.height
+
+        die_width = core_width + width_margin * 2
+        die_height = core_height + height_margin * 2
+        minimum_height_dbus = round(minimum_height * self.micron_in_dbus)
+        if die_height < minimum_height_dbus:
+            die_height = minimum_height_dbus
+            new_margin = (die_height - core_height) / 2
+            new_margin = math.ceil(new_margin / site_height) * site_height
+            self.plan.translate(0, new_margin - height_margin)
+            height_margin = new_margin
+
+        old_rows = list(self.block.getRows())
+        row_count = core_height // site_height
+        recreated = [
+            (row.getName(), row.getSite(), row.getOrient())
+            for row in old_rows[:row_count]
+        ]
+        for row in old_rows:
+            odb.dbRow_destroy(row)
+        for i, (name, site, orientation) in enumerate(recreated):
+            odb.dbRow_create(
+                self.block,
+                name,
+                site,
+                width_margin,
+                height_margin + i * site_height,
+                orientation,
+                "HORIZONTAL",
+                core_width // site.getWidth(),
+                site.getWidth(),
+            )
+
+        die = odb.Rect(0, 0, die_width, die_height)
+        self.block.setDieArea(die)
+        for grid in self.block.getTrackGrids():
+            patterns_x = [
+                grid.getGridPatternX(i) for i in range(grid.getNumGridPatternsX())
+            ]
+            patterns_y = [
+                grid.getGridPatternY(i) for i in range(grid.getNumGridPatternsY())
+            ]
+            grid.clearGridPattern()
+            for origin, _, step in patterns_x:
+                grid.addGridPatternX(origin, (die.xMax() - origin) // step + 1, step)
+            for origin, _, step in patterns_y:
+                grid.addGridPatternY(origin, (die.yMax() - origin) // step + 1, step)
+
+        def microns(*dbus: int) -> str:
+            return " ".join(str(value / self.micron_in_dbus) for value in dbus)
+
+        core = (
+            width_margin,
+            height_margin,
+            width_margin + core_width,
+            height_margin + core_height,
+        )
+        utl.metric("design__die__bbox", microns(0, 0, die_width, die_height))
+        utl.metric("design__core__bbox", microns(*core))
+        eprint(
+            "Resized the floorplan to a die area of %s µm and %i rows."
+            % (microns(die_width, die_height), row_count)
+        )
 
-        height_dbus: int = self.rows[last_row - 1].ymax - self.rows[0].y
+    def apply(self, backend="def"):
+        start = time.time()
+        with self.profiler.phase("apply"):
+            if backend == "def":
+                self.apply_def()
+            else:
+                self.plan.apply(self.create_fill)
+        eprint(
+            "Applied placement of %i cells with the %s backend in %.3fs."
+            % (len(self.plan), backend, time.time() - start)
+        )
 
-        self.core_width = width_dbus / self.micron_in_dbus
-        self.core_height = height_dbus / self.micron_in_dbus
+        self.core_width = self.plan.width / self.micron_in_dbus
+        self.core_height = self.plan.height / self.micron_in_dbus
 
         utl.metric_float("dffram__suggested__core_width", self.core_width)
         utl.metric_float("dffram__suggested__core_height", self.core_height)
@@ -157,51 +404,76 @@ class Placer:
             % (self.core_width, self.core_height)
         )
 
-        # resizing doesn't work - rows widths are immutable from python
-        # # resize
-        # width_margin: int = self.rows[0].x
-        # height_margin: int = self.rows[0].y
-        # die_height_dbus = height_dbus + height_margin * 2
-        # die_width_dbus = width_dbus + width_margin * 2
-
-        # die_rect = odb.Rect(0, 0, die_width_dbus, die_height_dbus)
-        # self.block.setDieArea(die_rect)
-        # for row in self.block.getRows():
-        #     _, row_y = row.getOrigin()
-        #     if row_y >= width_dbus + width_margin:
-        #         odb.dbRow.destroy(row)
-
         # calculate density
-        die_width = self.block.getDieArea().dx() / self.micron_in_dbus
-        die_height = self.block.getDieArea().dy() / self.micron_in_dbus
-        die_area = die_width * die_height
-
-        logical_area: float = 0
-        for cell in self.block.getInsts():
-            master = cell.getMaster()
-            master_name = master.getName()
-            type = "nonfiller"
-            for incoming_type, rx in self.fill_cell_data.items():
-                if re.match(rx, master_name) is not None:
-                    type = incoming_type
-                    break
-            if type not in ["nonfiller"]:
-                continue
-            width = master.getWidth() / self.micron_in_dbus
-            height = master.getHeight() / self.micron_in_dbus
-            logical_area += width * height
-
-        self.density = logical_area / die_area
+        with self.profiler.phase("density"):
+            die_width = self.block.getDieArea().dx() / self.micron_in_dbus
+            die_height = self.block.getDieArea().dy() / self.micron_in_dbus
+            die_area = die_width * die_height
+
+            # Every instance created by the plan is a fill or a tap, so only
+            # the design's own instances can count towards the logic area.
+            logical_area: float = 0
+            for instance in self.instances:
+                master = self.masters.of(instance)
+                if master.is_filler:
+                    continue
+                logical_area += master.area / (self.micron_in_dbus**2)
+
+            self.density = logical_area / die_area
         utl.metric_float("dffram__logic__density", self.density)
 
         eprint("Density: %.2f%%" % (self.density * 100))
+
+        self.emit_row_metrics()
         eprint("Done.")
 
+    def emit_row_metrics(self):
+        metrics = row_metrics(
+            self.plan,
+            self.masters,
+            Row.fill_masters,
+            self.sites[0].getHeight(),
+            self.micron_in_dbus,
+        )
+        if len(metrics) == 0:
+            return
+        emit_metrics(metrics)
+        eprint(
+            "Row utilization: %.2f%% to %.2f%% (mean %.2f%%); pin density up to %.3f pins/µm²."
+            % (
+                metrics["dffram__placer__row_utilization__min"] * 100,
+                metrics["dffram__placer__row_utilization__max"] * 100,
+                metrics["dffram__placer__row_utilization__mean"] * 100,
+                metrics["dffram__placer__pin_density__max"],
+            )
+        )
+
     def write_db(self, output):
-        return odb.write_db(self.db, output) == 1
+        with self.profiler.phase("write_odb"):
+            return odb.write_db(self.db, output) == 1
 
     def write_def(self, output):
-        return odb.write_def(self.block, output) == 1
+        with self.profiler.phase("write_def"):
+            return odb.write_def(self.block, output) == 1
+
+    def emit_profile(self, trace=None):
+        """
+        Emits the profile as metrics, and writes it to ``trace`` as well if
+        given.
+        """
+        self.profiler.record_fills(self.plan)
+        emit_metrics(self.profiler.metrics())
+        eprint(
+            "Profile: %s."
+            % ", ".join(
+                "%s %.3fs" % (name, elapsed)
+                for (category, name), (elapsed, _) in self.profiler.timings.items()
+                if category == "phase"
+            )
+        )
+        if trace is not None:
+            self.profiler.write_trace(trace)
+            eprint("Wrote the profile trace to %s." % trace)
 
 
 def check_readable(file):
@@ -213,6 +485,20 @@ def check_readable(file):
 @click.option("-o", "--output-odb", required=True)
 @click.option("--output-def", type=str, required=False, default=None)
 @click.option("-s", "--size", required=True, help="RAM Size (ex. 8x32, 16x32…)")
+@click.option(
+    "--output-plan",
+    type=str,
+    required=False,
+    default=None,
+    help="File to save the binary placement plan to.",
+)
+@click.option(
+    "--input-plan",
+    type=str,
+    required=False,
+    default=None,
+    help="Apply a previously saved placement plan instead of placing.",
+)
 @click.option(
     "-r",
     "--represent",
@@ -233,10 +519,51 @@ def check_readable(file):
     multiple=True,
     type=str,
 )
+@click.option(
+    "--apply-backend",
+    type=click.Choice(["def", "instance"]),
+    default="def",
+    help="How the placement is committed to the database: in bulk through an incremental DEF, or one instance at a time.",
+)
+@click.option(
+    "--resize-floorplan/--keep-floorplan",
+    default=False,
+    help="Shrink the die and rows to the placement instead of leaving the floorplan as-is.",
+)
+@click.option(
+    "--minimum-height",
+    type=float,
+    default=0,
+    help="With --resize-floorplan, the minimum height of the die in µm.",
+)
+@click.option(
+    "--plan-cache",
+    default=None,
+    help="Directory to cache placement plans in, keyed by a fingerprint of the design, its rows and the platform. Without it, the design is always placed.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Time every phase and Placeable class and count the calls into odb, reported as dffram__placer__* metrics.",
+)
+@click.option(
+    "--profile-trace",
+    default=None,
+    help="JSON file to write the profile to as trace events. Implies --profile.",
+)
 @click.argument("odb_in", required=True, nargs=1)
 def cli(
     output_odb,
     output_def,
+    output_plan,
+    input_plan,
+    apply_backend,
+    resize_floorplan,
+    minimum_height,
+    plan_cache,
+    profile,
+    profile_trace,
     input_lef,
     size,
     represent,
@@ -273,11 +600,16 @@ def cli(
 
     tap_distance = platform_tech_config["tap_distance"]
 
-    for input in [odb_in]:
+    for input in [odb_in] + ([input_plan] if input_plan is not None else []):
         check_readable(input)
 
     fill_cell_data = platform_tech_config["fills"]
 
+    profiler = Profiler(
+        enabled=profile or profile_trace is not None, trace=profile_trace is not None
+    )
+    profiler.instrument(odb)
+
     placer = Placer(
         odb_in,
         words,
@@ -285,13 +617,54 @@ def cli(
         register_file,
         fill_cell_data,
         tap_distance,
+        profiler,
     )
 
     if represent is not None:
         with open(represent, "w") as f:
             placer.represent(f)
 
-    placer.place()
+    if input_plan is not None:
+        try:
+            placer.load_plan(input_plan)
+        except PlanError as e:
+            eprint("Failed to load placement plan: %s" % e)
+            exit(os.EX_DATAERR)
+        eprint("Loaded placement plan from %s." % input_plan)
+    elif plan_cache is None:
+        placer.place()
+    else:
+        cache = PlanCache(plan_cache)
+        with profiler.phase("plan_cache"):
+            key = placer.fingerprint(platform_tech_file, blocks_config_file, {})
+            cached = cache.load(key, *placer.origin)
+        if cached is not None:
+            plan, metrics = cached
+            try:
+                placer.use_plan(plan)
+            except PlanError as e:
+                eprint("Ignoring cached placement plan: %s" % e)
+                cached = None
+        if cached is not None:
+            for name, value in metrics.items():
+                utl.metric_integer(name, value)
+            eprint("Reused the cached placement plan %s." % key)
+        else:
+            placer.place()
+            with profiler.phase("plan_cache"):
+                cache.store(key, placer.plan, placer.placement_metrics, *placer.origin)
+        utl.metric_integer("dffram__plan_cache__hits", int(cached is not None))
+        utl.metric_integer("dffram__plan_cache__misses", int(cached is None))
+
+    if output_plan is not None:
+        placer.save_plan(output_plan)
+        eprint("Wrote placement plan to %s." % output_plan)
+
+    if resize_floorplan:
+        with profiler.phase("resize_floorplan"):
+            placer.resize_floorplan(minimum_height)
+
+    placer.apply(apply_backend)
 
     if not placer.write_db(output_odb):
         eprint("Failed to write output ODB file.")
@@ -304,6 +677,9 @@ def cli(
             eprint("Failed to write output DEF file.")
             exit(os.EX_IOERR)
 
+    if profiler.enabled:
+        placer.emit_profile(profile_trace)
+
     eprint("Done.")
 
 
@@ -2,10 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright ©2020-2022, The American University in Cairo
 from .row import Row
-from .util import d2a
 from .placeable import Placeable
-
-from odb import dbInst as Instance
+from .classifier import SieveNode
 
 from typing import List
 from itertools import zip_longest
@@ -19,21 +17,21 @@ class Mux(Placeable):
     Constraint: The number of selection buffers is necessarily == the number of bytes.
     """
 
-    def __init__(self, instances: List[Instance]):
-        self.sieve(
-            instances,
-            [
-                S(variable="sel_diodes", groups=["selection_line"]),
-                S(variable="selbufs", groups=["selection_line", "byte"]),
-                S(variable="muxes", groups=["byte", "bit"]),
-                S(
-                    variable="mux_input_diodes",
-                    groups=["byte", "bit", "line"],
-                    group_rx_order=[1, 3, 2],
-                ),
-            ],
-        )
-        self.dicts_to_lists()
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="sel_diodes", groups=["selection_line"]),
+            S(variable="selbufs", groups=["selection_line", "byte"]),
+            S(variable="muxes", groups=["byte", "bit"]),
+            S(
+                variable="mux_input_diodes",
+                groups=["byte", "bit", "line"],
+                group_rx_order=[1, 3, 2],
+            ),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list: List[Row], start_row: int = 0):
         current_row = start_row
@@ -73,17 +71,17 @@ class Mux(Placeable):
 
 
 class Decoder3x8(Placeable):
-    def __init__(self, instances: List[Instance]):
-        self.sieve(
-            instances,
-            [
-                S(variable="enbuf"),
-                S(variable="and_gates", groups=["gate"]),
-                S(variable="abufs", groups=["address_bit"]),
-                S(variable="invs", groups=["gate"]),
-            ],
-        )
-        self.dicts_to_lists()
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="enbuf"),
+            S(variable="and_gates", groups=["gate"]),
+            S(variable="abufs", groups=["address_bit"]),
+            S(variable="invs", groups=["gate"]),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list: List[Row], start_row: int = 0):
         """
@@ -108,21 +106,21 @@ class Decoder3x8(Placeable):
 
 
 class Decoder2x4(Placeable):
-    def __init__(self, instances):
-        self.sieve(
-            instances,
-            [
-                S(
-                    variable="and_gates",
-                    groups=["address_bit"],
-                ),
-                S(
-                    variable="invs",
-                    groups=["address_bit"],
-                ),
-            ],
-        )
-        self.dicts_to_lists()
+    @staticmethod
+    def sieves():
+        return [
+            S(
+                variable="and_gates",
+                groups=["address_bit"],
+            ),
+            S(
+                variable="invs",
+                groups=["address_bit"],
+            ),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list, start_row=0):
         for i in range(
@@ -137,36 +135,17 @@ class Decoder2x4(Placeable):
 
 
 class Decoder5x32(Placeable):
-    def __init__(self, instances):
-        raw_d2x4 = []
-
-        def process_d2x4_element(instance):
-            raw_d2x4.append(instance)
-
-        raw_d3x8 = {}
-
-        def process_d3x8_element(instance, decoder):
-            raw_d3x8[decoder] = raw_d3x8.get(decoder) or []
-            raw_d3x8[decoder].append(instance)
-
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="tie"),
+            S(variable="decoder2x4", child=Decoder2x4),
+            S(variable="decoders3x8", groups=["decoder"], child=Decoder3x8),
+        ]
+
+    def __init__(self, node: SieveNode):
         self.enbuf = None
-        self.sieve(
-            instances,
-            [
-                S(variable="tie"),
-                S(variable="decoder2x4", custom_behavior=process_d2x4_element),
-                S(
-                    variable="decoders3x8",
-                    groups=["decoder"],
-                    custom_behavior=process_d3x8_element,
-                ),
-            ],
-        )
-
-        self.dicts_to_lists()
-
-        self.decoders3x8 = d2a({k: Decoder3x8(v) for k, v in raw_d3x8.items()})
-        self.decoder2x4 = Decoder2x4(raw_d2x4)
+        self.sieve(node)
 
     def place(self, row_list, start_row=0, decoder2x4_start_row=0, flip=False):
         r = row_list[start_row]
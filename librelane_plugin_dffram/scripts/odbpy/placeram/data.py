@@ -1,15 +1,15 @@
 # -*- coding: utf8 -*-
 # SPDX-License-Identifier: Apache-2.0
 # Copyright ©2020-2022, The American University in Cairo
-from .util import d2a
 from .row import Row
 from .placeable import Placeable, DataError
+from .classifier import SieveNode, sieve_instances
 from .common_data import Decoder3x8, Mux
 
 from odb import dbInst as Instance
 
 import math
-from typing import Callable, List, Dict, Union
+from typing import Callable, List, Dict, Tuple, Type, Union
 from itertools import zip_longest
 
 # --
@@ -19,17 +19,18 @@ S = Placeable.Sieve
 
 
 class Bit(Placeable):
-    def __init__(self, instances: List[Instance]):
-        self.sieve(
-            instances,
-            [
-                S(variable="store"),
-                S(variable="obufs", groups=["port"]),
-                S(variable="invs", groups=["port"]),
-            ],
-        )
+    __slots__ = ("store", "obufs", "invs")
+
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="store"),
+            S(variable="obufs", groups=["port"]),
+            S(variable="invs", groups=["port"]),
+        ]
 
-        self.dicts_to_lists()
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list: List[Row], start_row: int = 0):
         r = row_list[start_row]
@@ -45,27 +46,21 @@ class Bit(Placeable):
 
 
 class Byte(Placeable):
-    def __init__(self, instances: List[Instance]):
-        raw_bits: Dict[int, List[Instance]] = {}
-
-        def process_bit(instance, bit):
-            raw_bits[bit] = raw_bits.get(bit) or []
-            raw_bits[bit].append(instance)
-
-        self.sieve(
-            instances,
-            [
-                S(variable="bits", groups=["bit"], custom_behavior=process_bit),
-                S(variable="clockgate"),
-                S(variable="cgand"),
-                S(variable="clkinv"),
-                S(variable="clkdiode"),
-                S(variable="selinvs", groups=["line"]),
-            ],
-        )
-
-        self.dicts_to_lists()
-        self.bits = d2a({k: Bit(v) for k, v in raw_bits.items()})
+    __slots__ = ("bits", "clockgate", "cgand", "clkinv", "clkdiode", "selinvs")
+
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="bits", groups=["bit"], child=Bit),
+            S(variable="clockgate"),
+            S(variable="cgand"),
+            S(variable="clkinv"),
+            S(variable="clkdiode"),
+            S(variable="selinvs", groups=["line"]),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list: List[Row], start_row: int = 0):
         r = row_list[start_row]
@@ -85,24 +80,18 @@ class Byte(Placeable):
 
 
 class Word(Placeable):
-    def __init__(self, instances: List[Instance]):
-        raw_bytes: Dict[int, List[Instance]] = {}
-
-        def process_byte(instance, byte):
-            raw_bytes[byte] = raw_bytes.get(byte) or []
-            raw_bytes[byte].append(instance)
-
-        self.sieve(
-            instances,
-            [
-                S(variable="bytes", groups=["byte"], custom_behavior=process_byte),
-                S(variable="clkbuf"),
-                S(variable="selbufs", groups=["port"]),
-            ],
-        )
+    __slots__ = ("bytes", "clkbuf", "selbufs")
+
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="bytes", groups=["byte"], child=Byte),
+            S(variable="clkbuf"),
+            S(variable="selbufs", groups=["port"]),
+        ]
 
-        self.dicts_to_lists()
-        self.bytes = d2a({k: Byte(v) for k, v in raw_bytes.items()})
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list: List[Row], start_row: int = 0):
         r = row_list[start_row]
@@ -121,38 +110,18 @@ class Word(Placeable):
 
 
 class Slice(Placeable):  # A slice is defined as 8 words.
-    def __init__(self, instances: List[Instance]):
-        raw_words: Dict[int, List[Instance]] = {}
-
-        def process_word(instance, word):
-            raw_words[word] = raw_words.get(word) or []
-            raw_words[word].append(instance)
-
-        raw_decoders: Dict[int, List[Instance]] = {}
-
-        def process_decoder(instance, decoder):
-            raw_decoders[decoder] = raw_decoders.get(decoder) or []
-            raw_decoders[decoder].append(instance)
-
-        self.sieve(
-            instances,
-            [
-                S(variable="words", groups=["word"], custom_behavior=process_word),
-                S(
-                    variable="decoders",
-                    groups=["port"],
-                    custom_behavior=process_decoder,
-                ),
-                S(variable="clkbuf"),
-                S(variable="webufs", groups=["line"]),
-                S(variable="tiezero"),
-            ],
-        )
-
-        self.dicts_to_lists()
-
-        self.decoders = d2a({k: Decoder3x8(v) for k, v in raw_decoders.items()})
-        self.words = d2a({k: Word(v) for k, v in raw_words.items()})
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="words", groups=["word"], child=Word),
+            S(variable="decoders", groups=["port"], child=Decoder3x8),
+            S(variable="clkbuf"),
+            S(variable="webufs", groups=["line"]),
+            S(variable="tiezero"),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
         word_count = len(self.words)
         if word_count != 8:
@@ -234,18 +203,17 @@ class Slice(Placeable):  # A slice is defined as 8 words.
 
 
 class Outreg(Placeable):
-    def __init__(self, instances: List[Instance]):
-        self.sieve(
-            instances,
-            [
-                S(variable="root_clkbuf"),
-                S(variable="clkbufs", groups=["byte"]),
-                S(variable="ffs", groups=["byte", "bit"]),
-                S(variable="diodes", groups=["byte", "bit"]),
-            ],
-        )
-
-        self.dicts_to_lists()
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="root_clkbuf"),
+            S(variable="clkbufs", groups=["byte"]),
+            S(variable="ffs", groups=["byte", "bit"]),
+            S(variable="diodes", groups=["byte", "bit"]),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list: List[Row], start_row: int = 0):
         r = row_list[start_row]
@@ -353,50 +321,35 @@ class LRPlaceable(Placeable):
 
 
 class Slice_16(LRPlaceable):  # A Slice_16 is defined as 2 RAM8 slices (16 words)
-    def __init__(self, instances: List[Instance]):
-        raw_slices: Dict[int, List[Instance]] = {}
-        raw_doregs: Dict[int, List[Instance]] = {}
-
-        def process_slice(instance, slice):
-            raw_slices[slice] = raw_slices.get(slice) or []
-            raw_slices[slice].append(instance)
-
-        def process_doreg(instance, port):
-            raw_doregs[port] = raw_doregs.get(port) or []
-            raw_doregs[port].append(instance)
-
-        self.sieve(
-            instances,
-            [
-                S(variable="slices", groups=["slice"], custom_behavior=process_slice),
-                S(variable="doregs", groups=["port"], custom_behavior=process_doreg),
-                S(variable="clk_diode"),
-                S(variable="clkbuf"),
-                S(variable="webufs", groups=["bit"]),
-                S(variable="enbufs", groups=["port"]),
-                S(variable="a_diodes", groups=["port", "address_bit"]),
-                S(variable="abufs", groups=["port", "address_bit"]),
-                S(variable="decoder_ands", groups=["port", "bit"]),
-                S(variable="decoder_invs", groups=["port", "bit"]),
-                S(variable="fbufenbufs", groups=["port", "bit"]),
-                S(variable="ties", groups=["port", "bit"]),
-                S(
-                    variable="floatbufs",
-                    groups=["port", "byte", "bit"],
-                    group_rx_order=[2, 1, 3],
-                ),
-                S(
-                    variable="floatbufsinvs",
-                    groups=["port", "byte", "bit"],
-                    group_rx_order=[2, 1, 3],
-                ),
-            ],
-        )
-
-        self.dicts_to_lists()
-
-        self.slices = d2a({k: Slice(v) for k, v in raw_slices.items()})
-        self.doregs = d2a({k: Outreg(v) for k, v in raw_doregs.items()})
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="slices", groups=["slice"], child=Slice),
+            S(variable="doregs", groups=["port"], child=Outreg),
+            S(variable="clk_diode"),
+            S(variable="clkbuf"),
+            S(variable="webufs", groups=["bit"]),
+            S(variable="enbufs", groups=["port"]),
+            S(variable="a_diodes", groups=["port", "address_bit"]),
+            S(variable="abufs", groups=["port", "address_bit"]),
+            S(variable="decoder_ands", groups=["port", "bit"]),
+            S(variable="decoder_invs", groups=["port", "bit"]),
+            S(variable="fbufenbufs", groups=["port", "bit"]),
+            S(variable="ties", groups=["port", "bit"]),
+            S(
+                variable="floatbufs",
+                groups=["port", "byte", "bit"],
+                group_rx_order=[2, 1, 3],
+            ),
+            S(
+                variable="floatbufsinvs",
+                groups=["port", "byte", "bit"],
+                group_rx_order=[2, 1, 3],
+            ),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list: List[Row], start_row: int = 0):
         def place_horizontal_elements(start_row: int):
@@ -451,47 +404,34 @@ class Slice_16(LRPlaceable):  # A Slice_16 is defined as 2 RAM8 slices (16 words
 
 
 class Block(LRPlaceable):  # A block is defined as 4 slices (32 words)
-    def __init__(self, instances: List[Instance]):
-        raw_blocks: Dict[int, List[Instance]] = {}
-        raw_domuxes: Dict[int, List[Instance]] = {}
-
-        def process_block(instance, block):
-            raw_blocks[block] = raw_blocks.get(block) or []
-            raw_blocks[block].append(instance)
-
-        def process_raw_domuxes(instance, domux):
-            raw_domuxes[domux] = raw_domuxes.get(domux) or []
-            raw_domuxes[domux].append(instance)
-
-        self.sieve(
-            instances,
-            [
-                S(
-                    variable="slice_16",
-                    groups=["slice_16"],
-                    custom_behavior=process_block,
-                ),
-                S(variable="webufs", groups=["bit"]),
-                S(variable="enbufs", groups=["port"]),
-                S(variable="abufs", groups=["port", "address_bit"]),
-                S(variable="decoder_ands", groups=["port", "bit"]),
-                S(variable="decoder_invs", groups=["port", "bit"]),
-                S(variable="dibufs", groups=["bit"]),
-                S(
-                    variable="domuxes",
-                    groups=["domux"],
-                    custom_behavior=process_raw_domuxes,
-                ),
-                S(
-                    variable="tiezero",
-                ),
-            ],
-        )
-
-        self.dicts_to_lists()
-
-        self.blocks = d2a({k: Slice_16(v) for k, v in raw_blocks.items()})
-        self.domuxes = d2a({k: Mux(v) for k, v in raw_domuxes.items()})
+    @staticmethod
+    def sieves():
+        return [
+            S(
+                variable="slice_16",
+                groups=["slice_16"],
+                child=Slice_16,
+            ),
+            S(variable="webufs", groups=["bit"]),
+            S(variable="enbufs", groups=["port"]),
+            S(variable="abufs", groups=["port", "address_bit"]),
+            S(variable="decoder_ands", groups=["port", "bit"]),
+            S(variable="decoder_invs", groups=["port", "bit"]),
+            S(variable="dibufs", groups=["bit"]),
+            S(
+                variable="domuxes",
+                groups=["domux"],
+                child=Mux,
+            ),
+            S(
+                variable="tiezero",
+            ),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
+
+        self.blocks: List[Slice_16] = self.slice_16
 
     def place(self, row_list: List[Row], start_row: int = 0):
         def place_horizontal_elements(start_row: int):
@@ -534,54 +474,40 @@ class Block(LRPlaceable):  # A block is defined as 4 slices (32 words)
 
 
 class HigherLevelPlaceable(LRPlaceable):
-    def __init__(self, instances: List[Instance], block_size: int):
-        raw_blocks: Dict[int, List[Instance]] = {}
-
-        def process_block(instance, block):
-            raw_blocks[block] = raw_blocks.get(block) or []
-            raw_blocks[block].append(instance)
-
-        raw_domuxes: Dict[int, List[Instance]] = {}
-
-        def process_raw_domuxes(instance, domux):
-            raw_domuxes[domux] = raw_domuxes.get(domux) or []
-            raw_domuxes[domux].append(instance)
-
+    @staticmethod
+    def sieves(block_size: int):
+        block_kind, block_args = hierarchy_kind(block_size)
+        return [
+            S(
+                variable=f"block{block_size}",
+                groups=["block"],
+                child=block_kind,
+                child_args=block_args,
+            ),
+            S(
+                variable="domuxes",
+                groups=["domux"],
+                child=Mux,
+            ),
+            S(variable="clk_diode"),
+            S(variable="clkbuf"),
+            S(variable="tiezero"),
+            S(variable="di_diodes", groups=["bit"]),
+            S(variable="dibufs", groups=["bit"]),
+            S(variable="webufs", groups=["bit"]),
+            S(variable="enbufs", groups=["port"]),
+            S(variable="decoder_ands", groups=["port", "bit"]),
+            S(variable="decoder_invs", groups=["port", "bit"]),
+            S(variable="abufs", groups=["port", "address_bit"]),
+            S(variable="a_diodes", groups=["port", "address_bit"]),
+        ]
+
+    def __init__(self, node: SieveNode, block_size: int):
         self.clkbuf = None
 
-        self.sieve(
-            instances,
-            [
-                S(
-                    variable=f"block{block_size}",
-                    groups=["block"],
-                    custom_behavior=process_block,
-                ),
-                S(
-                    variable="domuxes",
-                    groups=["domux"],
-                    custom_behavior=process_raw_domuxes,
-                ),
-                S(variable="clk_diode"),
-                S(variable="clkbuf"),
-                S(variable="tiezero"),
-                S(variable="di_diodes", groups=["bit"]),
-                S(variable="dibufs", groups=["bit"]),
-                S(variable="webufs", groups=["bit"]),
-                S(variable="enbufs", groups=["port"]),
-                S(variable="decoder_ands", groups=["port", "bit"]),
-                S(variable="decoder_invs", groups=["port", "bit"]),
-                S(variable="abufs", groups=["port", "address_bit"]),
-                S(variable="a_diodes", groups=["port", "address_bit"]),
-            ],
-        )
+        self.sieve(node)
 
-        self.dicts_to_lists()
-
-        self.blocks = d2a(
-            {k: create_hierarchy(v, block_size) for k, v in raw_blocks.items()}
-        )
-        self.domuxes = d2a({k: Mux(v) for k, v in raw_domuxes.items()})
+        self.blocks = self.__dict__[f"block{block_size}"]
 
     def place(self, row_list: List[Row], start_row: int = 0):
         def symmetrically_placeable():
@@ -648,14 +574,17 @@ class HigherLevelPlaceable(LRPlaceable):
         return len(self.blocks) * (self.blocks[0].word_count())
 
 
-def create_hierarchy(instances, word_count):
-    hierarchy = None
+def hierarchy_kind(word_count: int) -> Tuple[Type[Placeable], Dict]:
+    """
+    Returns the Placeable type (and its constructor arguments) for a RAM with
+    ``word_count`` words.
+    """
     if word_count == 1:
-        hierarchy = Word(instances)
+        return Word, {}
     elif word_count == 8:
-        hierarchy = Slice(instances)
+        return Slice, {}
     elif word_count == 32:
-        hierarchy = Block(instances)
+        return Block, {}
     else:
         """
         I derived this equation based on the structure we have.
@@ -669,6 +598,9 @@ def create_hierarchy(instances, word_count):
         def f(x):
             return 32 * (4 ** math.ceil(math.log2(x / 128) / 2))
 
-        block_size = f(word_count)
-        hierarchy = HigherLevelPlaceable(instances, block_size)
-    return hierarchy
+        return HigherLevelPlaceable, {"block_size": f(word_count)}
+
+
+def create_hierarchy(instances: List[Instance], word_count: int):
+    kind, kwargs = hierarchy_kind(word_count)
+    return sieve_instances(kind, instances, **kwargs)
@@ -0,0 +1,70 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+Predicts the core area PlaceRAM will place a design in, without Yosys or
+OpenROAD:
+
+    python3 -m placeram.estimate --size 32x32
+
+The placer's layout is fully determined by the structure of the netlist and
+the width of the masters, so the estimate is the actual placement of a
+synthetic netlist on a mock database; it matches the real placement as long
+as the synthetic netlist matches the synthesized one.
+"""
+
+import json
+
+import click
+
+from .bench import MockDesign, benchmark, load_design
+
+
+def estimate(design: MockDesign, word_count: int, register_file: bool) -> dict:
+    """
+    Returns the core width and height, in µm, and the number of rows the
+    placement of ``design`` takes.
+    """
+    result = benchmark(design, word_count, register_file)
+    dbu = design.block.getDefUnits()
+    return {
+        "core_width": result["width"] / dbu,
+        "core_height": result["height"] / dbu,
+        "rows": result["rows"],
+        "instances": result["instances"],
+    }
+
+
+@click.command()
+@click.option("-s", "--size", required=True, help="RAM Size (ex. 8x32, 16x32…)")
+@click.option(
+    "-v",
+    "--variant",
+    default=None,
+    help="Variant, as listed in the building blocks' config.yml.",
+)
+@click.option(
+    "-b",
+    "--building-blocks",
+    default="sky130A:sky130_fd_sc_hd:ram",
+    help="Format <pdk>:<scl>:<name> : Name of the building blocks to use.",
+)
+@click.option("--latch/--dff", default=True, help="Whether to use latches or dffs")
+@click.option(
+    "-l",
+    "--input-lef",
+    "input_lefs",
+    default=[],
+    help="LEF files to read the width of masters from. The built-in widths of sky130_fd_sc_hd are used if none are given.",
+    multiple=True,
+    type=str,
+)
+def cli(size, variant, building_blocks, latch, input_lefs):
+    design, words, register_file = load_design(
+        building_blocks, size, variant, latch, input_lefs
+    )
+    print(json.dumps(estimate(design, words, register_file)))
+
+
+if __name__ == "__main__":
+    cli()
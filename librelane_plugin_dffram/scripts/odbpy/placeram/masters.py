@@ -0,0 +1,73 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+import re
+from typing import Dict, Iterable
+
+
+class Master(object):
+    """
+    Everything the placer needs to know about a master, read from the
+    database once.
+    """
+
+    def __init__(self, cell, site_width: int, fill_cell_data: Dict[str, str]):
+        self.name: str = cell.getName()
+        self.width: int = cell.getWidth()
+        self.height: int = cell.getHeight()
+        self.sites: int = self.width // site_width
+        self.area: int = self.width * self.height
+        # What has to be routed to: the power pins are reached by the PDN
+        self.pins: int = sum(
+            1
+            for mterm in cell.getMTerms()
+            if mterm.getSigType() not in ["POWER", "GROUND"]
+        )
+
+        kinds = set()
+        for kind, rx in fill_cell_data.items():
+            if re.match(rx, self.name) is not None:
+                kinds.add(kind)
+        self.is_tap: bool = "tap" in kinds
+        self.is_fill: bool = "fill" in kinds
+        self.is_decap: bool = "decap" in kinds
+        self.is_diode: bool = "diode" in kinds
+        # Any cell matched by the platform's fill data is not counted as logic
+        self.is_filler: bool = len(kinds) != 0
+
+    def __repr__(self):
+        return f"<Master {self.name} {self.sites} sites>"
+
+
+class MasterTable(object):
+    """
+    Per-master metadata for every master in the libraries, and the master of
+    every instance in the design, so that hot paths need neither database
+    calls nor regular expressions per instance.
+    """
+
+    def __init__(
+        self, cells: Iterable, site_width: int, fill_cell_data: Dict[str, str]
+    ):
+        self.by_name: Dict[str, Master] = {}
+        for cell in cells:
+            master = Master(cell, site_width, fill_cell_data)
+            self.by_name[master.name] = master
+        self.instance_masters: Dict[int, Master] = {}
+
+    def index_instances(self, instances: Iterable):
+        """
+        Instances are keyed by identity: the same instance objects must be
+        kept alive and used for placement.
+        """
+        by_name = self.by_name
+        for instance in instances:
+            self.instance_masters[id(instance)] = by_name[
+                instance.getMaster().getName()
+            ]
+
+    def of(self, instance) -> Master:
+        return self.instance_masters[id(instance)]
+
+    def __getitem__(self, name: str) -> Master:
+        return self.by_name[name]
@@ -0,0 +1,183 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+A stand-in for the parts of OpenROAD's ``odb`` module placeram uses, so the
+placer can be driven (and timed) outside of OpenROAD.
+
+It only models what placement reads and writes: names, masters and their
+dimensions, row geometry and instance locations. There is no connectivity
+and nothing is ever written to disk.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+
+class Rect(object):
+    def __init__(self, x_min: int, y_min: int, x_max: int, y_max: int):
+        self.x_min, self.y_min, self.x_max, self.y_max = x_min, y_min, x_max, y_max
+
+    def xMin(self) -> int:
+        return self.x_min
+
+    def yMin(self) -> int:
+        return self.y_min
+
+    def xMax(self) -> int:
+        return self.x_max
+
+    def yMax(self) -> int:
+        return self.y_max
+
+    def dx(self) -> int:
+        return self.x_max - self.x_min
+
+    def dy(self) -> int:
+        return self.y_max - self.y_min
+
+
+class dbSite(object):
+    def __init__(self, name: str, width: int, height: int):
+        self.name, self.width, self.height = name, width, height
+
+    def getName(self) -> str:
+        return self.name
+
+    def getWidth(self) -> int:
+        return self.width
+
+    def getHeight(self) -> int:
+        return self.height
+
+
+class dbMTerm(object):
+    def __init__(self, name: str, sig_type: str = "SIGNAL"):
+        self.name, self.sig_type = name, sig_type
+
+    def getName(self) -> str:
+        return self.name
+
+    def getSigType(self) -> str:
+        return self.sig_type
+
+
+class dbMaster(object):
+    def __init__(
+        self, name: str, width: int, height: int, mterms: Sequence[dbMTerm] = ()
+    ):
+        self.name, self.width, self.height = name, width, height
+        self.mterms = list(mterms)
+
+    def getName(self) -> str:
+        return self.name
+
+    def getWidth(self) -> int:
+        return self.width
+
+    def getHeight(self) -> int:
+        return self.height
+
+    def getMTerms(self) -> List[dbMTerm]:
+        return self.mterms
+
+
+class dbInst(object):
+    __slots__ = ("name", "master", "orientation", "location", "status")
+
+    def __init__(self, name: str, master: dbMaster):
+        self.name = name
+        self.master = master
+        self.orientation = "R0"
+        self.location: Tuple[int, int] = (0, 0)
+        self.status = "NONE"
+
+    def getName(self) -> str:
+        return self.name
+
+    def getMaster(self) -> dbMaster:
+        return self.master
+
+    def getOrient(self) -> str:
+        return self.orientation
+
+    def setOrient(self, orientation: str):
+        self.orientation = orientation
+
+    def getLocation(self) -> Tuple[int, int]:
+        return self.location
+
+    def setLocation(self, x: int, y: int):
+        self.location = (x, y)
+
+    def getPlacementStatus(self) -> str:
+        return self.status
+
+    def setPlacementStatus(self, status: str):
+        self.status = status
+
+
+class dbRow(object):
+    def __init__(
+        self, name: str, site: dbSite, x: int, y: int, orientation: str, sites: int
+    ):
+        self.name = name
+        self.site = site
+        self.x, self.y = x, y
+        self.orientation = orientation
+        self.sites = sites
+
+    def getName(self) -> str:
+        return self.name
+
+    def getSite(self) -> dbSite:
+        return self.site
+
+    def getOrigin(self) -> List[int]:
+        return [self.x, self.y]
+
+    def getOrient(self) -> str:
+        return self.orientation
+
+    def getBBox(self) -> Rect:
+        return Rect(
+            self.x,
+            self.y,
+            self.x + self.sites * self.site.getWidth(),
+            self.y + self.site.getHeight(),
+        )
+
+
+class dbBlock(object):
+    def __init__(self, name: str, def_units: int, die_area: Optional[Rect] = None):
+        self.name = name
+        self.def_units = def_units
+        self.die_area = die_area or Rect(0, 0, 0, 0)
+        self.instances: List[dbInst] = []
+        self.rows: List[dbRow] = []
+
+    def getName(self) -> str:
+        return self.name
+
+    def getDefUnits(self) -> int:
+        return self.def_units
+
+    def getDbUnitsPerMicron(self) -> int:
+        return self.def_units
+
+    def getDieArea(self) -> Rect:
+        return self.die_area
+
+    def setDieArea(self, rect: Rect):
+        self.die_area = rect
+
+    def getInsts(self) -> List[dbInst]:
+        return self.instances
+
+    def getRows(self) -> List[dbRow]:
+        return self.rows
+
+
+def dbInst_create(block: dbBlock, master: dbMaster, name: str) -> dbInst:
+    instance = dbInst(name, master)
+    block.instances.append(instance)
+    return instance
@@ -0,0 +1,1026 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+Elaborates the models in ``models/`` into the flattened gate-level netlist
+Yosys writes for them with ``SYNTH_ELABORATE_ONLY`` and
+``SYNTH_ELABORATE_FLATTEN``, without running Yosys:
+
+    python3 -m placeram.netlist generate -t RAM32 -p WSIZE=4 -p USE_LATCH=1 \\
+        -o RAM32.nl.v platforms/sky130A/sky130_fd_sc_hd/block_definitions.v \\
+        models/ram/model.v
+
+Only the structural subset of Verilog the models are written in is
+understood: ANSI module headers, parameters, wires and arrays of wires,
+generate for loops and conditionals, and (arrays of) module and cell
+instances with named connections. Anything else is rejected rather than
+guessed at.
+
+Instances are named the way Yosys' ``flatten`` names them, which is what
+``rx.yml`` is written against: ``BANK512[1].RAM512.BANK128[0].RAM128.DIBUF[3]``.
+Unnamed generate blocks add nothing to the names.
+
+``compare`` checks two flat netlists for structural equivalence: the same
+cells of the same masters, with their pins and the top-level ports connected
+the same way, regardless of how the nets are named.
+"""
+
+import re
+import sys
+import json
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, TextIO, Tuple
+
+import click
+
+
+class NetlistError(Exception):
+    pass
+
+
+# --- Lexing
+
+
+COMMENT_RX = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+ATTRIBUTE_RX = re.compile(r"\(\*.*?\*\)", re.S)
+DIRECTIVE_RX = re.compile(r"^\s*`(\w+)\s*(\w*)")
+TOKEN_RX = re.compile(
+    r"\s*(\d+\s*'[sS]?[bBoOdDhH]\s*[0-9a-fA-FxXzZ_?]+|\d+|\\\S+|[A-Za-z_][\w$]*|==|!=|<=|>=|&&|\|\||<<|>>|\S)"
+)
+
+
+def preprocess(text: str, defines: Set[str]) -> str:
+    """
+    Strips comments, attributes and preprocessor directives, keeping only the
+    lines enabled by ```ifdef``/```ifndef`` given ``defines``.
+
+    >>> preprocess("a\\n`ifndef X\\nb\\n`else\\nc\\n`endif\\n", set()).split()
+    ['a', 'b']
+    """
+    text = COMMENT_RX.sub(lambda m: "\n" * m.group(0).count("\n"), text)
+    text = ATTRIBUTE_RX.sub(" ", text)
+    lines = []
+    # Each level: (enclosing level active, a branch has been taken)
+    stack: List[Tuple[bool, bool]] = []
+    active = True
+    for line in text.split("\n"):
+        directive = DIRECTIVE_RX.match(line)
+        if directive is None:
+            lines.append(line if active else "")
+            continue
+        kind, name = directive.groups()
+        if kind in ["ifdef", "ifndef"]:
+            taken = (name in defines) == (kind == "ifdef")
+            stack.append((active, taken))
+            active = active and taken
+        elif kind == "elsif":
+            enclosing, taken = stack[-1]
+            branch = not taken and name in defines
+            stack[-1] = (enclosing, taken or branch)
+            active = enclosing and branch
+        elif kind == "else":
+            enclosing, taken = stack[-1]
+            stack[-1] = (enclosing, True)
+            active = enclosing and not taken
+        elif kind == "endif":
+            active, _ = stack.pop()
+        elif kind == "define" and active:
+            defines.add(name)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RX.findall(text)
+
+
+class Tokens(object):
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        if self.i + offset < len(self.tokens):
+            return self.tokens[self.i + offset]
+        return None
+
+    def next(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise NetlistError("Unexpected end of file.")
+        self.i += 1
+        return token
+
+    def accept(self, token: str) -> bool:
+        if self.peek() == token:
+            self.i += 1
+            return True
+        return False
+
+    def expect(self, token: str):
+        found = self.next()
+        if found != token:
+            raise NetlistError(
+                f"Expected '{token}', found '{found}' after '{' '.join(self.tokens[max(0, self.i - 8) : self.i - 1])}'."
+            )
+
+    def identifier(self) -> str:
+        token = self.next()
+        if not re.match(r"[A-Za-z_\\]", token):
+            raise NetlistError(f"Expected an identifier, found '{token}'.")
+        return token[1:] if token.startswith("\\") else token
+
+
+# --- Expressions
+
+# ("num", value) | ("const", bits) | ("id", name) | ("op", op, a, b)
+# | ("neg", a) | ("not", a) | ("bit", a, index) | ("part", a, msb, lsb)
+# | ("concat", [a, ...])
+Expr = tuple
+
+PRECEDENCE = [
+    ["||"],
+    ["&&"],
+    ["==", "!="],
+    ["<", "<=", ">", ">="],
+    ["<<", ">>"],
+    ["+", "-"],
+    ["*", "/", "%"],
+]
+
+
+def parse_expression(tokens: Tokens, level: int = 0) -> Expr:
+    if level == len(PRECEDENCE):
+        return parse_primary(tokens)
+    left = parse_expression(tokens, level + 1)
+    while tokens.peek() in PRECEDENCE[level]:
+        op = tokens.next()
+        left = ("op", op, left, parse_expression(tokens, level + 1))
+    return left
+
+
+def parse_constant(token: str) -> Expr:
+    """
+    >>> parse_constant("4'b10x1")
+    ('const', '1x01')
+    """
+    width, value = re.sub(r"\s", "", token).split("'")
+    base, digits = value[-len(value.lstrip("sS")) :][0].lower(), value.lstrip("sS")[1:]
+    digits = digits.replace("_", "").lower()
+    bits_per_digit = {"b": 1, "o": 3, "h": 4, "d": 0}[base]
+    if bits_per_digit == 0:
+        bits = bin(int(digits))[2:][::-1]
+    else:
+        bits = ""
+        for digit in reversed(digits):
+            if digit in "xz?":
+                bits += ("x" if digit == "x" else "z") * bits_per_digit
+            else:
+                bits += bin(int(digit, 16))[2:].zfill(bits_per_digit)[::-1]
+    bits = (bits + "0" * int(width))[: int(width)]
+    return ("const", bits)
+
+
+def parse_primary(tokens: Tokens) -> Expr:
+    token = tokens.next()
+    if token == "(":
+        expr = parse_expression(tokens)
+        tokens.expect(")")
+    elif token == "{":
+        items = [parse_expression(tokens)]
+        while tokens.accept(","):
+            items.append(parse_expression(tokens))
+        tokens.expect("}")
+        expr = ("concat", items)
+    elif token == "-":
+        return ("neg", parse_primary(tokens))
+    elif token == "!":
+        return ("not", parse_primary(tokens))
+    elif "'" in token:
+        return parse_constant(token)
+    elif token.isdigit():
+        return ("num", int(token))
+    elif re.match(r"[A-Za-z_\\]", token):
+        expr = ("id", token[1:] if token.startswith("\\") else token)
+    else:
+        raise NetlistError(f"Unexpected '{token}' in expression.")
+    while tokens.accept("["):
+        msb = parse_expression(tokens)
+        if tokens.accept(":"):
+            expr = ("part", expr, msb, parse_expression(tokens))
+        else:
+            expr = ("bit", expr, msb)
+        tokens.expect("]")
+    return expr
+
+
+OPERATORS = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: a // b,
+    "%": lambda a, b: a % b,
+    "<<": lambda a, b: a << b,
+    ">>": lambda a, b: a >> b,
+    "==": lambda a, b: int(a == b),
+    "!=": lambda a, b: int(a != b),
+    "<": lambda a, b: int(a < b),
+    "<=": lambda a, b: int(a <= b),
+    ">": lambda a, b: int(a > b),
+    ">=": lambda a, b: int(a >= b),
+    "&&": lambda a, b: int(bool(a) and bool(b)),
+    "||": lambda a, b: int(bool(a) or bool(b)),
+}
+
+
+def evaluate(expr: Expr, env: Dict[str, int]) -> int:
+    """
+    >>> evaluate(parse_expression(Tokens(tokenize("(i+1)*8-1"))), {"i": 2})
+    23
+    """
+    kind = expr[0]
+    if kind == "num":
+        return expr[1]
+    if kind == "const":
+        if set(expr[1]) - set("01"):
+            raise NetlistError("Undefined bits in a constant expression.")
+        return int(expr[1][::-1] or "0", 2)
+    if kind == "id":
+        if expr[1] not in env:
+            raise NetlistError(f"'{expr[1]}' is not a parameter or genvar.")
+        return env[expr[1]]
+    if kind == "op":
+        return OPERATORS[expr[1]](evaluate(expr[2], env), evaluate(expr[3], env))
+    if kind == "neg":
+        return -evaluate(expr[1], env)
+    if kind == "not":
+        return int(not evaluate(expr[1], env))
+    raise NetlistError(f"Cannot evaluate {expr[0]} expressions.")
+
+
+# --- Modules
+
+Range = Tuple[Expr, Expr]
+
+
+class Port(object):
+    def __init__(self, name: str, direction: str, range: Optional[Range]):
+        self.name = name
+        self.direction = direction
+        self.range = range
+
+
+class Module(object):
+    def __init__(self, name: str):
+        self.name = name
+        self.parameters: List[Tuple[str, Expr]] = []
+        self.ports: List[Port] = []
+        self.items: List[tuple] = []
+
+
+def parse_range(tokens: Tokens) -> Optional[Range]:
+    if not tokens.accept("["):
+        return None
+    msb = parse_expression(tokens)
+    tokens.expect(":")
+    lsb = parse_expression(tokens)
+    tokens.expect("]")
+    return msb, lsb
+
+
+def parse_module(tokens: Tokens) -> Module:
+    module = Module(tokens.identifier())
+    if tokens.accept("#"):
+        tokens.expect("(")
+        while not tokens.accept(")"):
+            tokens.accept("parameter")
+            tokens.accept("integer")
+            name = tokens.identifier()
+            tokens.expect("=")
+            module.parameters.append((name, parse_expression(tokens)))
+            tokens.accept(",")
+    tokens.expect("(")
+    direction = None
+    while not tokens.accept(")"):
+        if tokens.peek() in ["input", "output", "inout"]:
+            direction = tokens.next()
+            tokens.accept("wire")
+            range = parse_range(tokens)
+        elif direction is None:
+            raise NetlistError(
+                f"Module {module.name} does not have an ANSI-style header."
+            )
+        module.ports.append(Port(tokens.identifier(), direction, range))
+        tokens.accept(",")
+    tokens.expect(";")
+    module.items = parse_items(tokens, ["endmodule"])
+    tokens.expect("endmodule")
+    return module
+
+
+def parse_items(tokens: Tokens, until: List[str]) -> List[tuple]:
+    items: List[tuple] = []
+    while tokens.peek() not in until:
+        items += parse_item(tokens)
+    return items
+
+
+def parse_block(tokens: Tokens) -> tuple:
+    """
+    A generate block: ``begin [: label] … end`` or a single item.
+    """
+    if tokens.accept("begin"):
+        label = None
+        if tokens.accept(":"):
+            label = tokens.identifier()
+        items = parse_items(tokens, ["end"])
+        tokens.expect("end")
+        return label, items
+    return None, parse_item(tokens)
+
+
+def parse_item(tokens: Tokens) -> List[tuple]:
+    token = tokens.peek()
+    if token in ["generate", "endgenerate"]:
+        tokens.next()
+        return []
+    if token == "genvar":
+        while tokens.next() != ";":
+            pass
+        return []
+    if token in ["parameter", "localparam"]:
+        tokens.next()
+        items = []
+        while True:
+            name = tokens.identifier()
+            tokens.expect("=")
+            items.append(("parameter", name, parse_expression(tokens)))
+            if not tokens.accept(","):
+                break
+        tokens.expect(";")
+        return items
+    if token == "wire":
+        tokens.next()
+        range = parse_range(tokens)
+        items = []
+        while True:
+            name = tokens.identifier()
+            items.append(("wire", name, range, parse_range(tokens)))
+            if not tokens.accept(","):
+                break
+        tokens.expect(";")
+        return items
+    if token == "for":
+        tokens.next()
+        tokens.expect("(")
+        variable = tokens.identifier()
+        tokens.expect("=")
+        initial = parse_expression(tokens)
+        tokens.expect(";")
+        condition = parse_expression(tokens)
+        tokens.expect(";")
+        if tokens.identifier() != variable:
+            raise NetlistError("Generate loops must step their own genvar.")
+        tokens.expect("=")
+        step = parse_expression(tokens)
+        tokens.expect(")")
+        label, items = parse_block(tokens)
+        return [("for", variable, initial, condition, step, label, items)]
+    if token == "if":
+        tokens.next()
+        tokens.expect("(")
+        condition = parse_expression(tokens)
+        tokens.expect(")")
+        then_label, then_items = parse_block(tokens)
+        else_label, else_items = None, []
+        if tokens.accept("else"):
+            else_label, else_items = parse_block(tokens)
+        return [("if", condition, (then_label, then_items), (else_label, else_items))]
+    if token == "begin":
+        label, items = parse_block(tokens)
+        return [("block", label, items)]
+    if token in ["assign", "always", "initial", "reg", "input", "output", "inout"]:
+        raise NetlistError(f"'{token}' is not supported.")
+    return [parse_instance(tokens)]
+
+
+def parse_instance(tokens: Tokens) -> tuple:
+    kind = tokens.identifier()
+    parameters: Dict[str, Expr] = {}
+    if tokens.accept("#"):
+        tokens.expect("(")
+        while not tokens.accept(")"):
+            tokens.expect(".")
+            name = tokens.identifier()
+            tokens.expect("(")
+            parameters[name] = parse_expression(tokens)
+            tokens.expect(")")
+            tokens.accept(",")
+    name = tokens.identifier()
+    array = parse_range(tokens)
+    connections: Dict[str, Optional[Expr]] = {}
+    tokens.expect("(")
+    while not tokens.accept(")"):
+        tokens.expect(".")
+        pin = tokens.identifier()
+        tokens.expect("(")
+        connections[pin] = None if tokens.peek() == ")" else parse_expression(tokens)
+        tokens.expect(")")
+        tokens.accept(",")
+    tokens.expect(";")
+    return ("instance", kind, parameters, name, array, connections)
+
+
+def parse_sources(
+    sources: Iterable[str], defines: Iterable[str] = ()
+) -> Dict[str, Module]:
+    modules: Dict[str, Module] = {}
+    defined = set(defines)
+    for source in sources:
+        tokens = Tokens(tokenize(preprocess(source, defined)))
+        while tokens.peek() is not None:
+            if tokens.next() == "module":
+                module = parse_module(tokens)
+                modules[module.name] = module
+    return modules
+
+
+# --- Elaboration
+
+
+class Net(object):
+    __slots__ = ("name", "port")
+
+    def __init__(self, name: str, port: Optional[Tuple[str, Optional[int]]] = None):
+        self.name = name
+        self.port = port
+
+
+# Constant drivers; undefined bits are left unconnected
+CONSTANTS = {"0": Net("1'b0"), "1": Net("1'b1")}
+
+Bits = List[Optional[Net]]  # Least significant bit first
+
+
+class Signal(object):
+    """
+    A vector of nets, or an array of vectors, indexed as declared.
+    """
+
+    def __init__(self, msb: int, lsb: int, bits: Bits, elements=None):
+        self.msb, self.lsb = msb, lsb
+        self.bits = bits
+        self.elements: Optional[Dict[int, "Signal"]] = elements
+
+    def position(self, index: int) -> Optional[int]:
+        position = index - self.lsb if self.msb >= self.lsb else self.lsb - index
+        if position < 0 or position >= len(self.bits):
+            return None
+        return position
+
+    def bit(self, index: int) -> Bits:
+        position = self.position(index)
+        return [None if position is None else self.bits[position]]
+
+    def part(self, msb: int, lsb: int) -> Bits:
+        step = 1 if msb >= lsb else -1
+        result: Bits = []
+        for index in range(lsb, msb + step, step):
+            result += self.bit(index)
+        return result
+
+
+def declared_indices(msb: int, lsb: int) -> List[int]:
+    """
+    The indices of a range, left to right.
+    """
+    return list(range(msb, lsb - 1, -1)) if msb >= lsb else list(range(msb, lsb + 1))
+
+
+class Cell(object):
+    __slots__ = ("name", "master", "pins")
+
+    def __init__(self, name: str, master: str, pins: Dict[str, Net]):
+        self.name = name
+        self.master = master
+        self.pins = pins
+
+
+class Netlist(object):
+    def __init__(self, name: str):
+        self.name = name
+        self.ports: List[Tuple[str, str, Optional[Tuple[int, int]], Bits]] = []
+        self.cells: List[Cell] = []
+
+    def write_verilog(self, file: TextIO):
+        file.write(f"module {escape(self.name)}(")
+        file.write(", ".join(escape(name) for _, name, _, _ in self.ports))
+        file.write(");\n")
+        for direction, name, range, _ in self.ports:
+            width = "" if range is None else f"[{range[0]}:{range[1]}] "
+            file.write(f"  {direction} {width}{escape(name)};\n")
+
+        declared: Set[int] = set()
+        for cell in self.cells:
+            for net in cell.pins.values():
+                if net.port is None and id(net) not in declared:
+                    if net.name not in ["1'b0", "1'b1"]:
+                        file.write(f"  wire {escape(net.name)};\n")
+                    declared.add(id(net))
+
+        for cell in self.cells:
+            connections = ", ".join(
+                f".{pin}({reference(net)})" for pin, net in cell.pins.items()
+            )
+            file.write(f"  {cell.master} {escape(cell.name)} ({connections});\n")
+        file.write("endmodule\n")
+
+
+def escape(name: str) -> str:
+    if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_$]*", name):
+        return name
+    return f"\\{name} "
+
+
+def reference(net: Net) -> str:
+    if net.port is not None:
+        name, index = net.port
+        return escape(name) if index is None else f"{escape(name)}[{index}]"
+    if net.name in ["1'b0", "1'b1"]:
+        return net.name
+    return escape(net.name)
+
+
+class Scope(object):
+    def __init__(self, parent: Optional["Scope"] = None):
+        self.parent = parent
+        self.signals: Dict[str, Signal] = {}
+
+    def lookup(self, name: str) -> Signal:
+        scope: Optional[Scope] = self
+        while scope is not None:
+            if name in scope.signals:
+                return scope.signals[name]
+            scope = scope.parent
+        raise NetlistError(f"Undeclared signal '{name}'.")
+
+
+class Elaborator(object):
+    """
+    Elaborates a module of the parsed sources to a flat netlist, naming
+    instances and nets by their hierarchical paths.
+    """
+
+    MAX_ITERATIONS = 1 << 20
+
+    def __init__(self, modules: Dict[str, Module]):
+        self.modules = modules
+        self.netlist = Netlist("")
+
+    def elaborate(self, top: str, parameters: Dict[str, int]) -> Netlist:
+        if top not in self.modules:
+            raise NetlistError(f"Module {top} not found.")
+        module = self.modules[top]
+        self.netlist = Netlist(top)
+        env = self.parameters(module, parameters)
+        bindings: Dict[str, Bits] = {}
+        for port in module.ports:
+            msb, lsb, width = self.range(port.range, env)
+            if port.range is None:
+                bits: Bits = [Net(port.name, (port.name, None))]
+            else:
+                indices = declared_indices(msb, lsb)[::-1]
+                bits = [Net(f"{port.name}[{i}]", (port.name, i)) for i in indices]
+            bindings[port.name] = bits
+            self.netlist.ports.append(
+                (
+                    port.direction,
+                    port.name,
+                    None if port.range is None else (msb, lsb),
+                    bits,
+                )
+            )
+        self.instantiate(module, env, "", bindings)
+        return self.netlist
+
+    def parameters(self, module: Module, overrides: Dict[str, int]) -> Dict[str, int]:
+        env: Dict[str, int] = {}
+        for name, default in module.parameters:
+            env[name] = overrides[name] if name in overrides else evaluate(default, env)
+        return env
+
+    def range(
+        self, range: Optional[Range], env: Dict[str, int]
+    ) -> Tuple[int, int, int]:
+        if range is None:
+            return 0, 0, 1
+        msb, lsb = evaluate(range[0], env), evaluate(range[1], env)
+        return msb, lsb, abs(msb - lsb) + 1
+
+    def port_widths(self, module: Module, env: Dict[str, int]) -> Dict[str, int]:
+        return {port.name: self.range(port.range, env)[2] for port in module.ports}
+
+    def instantiate(
+        self,
+        module: Module,
+        env: Dict[str, int],
+        prefix: str,
+        bindings: Dict[str, Bits],
+    ):
+        scope = Scope()
+        for port in module.ports:
+            msb, lsb, width = self.range(port.range, env)
+            bits = list(bindings.get(port.name, []))[:width]
+            indices = declared_indices(msb, lsb)[::-1]
+            for position in range(width):
+                if position >= len(bits):
+                    bits.append(None)
+                if bits[position] is None:
+                    name = (
+                        port.name
+                        if port.range is None
+                        else f"{port.name}[{indices[position]}]"
+                    )
+                    bits[position] = Net(prefix + name)
+            scope.signals[port.name] = Signal(msb, lsb, bits)
+        self.items(module.items, dict(env), scope, prefix)
+
+    def declare(self, name: str, range, array, env, scope: Scope, prefix: str):
+        msb, lsb, width = self.range(range, env)
+        indices = declared_indices(msb, lsb)[::-1]
+
+        def vector(base: str) -> Signal:
+            if range is None:
+                return Signal(0, 0, [Net(base)])
+            return Signal(msb, lsb, [Net(f"{base}[{i}]") for i in indices])
+
+        if array is None:
+            scope.signals[name] = vector(prefix + name)
+            return
+        first, last, _ = self.range(array, env)
+        elements = {
+            i: vector(f"{prefix}{name}[{i}]") for i in declared_indices(first, last)
+        }
+        scope.signals[name] = Signal(first, last, [], elements)
+
+    def items(self, items: List[tuple], env: Dict[str, int], scope: Scope, prefix: str):
+        for item in items:
+            kind = item[0]
+            if kind == "parameter":
+                env[item[1]] = evaluate(item[2], env)
+            elif kind == "wire":
+                self.declare(item[1], item[2], item[3], env, scope, prefix)
+            elif kind == "for":
+                _, variable, initial, condition, step, label, body = item
+                loop_env = dict(env)
+                loop_env[variable] = evaluate(initial, loop_env)
+                iterations = 0
+                while evaluate(condition, loop_env):
+                    value = loop_env[variable]
+                    path = prefix if label is None else f"{prefix}{label}[{value}]."
+                    self.items(body, dict(loop_env), Scope(scope), path)
+                    loop_env[variable] = evaluate(step, loop_env)
+                    iterations += 1
+                    if iterations > Elaborator.MAX_ITERATIONS:
+                        raise NetlistError("Runaway generate loop.")
+            elif kind == "if":
+                label, body = item[2] if evaluate(item[1], env) else item[3]
+                path = prefix if label is None else f"{prefix}{label}."
+                self.items(body, dict(env), Scope(scope), path)
+            elif kind == "block":
+                path = prefix if item[1] is None else f"{prefix}{item[1]}."
+                self.items(item[2], dict(env), Scope(scope), path)
+            elif kind == "instance":
+                self.instance(item, env, scope, prefix)
+
+    def resolve(self, expr: Expr, env: Dict[str, int], scope: Scope) -> Bits:
+        kind = expr[0]
+        if kind == "const":
+            return [CONSTANTS.get(bit) for bit in expr[1]]
+        if kind == "num":
+            return [CONSTANTS[bit] for bit in bin(expr[1])[2:][::-1].ljust(32, "0")]
+        if kind == "concat":
+            result: Bits = []
+            for item in reversed(expr[1]):
+                result += self.resolve(item, env, scope)
+            return result
+        if kind in ["id", "bit", "part"]:
+            signal = self.signal(expr, env, scope)
+            if isinstance(signal, list):
+                return signal
+            if signal.elements is not None:
+                raise NetlistError("Arrays of wires can only be connected by element.")
+            return signal.bits
+        raise NetlistError(f"Cannot connect {kind} expressions.")
+
+    def signal(self, expr: Expr, env: Dict[str, int], scope: Scope):
+        """
+        Returns the signal or array element ``expr`` names, or its bits if it
+        selects from a vector.
+        """
+        kind = expr[0]
+        if kind == "id":
+            return scope.lookup(expr[1])
+        target = self.signal(expr[1], env, scope)
+        if isinstance(target, list):
+            raise NetlistError("Nested selects of vectors are not supported.")
+        if kind == "bit":
+            index = evaluate(expr[2], env)
+            if target.elements is not None:
+                if index not in target.elements:
+                    raise NetlistError(f"Index {index} out of the array's range.")
+                return target.elements[index]
+            return target.bit(index)
+        return target.part(evaluate(expr[2], env), evaluate(expr[3], env))
+
+    def instance(self, item: tuple, env: Dict[str, int], scope: Scope, prefix: str):
+        _, kind, parameters, name, array, connections = item
+        module = self.modules.get(kind)
+        if module is not None:
+            child_env = self.parameters(
+                module, {k: evaluate(v, env) for k, v in parameters.items()}
+            )
+            widths = self.port_widths(module, child_env)
+        elif len(parameters):
+            raise NetlistError(f"Cell {kind} cannot take parameters.")
+
+        names = [name]
+        if array is not None:
+            first, last, _ = self.range(array, env)
+            names = [f"{name}[{i}]" for i in declared_indices(first, last)]
+
+        resolved = {
+            pin: [] if expr is None else self.resolve(expr, env, scope)
+            for pin, expr in connections.items()
+        }
+        count = len(names)
+        for element, instance_name in enumerate(names):
+            bindings: Dict[str, Bits] = {}
+            for pin, bits in resolved.items():
+                width = widths.get(pin, 1) if module is not None else 1
+                if module is not None and pin not in widths:
+                    raise NetlistError(f"{kind} has no port {pin}.")
+                if count > 1 and len(bits) == width * count:
+                    # The leftmost element gets the most significant bits
+                    start = (count - 1 - element) * width
+                    bits = bits[start : start + width]
+                bindings[pin] = bits[:width]
+            path = prefix + instance_name
+            if module is not None:
+                self.instantiate(module, child_env, path + ".", bindings)
+            else:
+                pins = {
+                    pin: bits[0]
+                    for pin, bits in bindings.items()
+                    if len(bits) and bits[0] is not None
+                }
+                self.netlist.cells.append(Cell(path, kind, pins))
+
+
+def generate(
+    sources: Iterable[str],
+    top: str,
+    parameters: Dict[str, int],
+    defines: Iterable[str] = (),
+) -> Netlist:
+    """
+    >>> import os
+    >>> root = os.path.join(os.path.dirname(__file__), *[".."] * 4)
+    >>> sources = [
+    ...     open(os.path.join(root, "platforms", "sky130A", "sky130_fd_sc_hd", "block_definitions.v")).read(),
+    ...     open(os.path.join(root, "models", "ram", "model.v")).read(),
+    ... ]
+    >>> netlist = generate(sources, "RAM8", {"WSIZE": 1, "USE_LATCH": 1})
+    >>> from placeram.synthetic import SyntheticNetlist
+    >>> sorted((c.name, c.master) for c in netlist.cells) == sorted(
+    ...     (name.replace("\\\\", ""), master)
+    ...     for name, master in SyntheticNetlist.for_model(8, 8).cells
+    ... )
+    True
+    """
+    return Elaborator(parse_sources(sources, defines)).elaborate(top, parameters)
+
+
+# --- Comparison
+
+
+def read_flat(
+    text: str,
+) -> Tuple[Dict[str, Tuple[str, Dict[str, object]]], Dict[object, List]]:
+    """
+    Reads a flat gate-level netlist as written by Yosys' ``write_verilog`` or
+    by :meth:`Netlist.write_verilog`.
+
+    Returns every cell's master and pin connections, and every net, by an
+    arbitrary representative, with the cell pins and top-level port bits
+    connected to it.
+    """
+    tokens = Tokens(tokenize(preprocess(text, set())))
+    while tokens.next() != "module":
+        pass
+    tokens.identifier()
+    while tokens.next() != ";":
+        pass
+
+    widths: Dict[str, List[int]] = {}
+    directions: Dict[str, str] = {}
+    parent: Dict[object, object] = {}
+
+    def find(bit):
+        root = bit
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while bit != root:
+            parent[bit], bit = root, parent.get(bit, bit)
+        return root
+
+    def bits(expr: Expr) -> List[object]:
+        kind = expr[0]
+        if kind == "const":
+            return [("const", bit) if bit in "01" else None for bit in expr[1]]
+        if kind == "num":
+            return [("const", bit) for bit in bin(expr[1])[2:][::-1].ljust(32, "0")]
+        if kind == "concat":
+            result: List[object] = []
+            for item in reversed(expr[1]):
+                result += bits(item)
+            return result
+        if kind == "id":
+            indices = widths.get(expr[1], [None])
+            return [(expr[1], i) for i in indices]
+        if kind == "bit":
+            return [(expr[1][1], evaluate(expr[2], {}))]
+        if kind == "part":
+            msb, lsb = evaluate(expr[2], {}), evaluate(expr[3], {})
+            return [(expr[1][1], i) for i in declared_indices(msb, lsb)[::-1]]
+        raise NetlistError(f"Unexpected {kind} expression in a netlist.")
+
+    cells: Dict[str, Tuple[str, Dict[str, object]]] = {}
+    while not tokens.accept("endmodule"):
+        token = tokens.peek()
+        if token in ["input", "output", "inout", "wire"]:
+            tokens.next()
+            range = parse_range(tokens)
+            while True:
+                name = tokens.identifier()
+                if range is None:
+                    widths[name] = [None]
+                else:
+                    msb, lsb = evaluate(range[0], {}), evaluate(range[1], {})
+                    widths[name] = declared_indices(msb, lsb)[::-1]
+                if token != "wire":
+                    directions[name] = token
+                if not tokens.accept(","):
+                    break
+            tokens.expect(";")
+        elif token == "assign":
+            tokens.next()
+            left = bits(parse_expression(tokens))
+            tokens.expect("=")
+            right = bits(parse_expression(tokens))
+            tokens.expect(";")
+            for a, b in zip(left, right):
+                if a is not None and b is not None:
+                    parent[find(a)] = find(b)
+        else:
+            _, master, _, name, _, connections = parse_instance(tokens)
+            pins = {}
+            for pin, expr in connections.items():
+                if expr is None:
+                    continue
+                connected = bits(expr)
+                if len(connected) and connected[0] is not None:
+                    pins[pin] = connected[0]
+            cells[name] = (master, pins)
+
+    nets: Dict[object, List] = {}
+    for name, (_, pins) in cells.items():
+        for pin, bit in pins.items():
+            nets.setdefault(find(bit), []).append((name, pin))
+    for name in directions:
+        for i in widths[name]:
+            nets.setdefault(find((name, i)), []).append((name, i))
+    for bit in [("const", "0"), ("const", "1")]:
+        if find(bit) in nets:
+            nets[find(bit)].append(bit)
+    return cells, nets
+
+
+UNNAMED_SCOPE_RX = re.compile(r"(?:^|(?<=\.))genblk\d+\.")
+
+
+def normalize(name: str) -> str:
+    """
+    Drops the names Yosys may give unnamed generate blocks.
+
+    >>> normalize("BYTE[0].B.genblk1.CLKINV")
+    'BYTE[0].B.CLKINV'
+    """
+    return UNNAMED_SCOPE_RX.sub("", name)
+
+
+def compare(a: str, b: str, limit: int = 10) -> List[str]:
+    """
+    Returns the structural differences between two flat netlists, if any.
+    """
+    differences: List[str] = []
+    netlists = []
+    for text in [a, b]:
+        cells, nets = read_flat(text)
+        renamed = {normalize(name): cell for name, cell in cells.items()}
+        signatures = Counter()
+        for connections in nets.values():
+            signatures[
+                frozenset(
+                    (normalize(x), y) if isinstance(y, str) and x != "const" else (x, y)
+                    for x, y in connections
+                )
+            ] += 1
+        netlists.append((renamed, signatures))
+
+    (cells_a, nets_a), (cells_b, nets_b) = netlists
+    for name in sorted(set(cells_a) - set(cells_b))[:limit]:
+        differences.append(f"{name} ({cells_a[name][0]}) is only in the first netlist.")
+    for name in sorted(set(cells_b) - set(cells_a))[:limit]:
+        differences.append(
+            f"{name} ({cells_b[name][0]}) is only in the second netlist."
+        )
+    for name in sorted(set(cells_a) & set(cells_b)):
+        if cells_a[name][0] != cells_b[name][0]:
+            differences.append(
+                f"{name} is a {cells_a[name][0]} in the first netlist but a {cells_b[name][0]} in the second."
+            )
+    for signature in list((nets_a - nets_b).keys())[:limit]:
+        differences.append(
+            f"Net connecting {sorted(signature, key=str)} is only in the first netlist."
+        )
+    for signature in list((nets_b - nets_a).keys())[:limit]:
+        differences.append(
+            f"Net connecting {sorted(signature, key=str)} is only in the second netlist."
+        )
+    return differences
+
+
+# --- Command-line interface
+
+
+def parse_parameter(value: str) -> Tuple[str, int]:
+    name, expr = value.split("=", 1)
+    return name.strip(), evaluate(parse_expression(Tokens(tokenize(expr))), {})
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command("generate")
+@click.option("-t", "--top", required=True, help="The module to elaborate")
+@click.option(
+    "-p",
+    "--parameter",
+    "parameters",
+    multiple=True,
+    help="A parameter of the top module, as NAME=VALUE",
+)
+@click.option("-D", "--define", "defines", multiple=True, help="A preprocessor define")
+@click.option("-o", "--output", required=True, help="The netlist to write")
+@click.option(
+    "--metrics/--no-metrics",
+    default=False,
+    help="Report the instance count as a librelane metric",
+)
+@click.argument("sources", nargs=-1, required=True)
+def generate_cmd(top, parameters, defines, output, metrics, sources):
+    """
+    Writes the flattened netlist of TOP, elaborated from SOURCES.
+    """
+    texts = [open(source, encoding="utf8").read() for source in sources]
+    netlist = generate(
+        texts, top, dict(parse_parameter(p) for p in parameters), defines
+    )
+    with open(output, "w", encoding="utf8") as f:
+        netlist.write_verilog(f)
+    if metrics:
+        print(f"%OL_METRIC_I design__instance__count {len(netlist.cells)}")
+
+
+@cli.command("compare")
+@click.argument("first")
+@click.argument("second")
+def compare_cmd(first, second):
+    """
+    Checks that two flat netlists are structurally equivalent.
+    """
+    differences = compare(
+        open(first, encoding="utf8").read(), open(second, encoding="utf8").read()
+    )
+    for difference in differences:
+        print(difference, file=sys.stderr)
+    print(json.dumps({"equivalent": len(differences) == 0}))
+    if len(differences):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,138 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+from bisect import bisect_left, bisect_right
+from typing import List, Sequence
+
+
+class RowOccupancy(object):
+    """
+    The cursor of every row, kept in flat lists: where its next cell goes
+    (``x``, in DBUs), the width placed since its last tap and its cell, tap
+    and fill counters.
+
+    The width of every row in sites is also kept as sorted intervals of
+    consecutive rows of the same width, which answer "widest row in this
+    range" and "which rows in this range are narrower than this" with a
+    bisection and a walk over the intervals in the range. Placement pads
+    every range of rows it fills to a single width, so there are far fewer
+    intervals than rows. Rows that moved are only flagged, and the
+    intervals brought up to date when they are next queried.
+
+    >>> occupancy = RowOccupancy([4, 9, 2, 9, 7], [0] * 5, 1)
+    >>> occupancy.max(0, 5), occupancy.max(2, 3)
+    (9, 2)
+    >>> occupancy.below(0, 5, 9)
+    [0, 2, 4]
+    >>> occupancy.advance(2, 7, False)
+    >>> occupancy.below(1, 4, 9), occupancy.starts
+    ([], [0, 1, 4])
+    """
+
+    def __init__(self, x: Sequence[int], since_last_tap: Sequence[float], sw: int):
+        self.count = len(x)
+        self.sw = sw
+
+        # Lists rather than arrays, which would box and unbox every value
+        # read and written for every cell placed
+        self.x: List[int] = list(x)
+        self.since_last_tap: List[float] = list(since_last_tap)
+        self.cell_counter: List[int] = [0] * self.count
+        self.tap_counter: List[int] = [0] * self.count
+        self.fill_counter: List[int] = [0] * self.count
+
+        self.moved: List[bool] = [False] * self.count
+        self.pending: List[int] = []
+
+        # Rows [starts[k], starts[k + 1]) are widths[k] sites wide
+        self.starts: List[int] = []
+        self.widths: List[int] = []
+        for index in range(self.count):
+            width = self.width(index)
+            if len(self.widths) == 0 or self.widths[-1] != width:
+                self.starts.append(index)
+                self.widths.append(width)
+
+    def width(self, index: int) -> int:
+        return int(self.x[index] / self.sw)
+
+    def advance(self, index: int, width: int, is_tap: bool):
+        if is_tap:
+            self.since_last_tap[index] = 0
+        else:
+            self.since_last_tap[index] += width
+        self.x[index] += width
+        self.cell_counter[index] += 1
+        if not self.moved[index]:
+            self.moved[index] = True
+            self.pending.append(index)
+
+    def mark_moved(self, index: int):
+        if not self.moved[index]:
+            self.moved[index] = True
+            self.pending.append(index)
+
+    def refresh(self):
+        """
+        Brings the intervals of the rows that moved up to date.
+        """
+        moved = self.moved
+        for index in self.pending:
+            moved[index] = False
+            self.assign(index, self.width(index))
+        self.pending = []
+
+    def end(self, k: int) -> int:
+        return self.starts[k + 1] if k + 1 < len(self.starts) else self.count
+
+    def assign(self, index: int, value: int):
+        """
+        Sets the width of one row, splitting its interval and merging it
+        with its neighbours as needed.
+        """
+        starts, widths = self.starts, self.widths
+        k = bisect_right(starts, index) - 1
+        if widths[k] == value:
+            return
+        if index + 1 < self.end(k):
+            starts.insert(k + 1, index + 1)
+            widths.insert(k + 1, widths[k])
+        if starts[k] != index:
+            k += 1
+            starts.insert(k, index)
+            widths.insert(k, value)
+        else:
+            widths[k] = value
+        if k + 1 < len(starts) and widths[k + 1] == value:
+            del starts[k + 1]
+            del widths[k + 1]
+        if k > 0 and widths[k - 1] == value:
+            del starts[k]
+            del widths[k]
+
+    def max(self, from_index: int, to_index: int) -> int:
+        """
+        from inclusive; to exclusive
+        """
+        self.refresh()
+        first = bisect_right(self.starts, from_index) - 1
+        last = bisect_left(self.starts, to_index)
+        return max(self.widths[first:last])
+
+    def below(self, from_index: int, to_index: int, threshold: int) -> List[int]:
+        """
+        Returns, in ascending order, every index in [from_index, to_index)
+        whose width is less than ``threshold``. Intervals at or above the
+        threshold are skipped whole.
+        """
+        self.refresh()
+        starts, widths = self.starts, self.widths
+        first = bisect_right(starts, from_index) - 1
+        last = bisect_left(starts, to_index)
+        result: List[int] = []
+        for k in range(first, last):
+            if widths[k] < threshold:
+                result.extend(
+                    range(max(starts[k], from_index), min(self.end(k), to_index))
+                )
+        return result
@@ -0,0 +1,183 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+from typing import Dict, List, Optional, Tuple
+
+INFINITY = float("inf")
+
+
+class FillPacker(object):
+    """
+    Packs a gap of a row, in sites, with as few fill and tap cells as
+    possible, such that no run of non-tap cells exceeds ``run_limit`` sites
+    and the row ends at most ``end_limit`` sites after its last tap, so cells
+    placed after the fill do not need taps any sooner.
+
+    A packing is a run of fills up to the next tap, then a tap, then the
+    optimal packing of what is left, so the minimum cell count of every gap
+    starting right after a tap is tabulated once per end limit and extended
+    as wider gaps come up. Complete packings are memoized by (gap, sites
+    since the last tap, end limit); packers themselves are shared per set
+    of fill sizes.
+
+    >>> packer = FillPacker([8, 4, 2], [1], 10)
+    >>> packer.pack(21, 0)
+    (8, 2, 1, 8, 2)
+    >>> packer.pack(21, 10)
+    (1, 8, 2, 1, 8, 1)
+    >>> packer.pack(21, 0, end_limit=4)
+    (8, 2, 1, 8, 1, 1)
+    >>> packer.pack(0, 3)
+    ()
+    """
+
+    packers: Dict[Tuple, "FillPacker"] = {}
+
+    def __init__(self, fill_sizes: List[int], tap_sizes: List[int], run_limit: int):
+        self.fill_sizes = sorted(fill_sizes, reverse=True)
+        self.tap_sizes = sorted(tap_sizes, reverse=True)
+        self.run_limit = run_limit
+
+        # Fewest fills (no taps) covering a run of exactly m sites, m <= limit
+        self.run_count: List[float] = [0] + [INFINITY] * run_limit
+        self.run_first: List[int] = [0] * (run_limit + 1)
+        for m in range(1, run_limit + 1):
+            for size in self.fill_sizes:
+                if size <= m and self.run_count[m - size] + 1 < self.run_count[m]:
+                    self.run_count[m] = self.run_count[m - size] + 1
+                    self.run_first[m] = size
+
+        # For each end limit, the fewest cells covering exactly g sites right
+        # after a tap and the (run, tap) choice achieving it
+        self.after_tap: Dict[int, Tuple[List[float], List[Tuple[int, int]]]] = {}
+
+        self.memo: Dict[Tuple[int, int, int], Tuple[int, ...]] = {}
+        self.greedy_memo: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+
+    @staticmethod
+    def get(
+        fill_sizes: List[int], tap_sizes: List[int], run_limit: int
+    ) -> "FillPacker":
+        key = (tuple(sorted(fill_sizes)), tuple(sorted(tap_sizes)), run_limit)
+        packer = FillPacker.packers.get(key)
+        if packer is None:
+            packer = FillPacker(fill_sizes, tap_sizes, run_limit)
+            FillPacker.packers[key] = packer
+        return packer
+
+    def best(
+        self, gap: int, since_last_tap: int, end_limit: int
+    ) -> Tuple[float, Tuple[int, int]]:
+        """
+        Returns the cell count and (run, tap) choice of the best packing,
+        where ``tap`` is 0 if the run covers the entire gap.
+        """
+        after_tap_count, _ = self.after_tap[end_limit]
+        count: float = INFINITY
+        choice = (0, 0)
+        longest_run = min(max(self.run_limit - since_last_tap, 0), gap)
+        for run in range(longest_run, -1, -1):
+            run_count = self.run_count[run]
+            if run_count == INFINITY:
+                continue
+            if run == gap:
+                if since_last_tap + run <= end_limit and run_count < count:
+                    count, choice = run_count, (run, 0)
+                continue
+            for tap in self.tap_sizes:
+                rest = gap - run - tap
+                if rest < 0:
+                    continue
+                candidate = run_count + 1 + after_tap_count[rest]
+                if candidate < count:
+                    count, choice = candidate, (run, tap)
+        return count, choice
+
+    def extend(self, gap: int, end_limit: int):
+        if end_limit not in self.after_tap:
+            self.after_tap[end_limit] = ([], [])
+        counts, choices = self.after_tap[end_limit]
+        for g in range(len(counts), gap + 1):
+            count, choice = self.best(g, 0, end_limit)
+            counts.append(count)
+            choices.append(choice)
+
+    def run(self, sites: int) -> List[int]:
+        cells = []
+        while sites > 0:
+            cells.append(self.run_first[sites])
+            sites -= self.run_first[sites]
+        return cells
+
+    def pack(
+        self, gap: int, since_last_tap: int, end_limit: Optional[int] = None
+    ) -> Optional[Tuple[int, ...]]:
+        """
+        Returns the sizes of the cells to place, in order, or None if the gap
+        cannot be covered exactly.
+        """
+        if gap == 0:
+            return ()
+        if end_limit is None or end_limit > self.run_limit:
+            end_limit = self.run_limit
+
+        key = (gap, since_last_tap, end_limit)
+        if key in self.memo:
+            return self.memo[key]
+
+        self.extend(gap, end_limit)
+        count, (run, tap) = self.best(gap, since_last_tap, end_limit)
+        if count == INFINITY:
+            self.memo[key] = None
+            return None
+
+        _, choices = self.after_tap[end_limit]
+        cells = self.run(run)
+        remaining = gap - run
+        while tap != 0:
+            cells.append(tap)
+            remaining -= tap
+            run, tap = choices[remaining]
+            cells += self.run(run)
+            remaining -= run
+
+        packed = tuple(cells)
+        self.memo[key] = packed
+        return packed
+
+    def greedy(self, gap: int, tap_width: int) -> Tuple[int, ...]:
+        """
+        The previous largest-first packing, which always starts with a tap.
+        Kept to measure the savings of :meth:`pack` and as a fallback.
+        """
+        key = (gap, tap_width)
+        if key in self.greedy_memo:
+            return self.greedy_memo[key]
+
+        fill_sizes = sorted(self.fill_sizes + self.tap_sizes, reverse=True)
+        fills = []
+        current = gap
+        tracker = 0
+
+        since_last_tap = 0
+        if current > tap_width:
+            # Always start with a tap.
+            fills.append(tap_width)
+            current -= tap_width
+
+        while current > 0:
+            current_fill = fill_sizes[tracker]
+            while current >= current_fill:
+                if since_last_tap + current_fill > self.run_limit:
+                    fills.append(tap_width)
+                    since_last_tap = 0
+                    current -= tap_width
+                else:
+                    fills.append(current_fill)
+                    since_last_tap += current_fill
+                    current -= current_fill
+            tracker += 1
+
+        packed = tuple(fills)
+        self.greedy_memo[key] = packed
+        return packed
@@ -6,10 +6,13 @@ import re
 import sys
 import yaml
 from odb import dbInst as Instance
-from typing import List, Dict, Union, TextIO, Optional
+from typing import List, Dict, Type, Union, TextIO, Optional, TYPE_CHECKING
 
 from .row import Row
-from .util import d2a, DeepDictionary
+from .util import d2a
+
+if TYPE_CHECKING:
+    from .classifier import SieveNode
 
 
 def dbInst__repr__(self):
@@ -31,6 +34,10 @@ def _load_regexes():
 
 
 class Placeable(object):
+    # Subclasses with many instances (e.g. bits) declare their variables as
+    # __slots__ too; the others keep a __dict__.
+    __slots__ = ("_sieved",)
+
     RegexDictionary: Dict[str, Dict[str, re.Pattern]] = _load_regexes()
 
     def regex_dict(self) -> Dict[str, re.Pattern]:
@@ -42,53 +49,52 @@ class Placeable(object):
             variable: str,
             groups: List[str] = [],
             group_rx_order=None,
-            custom_behavior=None,
+            child: Optional[Type["Placeable"]] = None,
+            child_args: Optional[Dict] = None,
         ):
+            """
+            Instances matched by a sieve with a ``child`` are sieved further
+            into a Placeable of that type, constructed with ``child_args``.
+            """
             self.variable = variable
             self.groups = groups
             self.groups_rx_order = group_rx_order or list(range(1, len(groups) + 1))
-            self.custom_behavior = custom_behavior
+            self.child = child
+            self.child_args = child_args or {}
 
-    def sieve(self, instances: List[Instance], sieves: List[Sieve]):
-        regexes = self.regex_dict()
-        for sieve in sieves:
-            depth = len(sieve.groups)
-            if depth == 0:
-                self.__dict__[sieve.variable] = None
-            else:
-                self.__dict__[sieve.variable] = DeepDictionary(depth)
-
-        for instance in instances:
-            n = instance.getName()
-            found = False
-            for sieve in sieves:
-                rx = regexes[sieve.variable]
-                result = rx.search(n)
-                if result is None:
-                    continue
-                found = True
-                if len(sieve.groups_rx_order) == 0:
-                    if sieve.custom_behavior is not None:
-                        sieve.custom_behavior(instance)
-                    else:
-                        self.__dict__[sieve.variable] = instance
-                else:
-                    access_order = []
-                    for ordinal in sieve.groups_rx_order:
-                        access_order.append(result.group(ordinal))
+    @staticmethod
+    def sieves() -> List[Sieve]:
+        """
+        Returns the sieves for this Placeable, largest subcomponents first.
+        """
+        raise Exception("Method unimplemented.")
 
-                    if sieve.custom_behavior is not None:
-                        sieve.custom_behavior(instance, *access_order)
+    def sieve(self, node: "SieveNode"):
+        """
+        Populates this Placeable's variables from a node built by the
+        classifier, constructing any child Placeables along the way.
+
+        The node's elements are released as they are consumed, so the
+        classifier's tree is freed while the hierarchy is being built.
+        """
+        self._sieved = node.variables
+        for sieve in node.sieves:
+            value = node.elements[sieve.variable]
+            depth = len(sieve.groups)
+            if sieve.child is not None:
 
-                    last_access = access_order.pop()
-                    accessible = self.__dict__[sieve.variable]
-                    for access in access_order:
-                        accessible = accessible[access]
+                def construct(child_node, sieve=sieve):
+                    return sieve.child(child_node, **sieve.child_args)
 
-                    accessible[last_access] = instance
-                break
-            if not found:
-                raise DataError("Unknown element in %s: %s" % (type(self).__name__, n))
+                if depth == 0:
+                    value = construct(value)
+                else:
+                    value = d2a(value, depth=depth, transform=construct)
+            elif depth != 0:
+                value = d2a(value, depth=depth)
+            node.elements[sieve.variable] = None
+            setattr(self, sieve.variable, value)
+        node.elements = None
 
     def place(self, row_list: List[Row], start_row: int = 0) -> int:
         """
@@ -97,20 +103,16 @@ class Placeable(object):
         raise Exception("Method unimplemented.")
 
     def represent(self, tab_level: int = -1, file: TextIO = sys.stderr):
-        for variable in self.__dict__:
+        variables = list(self._sieved)
+        for variable in getattr(self, "__dict__", {}):
+            if variable not in variables:
+                variables.append(variable)
+        for variable in variables:
             print(variable, file=file)
 
     def word_count(self):
         raise Exception("Method unimplemented.")
 
-    def dicts_to_lists(self):
-        """
-        Transforms all deep dictionaries into sorted lists.
-        """
-        for key, value in self.__dict__.items():
-            if isinstance(value, DeepDictionary):
-                self.__dict__[key] = d2a(value, depth=value.depth)
-
     @staticmethod
     def represent_instance(
         name: str, instance: Instance, tab_level: int, file: TextIO = sys.stderr
@@ -0,0 +1,303 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+import sys
+import struct
+from array import array
+from typing import BinaryIO, Callable, Collection, Dict, List, Sequence, TextIO
+
+# Deliberately free of ``odb``: a plan can be computed, saved, loaded and
+# inspected without a live OpenROAD database, and is only handed instances
+# (anything with getName/setOrient/setLocation/setPlacementStatus) to apply.
+
+ORIENTATIONS = ["R0", "R90", "R180", "R270", "MY", "MYR90", "MX", "MXR90"]
+ORIENTATION_CODES = {orientation: i for i, orientation in enumerate(ORIENTATIONS)}
+STATUSES = ["PLACED", "LOCKED"]
+# As read back from the database; DEF's FIXED is read as FIRM
+PLACED_STATUSES = {"PLACED", "LOCKED", "FIRM"}
+
+DEF_ORIENTATIONS = ["N", "W", "S", "E", "FN", "FE", "FS", "FW"]
+DEF_STATUSES = ["PLACED", "FIXED"]
+
+
+class PlanError(Exception):
+    pass
+
+
+class PlacementPlan(object):
+    """
+    A complete placement, stored as parallel arrays.
+
+    Instances are referred to by their index in ``names``; fills and taps,
+    which do not exist until the plan is applied, are recorded by kind, row,
+    per-row counter and size in sites, from which their names are derived.
+    """
+
+    MAGIC = b"DFFRAMPL"
+    VERSION = 1
+    HEADER = struct.Struct("<8sHxxIIIqq")
+
+    FILL = 0
+    TAP = 1
+    FILL_NAMES = ["fill_%i_%i", "tap_%i_%i"]
+
+    def __init__(self, names: List[str]):
+        self.names: List[str] = names
+        self.index: Dict[int, int] = {}
+        self.instances: Sequence = []
+
+        self.instance = array("i")
+        self.x = array("i")
+        self.y = array("i")
+        self.orientation = array("B")
+        self.status = array("B")
+
+        self.fill_kind = array("B")
+        self.fill_row = array("i")
+        self.fill_counter = array("i")
+        self.fill_sites = array("H")
+        self.fill_x = array("i")
+        self.fill_y = array("i")
+        self.fill_orientation = array("B")
+
+        self.width: int = 0
+        self.height: int = 0
+
+    @staticmethod
+    def for_instances(instances: Sequence) -> "PlacementPlan":
+        plan = PlacementPlan([instance.getName() for instance in instances])
+        plan.instances = instances
+        plan.index = {id(instance): i for i, instance in enumerate(instances)}
+        return plan
+
+    def __len__(self):
+        return len(self.instance) + len(self.fill_kind)
+
+    def place(self, instance, x: int, y: int, orientation: str, fixed: bool = False):
+        self.instance.append(self.index[id(instance)])
+        self.x.append(x)
+        self.y.append(y)
+        self.orientation.append(ORIENTATION_CODES[orientation])
+        self.status.append(1 if fixed else 0)
+
+    def fill(
+        self,
+        kind: int,
+        row: int,
+        counter: int,
+        sites: int,
+        x: int,
+        y: int,
+        orientation: str,
+    ):
+        self.fill_kind.append(kind)
+        self.fill_row.append(row)
+        self.fill_counter.append(counter)
+        self.fill_sites.append(int(sites))
+        self.fill_x.append(x)
+        self.fill_y.append(y)
+        self.fill_orientation.append(ORIENTATION_CODES[orientation])
+
+    def fill_name(self, i: int) -> str:
+        return PlacementPlan.FILL_NAMES[self.fill_kind[i]] % (
+            self.fill_row[i],
+            self.fill_counter[i],
+        )
+
+    def resolve(self, find_instance: Callable[[str], object]):
+        """
+        Binds a loaded plan to the instances of a database by name.
+        """
+        instances = []
+        for name in self.names:
+            instance = find_instance(name)
+            if instance is None:
+                raise PlanError("Instance %s in plan not found in design." % name)
+            instances.append(instance)
+        self.instances = instances
+        self.index = {id(instance): i for i, instance in enumerate(instances)}
+
+    def create_fills(self, create_fill: Callable[[str, int], object]) -> List:
+        return [
+            create_fill(self.fill_name(i), sites)
+            for i, sites in enumerate(self.fill_sites)
+        ]
+
+    def apply(self, create_fill: Callable[[str, int], object]):
+        """
+        Commits the plan to the database one instance at a time.
+        """
+        self.apply_locations(self.create_fills(create_fill))
+
+    def translate(self, dx: int, dy: int):
+        """
+        Moves every cell in the plan by (dx, dy), e.g. when the rows it was
+        placed on are recreated elsewhere.
+        """
+        self.x = array("i", [x + dx for x in self.x])
+        self.y = array("i", [y + dy for y in self.y])
+        self.fill_x = array("i", [x + dx for x in self.fill_x])
+        self.fill_y = array("i", [y + dy for y in self.fill_y])
+
+    def apply_locations(self, fills: List):
+        instances = self.instances
+        for i, ordinal in enumerate(self.instance):
+            instance = instances[ordinal]
+            instance.setOrient(ORIENTATIONS[self.orientation[i]])
+            instance.setLocation(self.x[i], self.y[i])
+            instance.setPlacementStatus(STATUSES[self.status[i]])
+
+        for i, fill in enumerate(fills):
+            fill.setOrient(ORIENTATIONS[self.fill_orientation[i]])
+            fill.setLocation(self.fill_x[i], self.fill_y[i])
+            fill.setPlacementStatus(STATUSES[0])
+
+    def unplaced(self, fills: List) -> List[str]:
+        """
+        Returns the names of the instances and fills of the plan that are
+        not placed in the database, e.g. the components a DEF read skipped.
+        """
+        instances = self.instances
+        unplaced = [
+            self.names[ordinal]
+            for ordinal in self.instance
+            if instances[ordinal].getPlacementStatus() not in PLACED_STATUSES
+        ]
+        unplaced += [
+            fill.getName()
+            for fill in fills
+            if fill.getPlacementStatus() not in PLACED_STATUSES
+        ]
+        return unplaced
+
+    def write_def(
+        self,
+        file: TextIO,
+        design: str,
+        dbu_per_micron: int,
+        masters: Sequence[str],
+        fill_masters: Dict[int, str],
+    ):
+        """
+        Writes the plan as a DEF with only a COMPONENTS section, which can be
+        committed in a single ``read_def -incremental`` once the fills and
+        taps have been created.
+
+        ``masters`` holds the master name of every instance in ``names``.
+        """
+        names = self.names
+        file.write("VERSION 5.8 ;\n")
+        file.write('DIVIDERCHAR "/" ;\n')
+        file.write('BUSBITCHARS "[]" ;\n')
+        file.write(f"DESIGN {design} ;\n")
+        file.write(f"UNITS DISTANCE MICRONS {dbu_per_micron} ;\n")
+        file.write(f"COMPONENTS {len(self)} ;\n")
+        for i, ordinal in enumerate(self.instance):
+            status = DEF_STATUSES[self.status[i]]
+            orientation = DEF_ORIENTATIONS[self.orientation[i]]
+            file.write(
+                f"    - {names[ordinal]} {masters[ordinal]} + {status} ( {self.x[i]} {self.y[i]} ) {orientation} ;\n"
+            )
+        for i, sites in enumerate(self.fill_sites):
+            orientation = DEF_ORIENTATIONS[self.fill_orientation[i]]
+            file.write(
+                f"    - {self.fill_name(i)} {fill_masters[sites]} + PLACED ( {self.fill_x[i]} {self.fill_y[i]} ) {orientation} ;\n"
+            )
+        file.write("END COMPONENTS\nEND DESIGN\n")
+
+    def arrays(self) -> List[array]:
+        return [
+            self.instance,
+            self.x,
+            self.y,
+            self.orientation,
+            self.status,
+            self.fill_kind,
+            self.fill_row,
+            self.fill_counter,
+            self.fill_sites,
+            self.fill_x,
+            self.fill_y,
+            self.fill_orientation,
+        ]
+
+    def save(self, file: BinaryIO):
+        names = "\0".join(self.names).encode("utf8")
+        file.write(
+            PlacementPlan.HEADER.pack(
+                PlacementPlan.MAGIC,
+                PlacementPlan.VERSION,
+                len(self.names),
+                len(self.instance),
+                len(self.fill_kind),
+                self.width,
+                self.height,
+            )
+        )
+        file.write(struct.pack("<Q", len(names)))
+        file.write(names)
+        for stored in self.arrays():
+            if sys.byteorder != "little":
+                stored = array(stored.typecode, stored)
+                stored.byteswap()
+            stored.tofile(file)
+
+    @staticmethod
+    def load(file: BinaryIO) -> "PlacementPlan":
+        header = PlacementPlan.read(file, PlacementPlan.HEADER.size)
+        magic, version, name_count, placed, fills, width, height = (
+            PlacementPlan.HEADER.unpack(header)
+        )
+        if magic != PlacementPlan.MAGIC:
+            raise PlanError("Not a placement plan.")
+        if version != PlacementPlan.VERSION:
+            raise PlanError("Unsupported placement plan version %i." % version)
+
+        (names_length,) = struct.unpack("<Q", PlacementPlan.read(file, 8))
+        try:
+            names = PlacementPlan.read(file, names_length).decode("utf8")
+        except UnicodeDecodeError:
+            raise PlanError("Corrupt instance table in placement plan.")
+        plan = PlacementPlan(names.split("\0") if name_count != 0 else [])
+        if len(plan.names) != name_count:
+            raise PlanError("Corrupt instance table in placement plan.")
+        plan.width, plan.height = width, height
+
+        arrays = plan.arrays()
+        for i, stored in enumerate(arrays):
+            try:
+                stored.fromfile(file, placed if i < 5 else fills)
+            except EOFError:
+                raise PlanError("Truncated placement plan.")
+            if sys.byteorder != "little":
+                stored.byteswap()
+
+        for values, limit, what in [
+            (plan.instance, len(plan.names), "instance"),
+            (plan.orientation, len(ORIENTATIONS), "orientation"),
+            (plan.status, len(STATUSES), "placement status"),
+            (plan.fill_kind, len(PlacementPlan.FILL_NAMES), "fill kind"),
+            (plan.fill_orientation, len(ORIENTATIONS), "orientation"),
+        ]:
+            if len(values) and (min(values) < 0 or max(values) >= limit):
+                raise PlanError("Unknown %s in placement plan." % what)
+        return plan
+
+    @staticmethod
+    def read(file: BinaryIO, size: int) -> bytes:
+        read = file.read(size)
+        if len(read) != size:
+            raise PlanError("Truncated placement plan.")
+        return read
+
+    def check_fills(self, sizes: Collection[int]):
+        """
+        Raises a PlanError if the plan has fills or taps of a size not in
+        ``sizes``, e.g. if it was made with another cell library.
+        """
+        missing = set(self.fill_sites).difference(sizes)
+        if len(missing):
+            raise PlanError(
+                "No fill or tap cell of %s sites for the placement plan."
+                % ", ".join(map(str, sorted(missing)))
+            )
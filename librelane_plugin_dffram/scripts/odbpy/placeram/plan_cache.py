@@ -0,0 +1,135 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+A cache of placement plans, so hardening a design placed before skips
+building the hierarchy and placing it.
+
+Plans are keyed by a fingerprint of everything the placement depends on:
+the instances and their masters, the rows relative to the first one, the
+platform's ``tech.yml``, the building blocks' ``config.yml``, the settings of
+the placer and the placer itself. They are stored relative to the origin of
+the first row, so a design floorplanned with other margins still hits.
+
+Like the rest of placeram, this module does not need ``odb``.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .plan import PlacementPlan, PlanError
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def placer_digest() -> str:
+    """
+    A digest of placeram's own files, its sources and data such as
+    ``rx.yml``: a change to either may change the plans it makes.
+    """
+    digest = hashlib.sha256()
+    for dir, dirs, files in os.walk(__dir__):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for file in sorted(files):
+            path = os.path.join(dir, file)
+            digest.update(os.path.relpath(path, __dir__).encode("utf8"))
+            digest.update(file_digest(path).encode("utf8"))
+    return digest.hexdigest()
+
+
+def fingerprint(
+    instances: Iterable[Tuple[str, str]],
+    masters: Iterable[Tuple[str, int, int]],
+    rows: Iterable[Tuple],
+    tech_file: str,
+    blocks_file: str,
+    settings: Dict[str, Any],
+) -> str:
+    """
+    :param instances: The name and master name of every instance. Only the
+        set of them matters, not the order.
+    :param masters: The name, width and height of every master placed.
+    :param rows: The geometry of every row, relative to the first one.
+    :param tech_file: The platform's ``tech.yml``.
+    :param blocks_file: The building blocks' ``config.yml``.
+    :param settings: Any other options that change the placement.
+    """
+    digest = hashlib.sha256()
+    digest.update(b"%i\0" % PlacementPlan.VERSION)
+    digest.update(placer_digest().encode("utf8"))
+    for path in [tech_file, blocks_file]:
+        digest.update(file_digest(path).encode("utf8"))
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf8"))
+    for name, master in sorted(instances):
+        digest.update(f"{name}\0{master}\0".encode("utf8"))
+    for master in sorted(masters):
+        digest.update(("%s\0%i\0%i\0" % master).encode("utf8"))
+    for row in rows:
+        digest.update(("\0".join(str(field) for field in row) + "\n").encode("utf8"))
+    return digest.hexdigest()
+
+
+class PlanCache(object):
+    """
+    A directory holding a plan (``<key>.plan``) and the metrics of the
+    placement that made it (``<key>.json``) per fingerprint.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def paths(self, key: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.root, f"{key}.plan"),
+            os.path.join(self.root, f"{key}.json"),
+        )
+
+    def load(
+        self, key: str, x: int, y: int
+    ) -> Optional[Tuple[PlacementPlan, Dict[str, Any]]]:
+        """
+        Returns the plan stored under ``key``, moved to the origin (x, y),
+        and its metrics, or None if there is no (readable) plan.
+        """
+        plan_path, metrics_path = self.paths(key)
+        try:
+            with open(plan_path, "rb") as f:
+                plan = PlacementPlan.load(f)
+            with open(metrics_path, encoding="utf8") as f:
+                metrics = json.load(f)
+        except (OSError, ValueError, PlanError):
+            return None
+        plan.translate(x, y)
+        return plan, metrics
+
+    def store(
+        self, key: str, plan: PlacementPlan, metrics: Dict[str, Any], x: int, y: int
+    ):
+        """
+        Stores ``plan``, made with its first row at (x, y), under ``key``.
+        The plan is left as it was.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        plan_path, metrics_path = self.paths(key)
+        plan.translate(-x, -y)
+        try:
+            # Written whole, then renamed into place: concurrent runs of the
+            # same design never see half a plan
+            for path, write in [
+                (metrics_path, lambda f: f.write(json.dumps(metrics).encode("utf8"))),
+                (plan_path, plan.save),
+            ]:
+                fd, temporary = tempfile.mkstemp(dir=self.root)
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(temporary, path)
+        finally:
+            plan.translate(x, y)
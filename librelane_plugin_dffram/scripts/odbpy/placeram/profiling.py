@@ -0,0 +1,235 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+Profiling for ``placeram --profile``: where a placement spends its time.
+
+A :class:`Profiler` times the phases of a placement, the ``__init__`` and
+``place`` of every :class:`Placeable` class, and counts the calls to
+``Row.place``, the taps and fills created in every row and the calls made
+into ``odb``. It is all reported as ``dffram__placer__*`` metrics and, if
+asked for, as a trace in the Chrome trace event format, which Perfetto and
+``chrome://tracing`` open.
+
+Instrumentation patches classes in place: it is undone by :meth:`restore`.
+A disabled profiler patches nothing and its phases cost nothing.
+"""
+
+import json
+import time
+import types
+import functools
+import contextlib
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .row import Row
+from .plan import PlacementPlan
+from .placeable import Placeable
+
+
+def subclasses(cls: type) -> List[type]:
+    result = []
+    for subclass in cls.__subclasses__():
+        result.append(subclass)
+        result += subclasses(subclass)
+    return result
+
+
+class Profiler(object):
+    """
+    :param enabled: Whether to time and count anything at all.
+    :param trace: Whether to keep every timed call as a trace event, and not
+        just the totals.
+    """
+
+    def __init__(self, enabled: bool = False, trace: bool = False):
+        self.enabled = enabled
+        self.trace = trace
+        self.origin = time.perf_counter()
+
+        # (category, name) -> [total time, calls]
+        self.timings: Dict[Tuple[str, str], List] = {}
+        self.counters: Counter = Counter()
+        self.swig_calls: Counter = Counter()
+        self.rows: Dict[int, Dict[str, int]] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.patched: List[Tuple[Any, str, Any]] = []
+
+    def add(self, category: str, name: str, start: float, elapsed: float):
+        timing = self.timings.setdefault((category, name), [0.0, 0])
+        timing[0] += elapsed
+        timing[1] += 1
+        if self.trace:
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": elapsed * 1e6,
+                    "pid": 0,
+                    "tid": 0,
+                }
+            )
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add("phase", name, start, time.perf_counter() - start)
+
+    def patch(self, owner: Any, name: str, wrapper: Any) -> bool:
+        """
+        Returns whether ``owner`` let ``name`` be replaced: the types of an
+        extension built with SWIG's ``-builtin`` do not.
+        """
+        original = owner.__dict__[name]
+        try:
+            setattr(owner, name, wrapper)
+        except (TypeError, AttributeError):
+            return False
+        self.patched.append((owner, name, original))
+        return True
+
+    def timed(self, function: Callable, category: str, name: str) -> Callable:
+        profiler = self
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.add(category, name, start, time.perf_counter() - start)
+
+        return wrapper
+
+    def counted(self, function: Callable, counter: Counter, name: str) -> Callable:
+        def wrapper(*args, **kwargs):
+            counter[name] += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    def instrument(self, odb_module: Optional[types.ModuleType] = None):
+        """
+        Times every Placeable class and counts the calls to ``Row.place``,
+        and, if ``odb_module`` is given, to every function and method of
+        it. Placeable classes must be imported beforehand.
+        """
+        if not self.enabled:
+            return
+        for cls in subclasses(Placeable):
+            for method in ["__init__", "place"]:
+                if method in cls.__dict__:
+                    self.patch(
+                        cls,
+                        method,
+                        self.timed(cls.__dict__[method], method, cls.__name__),
+                    )
+        self.patch(
+            Row,
+            "place",
+            self.counted(Row.__dict__["place"], self.counters, "row_place"),
+        )
+        if odb_module is not None:
+            self.instrument_odb(odb_module)
+
+    def instrument_odb(self, module: types.ModuleType):
+        """
+        Counts the calls to the functions of ``module`` and the methods of
+        its classes, which are SWIG proxies in OpenROAD. Classes that cannot
+        be patched are left uncounted.
+        """
+        for name, value in list(vars(module).items()):
+            if name.startswith("_"):
+                continue
+            if isinstance(value, type):
+                if value.__module__ != module.__name__:
+                    continue
+                for method, function in list(value.__dict__.items()):
+                    if method.startswith("_") or isinstance(
+                        function, (classmethod, property, type)
+                    ):
+                        continue
+                    label = f"{value.__name__}.{method}"
+                    if isinstance(function, staticmethod):
+                        # dbInst.create and the like
+                        wrapper = staticmethod(
+                            self.counted(function.__func__, self.swig_calls, label)
+                        )
+                    elif callable(function):
+                        wrapper = self.counted(function, self.swig_calls, label)
+                    else:
+                        continue
+                    if not self.patch(value, method, wrapper):
+                        break
+            elif isinstance(value, (types.FunctionType, types.BuiltinFunctionType)):
+                self.patch(module, name, self.counted(value, self.swig_calls, name))
+
+    def restore(self):
+        for owner, name, original in reversed(self.patched):
+            setattr(owner, name, original)
+        self.patched = []
+
+    def record_fills(self, plan: PlacementPlan):
+        """
+        Counts the taps and fills the plan creates in every row.
+        """
+        if not self.enabled:
+            return
+        self.rows = {}
+        for kind, row in zip(plan.fill_kind, plan.fill_row):
+            counts = self.rows.setdefault(row, {"taps": 0, "fills": 0})
+            counts["taps" if kind == PlacementPlan.TAP else "fills"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        The ``dffram__placer__*`` metrics: times in seconds are floats, and
+        counts integers. The time of a Placeable class includes that of the
+        placeables it places.
+        """
+        if not self.enabled:
+            return {}
+        metrics: Dict[str, Any] = {}
+        for (category, name), (elapsed, calls) in sorted(self.timings.items()):
+            if category == "phase":
+                metrics[f"dffram__placer__time__phase:{name}"] = elapsed
+            else:
+                method = category.strip("_")
+                metrics[f"dffram__placer__time__{method}__class:{name}"] = elapsed
+                metrics[f"dffram__placer__calls__{method}__class:{name}"] = calls
+        metrics["dffram__placer__row_place_calls"] = self.counters["row_place"]
+        taps = [counts["taps"] for counts in self.rows.values()] or [0]
+        fills = [counts["fills"] for counts in self.rows.values()] or [0]
+        metrics["dffram__placer__taps_created"] = sum(taps)
+        metrics["dffram__placer__taps_created__row_max"] = max(taps)
+        metrics["dffram__placer__fills_created"] = sum(fills)
+        metrics["dffram__placer__fills_created__row_max"] = max(fills)
+        metrics["dffram__placer__swig_calls"] = sum(self.swig_calls.values())
+        return metrics
+
+    def write_trace(self, path: str):
+        """
+        Writes the trace events, with the metrics, the calls made into
+        ``odb`` by function and the taps and fills of every row alongside.
+        """
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(
+                {
+                    "traceEvents": self.events,
+                    "displayTimeUnit": "ms",
+                    "otherData": {
+                        "metrics": self.metrics(),
+                        "swig_calls": dict(self.swig_calls.most_common()),
+                        "rows": {str(row): self.rows[row] for row in sorted(self.rows)},
+                    },
+                },
+                f,
+            )
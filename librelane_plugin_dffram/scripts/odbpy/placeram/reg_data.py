@@ -3,24 +3,25 @@
 # Copyright ©2020-2022, The American University in Cairo
 
 from .row import Row
-from .util import d2a
 from .placeable import Placeable
+from .classifier import SieveNode
 from .common_data import Decoder5x32
 
-from odb import dbInst as Instance
-from typing import Dict, List
+from typing import List
 
 P = Placeable
 S = Placeable.Sieve
 
 
 class Bit(Placeable):
-    def __init__(self, instances: List[Instance]):
-        self.sieve(
-            instances, [S(variable="store"), S(variable="obufs", groups=["port"])]
-        )
+    __slots__ = ("store", "obufs")
+
+    @staticmethod
+    def sieves():
+        return [S(variable="store"), S(variable="obufs", groups=["port"])]
 
-        self.dicts_to_lists()
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list: List[Row], start_row: int = 0):
         r = row_list[start_row]
@@ -33,26 +34,19 @@ class Bit(Placeable):
 
 
 class RFWord(Placeable):
-    def __init__(self, instances):
-        self.raw_bits: Dict[int, List[Instance]] = {}
-
-        def process_bit(instance, bit):
-            self.raw_bits[bit] = self.raw_bits.get(bit) or []
-            self.raw_bits[bit].append(instance)
-
-        self.sieve(
-            instances,
-            [
-                S(variable="ffs", groups=["bit"], custom_behavior=process_bit),
-                S(variable="clkgateand"),
-                S(variable="clkgates", groups=["ports"]),
-                S(variable="obufs", groups=["ports", "bit"], group_rx_order=[2, 1]),
-                S(variable="selinv", groups=["ports", "bit"], group_rx_order=[2, 1]),
-                S(variable="invs", groups=["ports", "address_bit"]),
-            ],
-        )
-
-        self.dicts_to_lists()
+    @staticmethod
+    def sieves():
+        return [
+            S(variable="ffs", groups=["bit"]),
+            S(variable="clkgateand"),
+            S(variable="clkgates", groups=["ports"]),
+            S(variable="obufs", groups=["ports", "bit"], group_rx_order=[2, 1]),
+            S(variable="selinv", groups=["ports", "bit"], group_rx_order=[2, 1]),
+            S(variable="invs", groups=["ports", "address_bit"]),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
 
     def place(self, row_list, start_row=0):
         raise Exception(
@@ -60,52 +54,36 @@ class RFWord(Placeable):
         )
 
     def word_width(self):
-        return len(self.raw_bits)
+        return len(self.ffs)
 
     def word_count(self):
         return 1
 
 
 class DFFRF(Placeable):  # 32 words
-    def __init__(self, instances):
-        raw_words: Dict[int, List[Instance]] = {}
-
-        def process_word(instance, word):
-            raw_words[word] = raw_words.get(word) or []
-            raw_words[word].append(instance)
-
-        raw_decoders: Dict[int, List[Instance]] = {}
-
-        def process_decoder(instance, decoder):
-            raw_decoders[decoder] = raw_decoders.get(decoder) or []
-            raw_decoders[decoder].append(instance)
-
-        self.sieve(
-            instances,
-            [
-                S(
-                    variable="decoders",
-                    groups=["decoder"],
-                    custom_behavior=process_decoder,
-                ),
-                S(variable="words", groups=["word"], custom_behavior=process_word),
-                S(variable="rfw0_ties", groups=["nibble"]),
-                S(variable="rfw0_invs1", groups=["byte"]),
-                S(variable="rfw0_invs2", groups=["byte"]),
-                S(variable="rfw0_obufs1", groups=["bit"]),
-                S(variable="rfw0_selinv1", groups=["bit"]),
-                S(variable="rfw0_obufs2", groups=["bit"]),
-                S(variable="rfw0_selinv2", groups=["bit"]),
-                S(variable="tiezero"),
-            ],
-        )
-
-        self.dicts_to_lists()
-
-        self.words: List[RFWord] = d2a({k: RFWord(v) for k, v in raw_words.items()})
-        self.decoders5x32: List[Decoder5x32] = d2a(
-            {k: Decoder5x32(v) for k, v in raw_decoders.items()}
-        )
+    @staticmethod
+    def sieves():
+        return [
+            S(
+                variable="decoders",
+                groups=["decoder"],
+                child=Decoder5x32,
+            ),
+            S(variable="words", groups=["word"], child=RFWord),
+            S(variable="rfw0_ties", groups=["nibble"]),
+            S(variable="rfw0_invs1", groups=["byte"]),
+            S(variable="rfw0_invs2", groups=["byte"]),
+            S(variable="rfw0_obufs1", groups=["bit"]),
+            S(variable="rfw0_selinv1", groups=["bit"]),
+            S(variable="rfw0_obufs2", groups=["bit"]),
+            S(variable="rfw0_selinv2", groups=["bit"]),
+            S(variable="tiezero"),
+        ]
+
+    def __init__(self, node: SieveNode):
+        self.sieve(node)
+
+        self.decoders5x32: List[Decoder5x32] = self.decoders
 
     def place(self, rows, start_row: int = 0):
         #    |      5x32 Decoder Placement           |  |
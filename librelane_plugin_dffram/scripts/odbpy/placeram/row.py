@@ -2,59 +2,67 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright ©2020-2022, The American University in Cairo
 from odb import dbRow, dbInst, dbSite
-from typing import List, Callable
+import operator
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
 
-import re
+from .plan import PlacementPlan
+from .masters import Master, MasterTable
+from .occupancy import RowOccupancy
+from .packing import FillPacker
 
 
 class Row(object):
     sw: float = None
     sh: float = None
 
-    tap_rx: str = None
     tap_distance: float = None
     tap_width: int = None
 
     # Assumption: A fill of size 1 is always available.
     # If not, there WILL be an out of bounds error.
     # The fill of size 1 is also the tap cell.
-    create_fill: Callable[[str, int], dbInst] = None
+    fill_masters: Dict[int, Master] = None
     supported_fill_sizes: List[int] = None
 
-    def __init__(self, ordinal, row_obj):
-        self.ordinal: int = ordinal
-        self.obj: dbRow = row_obj
+    plan: PlacementPlan = None
+    masters: MasterTable = None
+
+    scan_limit: int = 32
+
+    packer: FillPacker = None
 
-        self.origin: List[float] = self.obj.getOrigin()
-        self.x: float = self.origin[0]
-        self.y: float = self.origin[1]
+    # Compared to the previous greedy packing
+    fills_saved: int = 0
+    taps_saved: int = 0
 
-        self.xmin: float = self.obj.getBBox().xMin()
-        self.xmax: float = self.obj.getBBox().xMax()
+    def __init__(self, ordinal: int, rows: "RowArray"):
+        self.ordinal: int = ordinal
+
+        self.y: float = rows.origin_y[ordinal]
+        self.xmin: float = rows.xmin[ordinal]
 
-        self.ymin: float = self.obj.getBBox().yMin()
-        self.ymax: float = self.obj.getBBox().yMax()
+        self.orientation: str = rows.orientations[ordinal]
 
-        self.orientation = self.obj.getOrient()
+        # The cursors of every row of the array, this one's at ``ordinal``
+        self.occupancy: RowOccupancy = rows.occupancy
 
-        self.cell_counter: int = 0
-        self.tap_counter: int = 0
-        self.fill_counter: int = 0
-        self.since_last_tap: float = 0 if self.ordinal % 2 == 0 else Row.tap_distance
+    @property
+    def x(self) -> int:
+        return self.occupancy.x[self.ordinal]
 
     @property
     def width(self):
         return self.x - self.xmin
 
     def tap(self, width: float = 0):
-        if self.since_last_tap + width > Row.tap_distance:
-            self.place(
-                Row.create_fill(
-                    "tap_%i_%i" % (self.ordinal, self.tap_counter), self.tap_width
-                ),
-                ignore_tap=True,
+        occupancy = self.occupancy
+        ordinal = self.ordinal
+        if occupancy.since_last_tap[ordinal] + width > Row.tap_distance:
+            self.place_fill(
+                PlacementPlan.TAP, occupancy.tap_counter[ordinal], Row.tap_width
             )
-            self.tap_counter += 1
+            occupancy.tap_counter[ordinal] += 1
 
     def place(
         self,
@@ -62,49 +70,122 @@ class Row(object):
         ignore_tap: bool = False,
         fixed: bool = False,
     ):
-        width = instance.getMaster().getWidth()
-        if not ignore_tap:
+        master = Row.masters.of(instance)
+        width = master.width
+        occupancy = self.occupancy
+        ordinal = self.ordinal
+        since_last_tap = occupancy.since_last_tap
+        # Checked here first: most cells do not need a tap.
+        if not ignore_tap and since_last_tap[ordinal] + width > Row.tap_distance:
             self.tap(width)
 
-        instance.setOrient(self.orientation)
-        instance.setLocation(self.x, self.y)
-        instance.setPlacementStatus("PLACED" if not fixed else "LOCKED")
+        x = occupancy.x
+        Row.plan.place(instance, x[ordinal], self.y, self.orientation, fixed)
 
-        if re.match(Row.tap_rx, instance.getMaster().getName()):
-            self.since_last_tap = 0
+        # RowOccupancy.advance, inlined: this runs for every cell.
+        if master.is_tap:
+            since_last_tap[ordinal] = 0
         else:
-            self.since_last_tap += width
-        self.x += width
-        self.cell_counter += 1
+            since_last_tap[ordinal] += width
+        x[ordinal] += width
+        occupancy.cell_counter[ordinal] += 1
+        if not occupancy.moved[ordinal]:
+            occupancy.moved[ordinal] = True
+            occupancy.pending.append(ordinal)
+
+    def place_fill(self, kind: int, counter: int, sites: int):
+        """
+        Records a fill or tap cell of ``sites`` sites, to be created when the
+        plan is applied.
+        """
+        occupancy = self.occupancy
+        ordinal = self.ordinal
+        Row.plan.fill(
+            kind,
+            ordinal,
+            counter,
+            sites,
+            occupancy.x[ordinal],
+            self.y,
+            self.orientation,
+        )
+
+        master = Row.fill_masters[sites]
+        occupancy.advance(ordinal, master.width, master.is_tap)
+
+    def mark_moved(self):
+        self.occupancy.mark_moved(self.ordinal)
+
+    @property
+    def width_sites(self) -> int:
+        return self.occupancy.width(self.ordinal)
 
     @staticmethod
     def from_odb(
         rows: List[dbRow],
         regular_site: dbSite,
         max_tap_distance: float,
-        create_fill: Callable[[str, int], dbInst],
-        supported_fill_sizes: List[int],
-        tap_cell_rx: str,
+        fill_masters: Dict[int, Master],
         tap_width: int,
+        plan: PlacementPlan,
+        masters: MasterTable,
     ):
         Row.sw, Row.sh = (regular_site.getWidth(), regular_site.getHeight())
         Row.tap_distance = max_tap_distance
 
-        Row.create_fill = create_fill
-        Row.supported_fill_sizes = sorted(supported_fill_sizes, reverse=True)
-        Row.tap_rx = tap_cell_rx
+        Row.fill_masters = fill_masters
+        Row.supported_fill_sizes = sorted(fill_masters.keys(), reverse=True)
         Row.tap_width = tap_width
-        returnable = []
-        for i, row in enumerate(rows):
-            returnable.append(Row(i, row))
-        return returnable
+        Row.packer = FillPacker.get(
+            [int(sites) for sites, m in fill_masters.items() if not m.is_tap],
+            [int(sites) for sites, m in fill_masters.items() if m.is_tap],
+            int(max_tap_distance // Row.sw),
+        )
+        Row.fills_saved = 0
+        Row.taps_saved = 0
+        Row.plan = plan
+        Row.masters = masters
+        return RowArray(rows)
+
+    @staticmethod
+    def pack(gap: int, since_last_tap: int) -> Tuple[int, ...]:
+        """
+        Returns the sizes of the fill and tap cells to fill ``gap`` sites
+        with, starting ``since_last_tap`` sites after the last tap.
+        """
+        greedy = Row.packer.greedy(gap, Row.tap_width)
+
+        # Never end further from a tap than the greedy packing would have,
+        # which could otherwise force extra taps into cells placed later
+        end = since_last_tap
+        for size in greedy:
+            end = 0 if Row.fill_masters[size].is_tap else end + size
+
+        fills = Row.packer.pack(gap, since_last_tap, end)
+        if fills is None:
+            return greedy
+
+        for size in greedy:
+            if Row.fill_masters[size].is_tap:
+                Row.taps_saved += 1
+            else:
+                Row.fills_saved += 1
+        for size in fills:
+            if Row.fill_masters[size].is_tap:
+                Row.taps_saved -= 1
+            else:
+                Row.fills_saved -= 1
+        return fills
 
     @staticmethod
-    def fill_rows(rows: List["Row"], from_index: int, to_index: int):
+    def fill_rows(rows: "RowArray", from_index: int, to_index: int):
         """
         from inclusive; to exclusive
         Fills from the last location that has a cell.
 
+        ``rows`` must be the RowArray returned by ``from_odb``: the widest
+        row and the rows to pad are found through its ``occupancy``.
+
         -- Before this function --
 
         [A][B][C][D]
@@ -121,53 +202,106 @@ class Row(object):
 
         """
 
-        def pack(size, fill_sizes):
-            fills = []
-            current = size
-            tracker = 0
-
-            since_last_tap = 0
-            if current > Row.tap_width:
-                # Always start with a tap.
-                fills.append(Row.tap_width)
-                current -= Row.tap_width
-
-            while current > 0:
-                current_fill = fill_sizes[tracker]
-                current_width = current_fill * Row.sw
-                while current >= current_fill:
-                    if since_last_tap + current_width > Row.tap_distance:
-                        fills.append(Row.tap_width)
-                        since_last_tap = 0
-                        current -= Row.tap_width
-                    else:
-                        fills.append(current_fill)
-                        since_last_tap += current_width
-                        current -= current_fill
-                tracker += 1
-
-            return fills
-
-        max_sw = -1
-        for row_idx in range(from_index, to_index):
-            r = rows[row_idx]
-            width = r.x
-            width_sites = int(width / Row.sw)
-            max_sw = max(max_sw, width_sites)
-
-        for row_idx in range(from_index, to_index):
+        if to_index <= from_index:
+            return
+        occupancy = rows.occupancy
+        if to_index - from_index <= Row.scan_limit:
+            # Short ranges, which are most of them, are cheaper to scan than
+            # to query.
+            max_sw = int(max(occupancy.x[from_index:to_index]) / Row.sw)
+            to_pad = range(from_index, to_index)
+        else:
+            max_sw = occupancy.max(from_index, to_index)
+            # Rows already as wide as the widest one need no padding.
+            to_pad = occupancy.below(from_index, to_index, max_sw)
+
+        x = occupancy.x
+        since_last_tap = occupancy.since_last_tap
+        fill_counter = occupancy.fill_counter
+        for row_idx in to_pad:
             r = rows[row_idx]
-            width = r.x
-            width_sites = int(width / Row.sw)
 
-            empty = max_sw - width_sites
+            empty = max_sw - int(x[row_idx] / Row.sw)
 
-            fills = pack(empty, Row.supported_fill_sizes)
+            fills = Row.pack(empty, int(since_last_tap[row_idx] // Row.sw))
             # print(f"{from_index}->{to_index}::{row_idx}: {fills}")
             for fill in fills:
-                fill_cell = Row.create_fill(
-                    "fill_%i_%i" % (row_idx, r.fill_counter),
-                    fill,
-                )
-                r.place(fill_cell, ignore_tap=True)
-                r.fill_counter += 1
+                r.place_fill(PlacementPlan.FILL, fill_counter[row_idx], fill)
+                fill_counter[row_idx] += 1
+
+
+class RowArray(object):
+    """
+    The geometry of every row, read from the database in a single pass and
+    kept in flat arrays, the cursors of every row in a ``RowOccupancy``, and
+    the ``Row`` objects placing cells on them.
+
+    Indexing a RowArray returns the Row at that index, so it can be passed
+    anywhere a list of rows is expected.
+    """
+
+    def __init__(self, rows: List[dbRow]):
+        self.origin_x = array("i")
+        self.origin_y = array("i")
+        self.xmin = array("i")
+        self.xmax = array("i")
+        self.ymin = array("i")
+        self.ymax = array("i")
+        self.orientations: List[str] = []
+        for row in rows:
+            x, y = row.getOrigin()
+            bbox = row.getBBox()
+            self.origin_x.append(x)
+            self.origin_y.append(y)
+            self.xmin.append(bbox.xMin())
+            self.xmax.append(bbox.xMax())
+            self.ymin.append(bbox.yMin())
+            self.ymax.append(bbox.yMax())
+            self.orientations.append(row.getOrient())
+
+        self.occupancy = RowOccupancy(
+            self.origin_x,
+            [0 if i % 2 == 0 else Row.tap_distance for i in range(len(self.origin_x))],
+            Row.sw,
+        )
+        self.rows: List[Row] = [Row(i, self) for i in range(len(self.origin_x))]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: int) -> Row:
+        return self.rows[index]
+
+    def __iter__(self) -> Iterator[Row]:
+        return iter(self.rows)
+
+    def used(self, from_index: int = 0, to_index: Optional[int] = None) -> array:
+        """
+        The width placed on every row in [from_index, to_index), in DBUs.
+        """
+        return array(
+            "q",
+            map(
+                operator.sub,
+                self.occupancy.x[from_index:to_index],
+                self.xmin[from_index:to_index],
+            ),
+        )
+
+    def widest(self, from_index: int = 0, to_index: Optional[int] = None) -> int:
+        return max(self.used(from_index, to_index), default=0)
+
+    def used_width(self, from_index: int = 0, to_index: Optional[int] = None) -> int:
+        return sum(self.used(from_index, to_index))
+
+    def utilization(self, from_index: int = 0, to_index: Optional[int] = None) -> float:
+        """
+        The fraction of the rows in [from_index, to_index) that is taken by
+        placed cells, fills and taps.
+        """
+        available = sum(self.xmax[from_index:to_index]) - sum(
+            self.xmin[from_index:to_index]
+        )
+        if available == 0:
+            return 0.0
+        return self.used_width(from_index, to_index) / available
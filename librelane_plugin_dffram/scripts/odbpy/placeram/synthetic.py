@@ -0,0 +1,337 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+Synthetic netlists: the instance names and masters Yosys produces for the
+models in ``models/``, generated without running synthesis, so the placer
+can be exercised on any size without a PDK.
+
+The generators mirror the generate blocks of ``models/ram/model.v`` and
+``models/rf/model.v``; if those change, these have to change with them.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Widths, in sites, of the sky130_fd_sc_hd cells the models instantiate and
+# of the fill, decap and tap cells placement uses
+SKY130_FD_SC_HD_SITES: Dict[str, int] = {
+    "and2_1": 5,
+    "and2_2": 6,
+    "and2b_2": 9,
+    "and3_2": 7,
+    "and3b_2": 8,
+    "and4_2": 8,
+    "and4b_2": 9,
+    "and4bb_2": 10,
+    "clkbuf_2": 4,
+    "clkbuf_4": 6,
+    "clkbuf_16": 19,
+    "conb_1": 3,
+    "dfxtp_1": 16,
+    "diode_2": 2,
+    "dlclkp_1": 16,
+    "dlxtp_1": 13,
+    "ebufn_2": 10,
+    "inv_1": 3,
+    "inv_4": 5,
+    "mux2_1": 9,
+    "mux4_1": 20,
+    "nor3b_2": 9,
+    "nor4b_2": 10,
+    "fill_1": 1,
+    "fill_2": 2,
+    "fill_4": 4,
+    "fill_8": 8,
+    "decap_3": 3,
+    "decap_4": 4,
+    "decap_6": 6,
+    "decap_8": 8,
+    "decap_12": 12,
+    "tapvpwrvgnd_1": 1,
+}
+
+
+def read_lef_sites(lefs: Iterable[str], site_width: float) -> Dict[str, int]:
+    """
+    Returns the width in sites of every macro in ``lefs``, where
+    ``site_width`` is in µm.
+    """
+    sites: Dict[str, int] = {}
+    macro_rx = re.compile(r"^\s*MACRO\s+(\S+)")
+    size_rx = re.compile(r"^\s*SIZE\s+([\d\.]+)\s+BY\s+([\d\.]+)")
+    for lef in lefs:
+        macro = None
+        for line in open(lef):
+            m = macro_rx.match(line)
+            if m is not None:
+                macro = m[1]
+                continue
+            m = size_rx.match(line)
+            if m is not None and macro is not None:
+                sites[macro] = round(float(m[1]) / site_width)
+                macro = None
+    return sites
+
+
+def bus(name: str, index: int) -> str:
+    return f"{name}\\[{index}\\]"
+
+
+class SyntheticNetlist(object):
+    """
+    Collects ``(instance name, master name)`` pairs.
+
+    >>> netlist = SyntheticNetlist.for_model(8, 8)
+    >>> len(netlist.cells)
+    198
+    >>> netlist.cells[0]
+    ('DEC0.ABUF\\\\[0\\\\]', 'sky130_fd_sc_hd__clkbuf_2')
+    """
+
+    def __init__(self, prefix: str = "sky130_fd_sc_hd__", latch: bool = True):
+        self.prefix = prefix
+        self.latch = latch
+        self.cells: List[Tuple[str, str]] = []
+
+    @staticmethod
+    def for_model(
+        count: int,
+        width: int,
+        variant: Optional[str] = None,
+        register_file: bool = False,
+        latch: bool = True,
+    ) -> "SyntheticNetlist":
+        """
+        ``count`` words of ``width`` bits, with ``variant`` as named in the
+        model's ``config.yml``.
+        """
+        netlist = SyntheticNetlist(latch=latch)
+        if register_file:
+            netlist.rf(width)
+        else:
+            ports = 2 if variant == "1RW1R" else 1
+            netlist.ram(count, width // 8, ports)
+        return netlist
+
+    def library(self) -> Dict[str, int]:
+        """
+        The built-in widths of every cell, under this netlist's names.
+        """
+        return {
+            self.prefix + cell: sites for cell, sites in SKY130_FD_SC_HD_SITES.items()
+        }
+
+    def add(self, name: str, cell: str):
+        self.cells.append((name, self.prefix + cell))
+
+    # Cells instantiated through the models' wrappers (e.g. CLKBUF_2)
+    def wrap(self, name: str, cell: str):
+        self.add(name + ".__cell__", cell)
+
+    def dec1x2(self, p: str):
+        self.add(p + "AND0", "and2b_2")
+        self.add(p + "AND1", "and2_2")
+
+    def dec2x4(self, p: str):
+        for i, cell in enumerate(["nor3b_2", "and3b_2", "and3b_2", "and3_2"]):
+            self.add(p + f"AND{i}", cell)
+
+    def dec3x8(self, p: str):
+        for i in range(3):
+            self.add(p + bus("ABUF", i), "clkbuf_2")
+        self.add(p + "ENBUF", "clkbuf_2")
+        cells = [
+            "nor4b_2",
+            "and4bb_2",
+            "and4bb_2",
+            "and4b_2",
+            "and4bb_2",
+            "and4b_2",
+            "and4b_2",
+            "and4_2",
+        ]
+        for i, cell in enumerate(cells):
+            self.add(p + f"AND{i}", cell)
+
+    def dec5x32(self, p: str):
+        for i in range(4):
+            self.dec3x8(p + f"D{i}.")
+        self.add(p + "TIE", "conb_1")
+        self.dec2x4(p + "D.")
+
+    def mux(self, p: str, width: int, inputs: int):
+        size = width // 8
+        if inputs == 4:
+            for i in range(2):
+                self.add(p + bus("SEL_DIODE", i), "diode_2")
+        for s in range(inputs // 2):
+            for i in range(size):
+                self.add(p + bus(f"SEL{s}BUF", i), "clkbuf_2")
+        for i in range(size):
+            for a in range(inputs):
+                for j in range(i * 8, i * 8 + 8):
+                    self.add(
+                        p + bus("M", i) + "." + bus(f"DIODE_A{a}MUX", j), "diode_2"
+                    )
+            for j in range(8):
+                self.add(
+                    p + bus("M", i) + "." + bus("MUX", j),
+                    "mux4_1" if inputs == 4 else "mux2_1",
+                )
+
+    def outreg(self, p: str, width: int):
+        self.add(p + "Root_CLKBUF", "clkbuf_4")
+        for i in range(width // 8):
+            self.add(p + bus("Do_CLKBUF", i), "clkbuf_4")
+        for i in range(width // 8):
+            for j in range(8):
+                self.add(p + bus("OUTREG_BYTE", i) + "." + bus("DIODE", j), "diode_2")
+                self.add(p + bus("OUTREG_BYTE", i) + "." + bus("Do_FF", j), "dfxtp_1")
+
+    def byte(self, p: str, ports: int):
+        self.add(p + "DIODE_CLK", "diode_2")
+        if self.latch:
+            self.add(p + "CLKINV", "inv_1")
+        self.add(p + "CG", "dlclkp_1")
+        for s in range(ports):
+            self.add(p + f"SEL{s}INV", "inv_1")
+        self.add(p + "CGAND", "and2_1")
+        for i in range(8):
+            self.add(
+                p + bus("BIT", i) + ".STORAGE", "dlxtp_1" if self.latch else "dfxtp_1"
+            )
+            for s in range(ports):
+                self.add(p + bus("BIT", i) + f".OBUF{s}", "ebufn_2")
+
+    def word(self, p: str, bytes: int, ports: int):
+        for s in range(ports):
+            self.add(p + f"SEL{s}BUF", "clkbuf_2")
+        self.add(p + "CLKBUF", "clkbuf_4")
+        for i in range(bytes):
+            self.byte(p + bus("BYTE", i) + ".B.", ports)
+
+    def ram8(self, p: str, bytes: int, ports: int):
+        for s in range(ports):
+            self.dec3x8(p + f"DEC{s}.")
+        for i in range(bytes):
+            self.wrap(p + bus("WEBUF", i), "clkbuf_2")
+        self.wrap(p + "CLKBUF", "clkbuf_2")
+        for i in range(8):
+            self.word(p + bus("WORD", i) + ".W.", bytes, ports)
+
+    def ram16(self, p: str, bytes: int):
+        self.wrap(p + "DIODE_CLK", "diode_2")
+        self.wrap(p + "CLKBUF", "clkbuf_4")
+        for i in range(bytes):
+            self.wrap(p + bus("WEBUF", i), "clkbuf_2")
+        for i in range(5):
+            self.wrap(p + bus("DIODE_A0", i), "diode_2")
+        for i in range(4):
+            self.wrap(p + bus("A0BUF", i), "clkbuf_2")
+        self.wrap(p + "EN0BUF", "clkbuf_2")
+        self.dec1x2(p + "DEC0.")
+        for i in range(2):
+            self.ram8(p + bus("SLICE", i) + ".RAM8.", bytes, 1)
+        for i in range(bytes):
+            self.wrap(p + bus("FBUFENBUF0", i), "clkbuf_2")
+            self.wrap(p + bus("TIE0", i), "conb_1")
+        for i in range(bytes):
+            for j in range(8 * i, 8 * i + 8):
+                self.wrap(p + bus("BYTE", i) + "." + bus("FLOATBUF0", j), "ebufn_2")
+        self.outreg(p + "Do0_REG.", bytes * 8)
+
+    def ram32(self, p: str, bytes: int, ports: int):
+        for i in range(bytes * 8):
+            self.wrap(p + bus("DIBUF", i), "clkbuf_16")
+        for i in range(bytes):
+            self.wrap(p + bus("WEBUF", i), "clkbuf_2")
+        for s in range(ports):
+            for i in range(5):
+                self.wrap(p + bus(f"A{s}BUF", i), "clkbuf_2")
+            self.wrap(p + f"EN{s}BUF", "clkbuf_2")
+            self.dec1x2(p + f"DEC{s}.")
+        for i in range(2):
+            self.ram16(p + bus("SLICE_16", i) + ".RAM16.", bytes)
+        for s in range(ports):
+            self.mux(p + f"Do{s}MUX.", bytes * 8, 2)
+
+    def ram128(self, p: str, bytes: int, ports: int):
+        for i in range(bytes * 8):
+            self.wrap(p + bus("DIODE_DI", i), "diode_2")
+            self.wrap(p + bus("DIBUF", i), "clkbuf_16")
+        self.wrap(p + "DIODE_CLK", "diode_2")
+        self.wrap(p + "CLKBUF", "clkbuf_4")
+        for i in range(bytes):
+            self.wrap(p + bus("WEBUF", i), "clkbuf_2")
+        for s in range(ports):
+            self.wrap(p + f"EN{s}BUF", "clkbuf_2")
+            for i in range(7):
+                self.wrap(p + bus(f"DIODE_A{s}", i), "diode_2")
+                self.wrap(p + bus(f"A{s}BUF", i), "clkbuf_2")
+            self.dec2x4(p + f"DEC{s}.")
+        for i in range(4):
+            self.ram32(p + bus("BLOCK", i) + ".RAM32.", bytes, ports)
+        for s in range(ports):
+            self.mux(p + f"Do{s}MUX.", bytes * 8, 4)
+
+    def bank(self, p: str, bytes: int, ports: int, count: int):
+        if count == 128:
+            return self.ram128(p, bytes, ports)
+        if count in (256, 512):
+            banks = count // 128
+            for s in range(ports):
+                (self.dec1x2 if banks == 2 else self.dec2x4)(p + f"DEC{s}.")
+            for i in range(banks):
+                self.ram128(p + bus("BANK128", i) + ".RAM128.", bytes, ports)
+            for s in range(ports):
+                self.mux(p + f"Do{s}MUX.", bytes * 8, banks)
+            return
+        banks = count // 512
+        address_bits = 10 if banks == 2 else 11
+        for i in range(bytes * 8):
+            self.wrap(p + bus("DIBUF", i), "clkbuf_16")
+        self.wrap(p + "CLKBUF", "clkbuf_4")
+        for i in range(bytes):
+            self.wrap(p + bus("WEBUF", i), "clkbuf_2")
+        for s in range(ports):
+            self.wrap(p + f"EN{s}BUF", "clkbuf_2")
+            for i in range(address_bits):
+                self.wrap(p + bus(f"A{s}BUF", i), "clkbuf_2")
+            (self.dec1x2 if banks == 2 else self.dec2x4)(p + f"DEC{s}.")
+        for i in range(banks):
+            self.bank(p + bus("BANK512", i) + ".RAM512.", bytes, ports, 512)
+        for s in range(ports):
+            self.mux(p + f"Do{s}MUX.", bytes * 8, banks)
+
+    def ram(self, count: int, bytes: int, ports: int):
+        if count == 8:
+            self.ram8("", bytes, ports)
+        elif count == 32:
+            self.ram32("", bytes, ports)
+        else:
+            self.bank("", bytes, ports, count)
+
+    def rf(self, width: int):
+        for d in range(3):
+            self.dec5x32(f"DEC{d}.")
+        for i in range(width // 8):
+            self.add("RFW0." + bus("INV1", i), "inv_4")
+            self.add("RFW0." + bus("INV2", i), "inv_4")
+        for i in range(8):
+            self.add("RFW0." + bus("TIE", i), "conb_1")
+        for i in range(width):
+            self.add("RFW0." + bus("BIT", i) + ".OBUF1", "ebufn_2")
+            self.add("RFW0." + bus("BIT", i) + ".OBUF2", "ebufn_2")
+        for e in range(1, 32):
+            p = bus("REGF", e) + ".RFW."
+            for i in range(width // 8):
+                self.add(p + bus("INV1", i), "inv_4")
+                self.add(p + bus("INV2", i), "inv_4")
+            self.add(p + "CGAND", "and2_1")
+            for i in range(width // 8):
+                self.add(p + bus("CG", i), "dlclkp_1")
+            for i in range(width):
+                self.add(p + bus("BIT", i) + ".FF", "dfxtp_1")
+                self.add(p + bus("BIT", i) + ".OBUF1", "ebufn_2")
+                self.add(p + bus("BIT", i) + ".OBUF2", "ebufn_2")
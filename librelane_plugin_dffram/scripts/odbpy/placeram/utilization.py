@@ -0,0 +1,119 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+Row utilization and pin density of a placement plan: an early sign of
+congestion, before global and detailed routing.
+
+Everything is computed from the plan and the master table, so plans loaded
+from a file or the cache are measured the same as fresh ones.
+"""
+
+from typing import Dict, List, Sequence, Union
+
+from .plan import PlacementPlan
+from .masters import Master, MasterTable
+
+# Rows are grouped into bands of this many for the pin density, as a
+# routing congestion hot spot spans a few rows
+PIN_DENSITY_BAND_ROWS = 10
+
+HISTOGRAM_BINS = 10
+
+
+def summarize(name: str, values: Sequence[float]) -> Dict[str, float]:
+    """
+    >>> summarize("x", [1, 2, 6])
+    {'x__min': 1, 'x__mean': 3.0, 'x__max': 6}
+    """
+    return {
+        f"{name}__min": min(values),
+        f"{name}__mean": sum(values) / len(values),
+        f"{name}__max": max(values),
+    }
+
+
+def histogram(values: Sequence[float], bins: int = HISTOGRAM_BINS) -> List[int]:
+    """
+    Counts ``values`` between 0 and 1 into ``bins`` bins of equal width, the
+    last one including 1.
+
+    >>> histogram([0, 0.05, 0.5, 1.0], bins=4)
+    [2, 0, 1, 1]
+    """
+    counts = [0] * bins
+    for value in values:
+        counts[min(max(int(value * bins), 0), bins - 1)] += 1
+    return counts
+
+
+def row_metrics(
+    plan: PlacementPlan,
+    masters: MasterTable,
+    fill_masters: Dict[int, Master],
+    site_height: int,
+    micron_in_dbus: int,
+) -> Dict[str, Union[int, float]]:
+    """
+    The ``dffram__placer__row_*`` and ``dffram__placer__pin_density*``
+    metrics of ``plan``, whose rows are ``site_height`` tall and as wide as
+    the plan:
+
+    * ``row_utilization``: the width of the logic in each row over the
+      width of the row, summarized, and a histogram of it by tenths
+    * ``row_fill_fraction``: the width of the fills and decaps in each row
+      over the width of everything placed in it
+    * ``row_taps``: the number of taps in each row
+    * ``pin_density``: the signal pins of the cells of every band of
+      ``PIN_DENSITY_BAND_ROWS`` rows per µm²
+    """
+    if plan.width == 0 or len(plan.y) + len(plan.fill_y) == 0:
+        return {}
+    y0 = min(list(plan.y) + list(plan.fill_y))
+    row_count = max(plan.height // site_height, 1)
+    logic = [0] * row_count
+    fill = [0] * row_count
+    taps = [0] * row_count
+    pins = [0] * row_count
+
+    def row_of(y: int) -> int:
+        return min((y - y0) // site_height, row_count - 1)
+
+    for i, index in enumerate(plan.instance):
+        master = masters.of(plan.instances[index])
+        row = row_of(plan.y[i])
+        if master.is_tap:
+            taps[row] += 1
+        elif master.is_filler:
+            fill[row] += master.width
+        else:
+            logic[row] += master.width
+        pins[row] += master.pins
+    for kind, sites, y in zip(plan.fill_kind, plan.fill_sites, plan.fill_y):
+        row = row_of(y)
+        if kind == PlacementPlan.TAP:
+            taps[row] += 1
+        else:
+            fill[row] += fill_masters[sites].width
+
+    utilization = [width / plan.width for width in logic]
+    fill_fraction = [
+        fill[row] / (fill[row] + logic[row]) if fill[row] + logic[row] else 0
+        for row in range(row_count)
+    ]
+    band_area = plan.width * site_height / micron_in_dbus**2
+    pin_density = []
+    for start in range(0, row_count, PIN_DENSITY_BAND_ROWS):
+        band = pins[start : start + PIN_DENSITY_BAND_ROWS]
+        pin_density.append(sum(band) / (band_area * len(band)))
+
+    metrics: Dict[str, Union[int, float]] = {}
+    metrics.update(summarize("dffram__placer__row_utilization", utilization))
+    for i, count in enumerate(histogram(utilization)):
+        low = i * 100 // HISTOGRAM_BINS
+        high = (i + 1) * 100 // HISTOGRAM_BINS
+        metrics[f"dffram__placer__row_utilization__histogram__bin:{low}-{high}"] = count
+    metrics.update(summarize("dffram__placer__row_fill_fraction", fill_fraction))
+    metrics.update(summarize("dffram__placer__row_taps", taps))
+    metrics.update(summarize("dffram__placer__pin_density", pin_density))
+    return metrics
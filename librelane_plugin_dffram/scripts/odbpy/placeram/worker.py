@@ -0,0 +1,276 @@
+# -*- coding: utf8 -*-
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2022, The American University in Cairo
+"""
+A long-lived placement worker, for sweeps over many sizes.
+
+Most of a short placement is spent starting OpenROAD and importing ``odb``,
+``openroad`` and placeram. The worker does that once:
+
+    openroad -python -m placeram.worker serve
+
+and then serves placements over a Unix socket. Every request is placed in a
+process forked off the worker, so it starts from a warm interpreter, but with
+a database of its own, and a placement that crashes does not take the worker
+down with it.
+
+``python3 -m placeram.worker request -- <placeram arguments>`` is a client
+that takes the same arguments as ``openroad -python -m placeram``, prints the
+output of the placement and exits with its exit code. It does not need
+OpenROAD, so it starts in a fraction of the time.
+
+The worker places with the placeram it imported when it started, while the
+plan and step caches key placements by the placeram on disk. It hence
+refuses requests once placeram has changed, and has to be restarted.
+"""
+
+import os
+import sys
+import json
+import socket
+import signal
+import tempfile
+import traceback
+from typing import Dict, List, Optional
+
+import click
+
+from .plan_cache import placer_digest
+
+# The output of a request is followed by this byte and its exit code
+END_OF_OUTPUT = b"\0"
+
+# The exit code of requests refused as placeram changed
+STALE = os.EX_TEMPFAIL
+
+
+def default_socket() -> str:
+    return os.getenv("DFFRAM_PLACER_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"dffram-placer-{os.getuid()}.sock"
+    )
+
+
+def is_serving(path: str) -> bool:
+    """
+    Whether a worker is accepting requests at ``path``.
+    """
+    if not os.path.exists(path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+def serving_digest(path: str) -> Optional[str]:
+    """
+    The digest of the placeram the worker at ``path`` started with (see
+    :func:`placeram.plan_cache.placer_digest`), or None if no worker is
+    serving there.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(path)
+            connection.sendall(json.dumps({"status": True}).encode("utf8") + b"\n")
+            with connection.makefile("rb") as f:
+                line = f.readline()
+        return json.loads(line)["digest"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def place(request: Dict) -> int:
+    """
+    Runs placeram with the arguments, working directory and environment of
+    ``request``, writing its metrics where OpenROAD's ``-metrics`` would, and
+    returns its exit code.
+    """
+    import utl
+    from .cli import main
+
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+
+    # Without -metrics, OpenROAD has nowhere to write the metrics to
+    metrics: Dict[str, object] = {}
+    for function, cast in [
+        ("metric", str),
+        ("metric_integer", int),
+        ("metric_float", float),
+    ]:
+        setattr(
+            utl,
+            function,
+            lambda name, value, cast=cast: metrics.__setitem__(name, cast(value)),
+        )
+
+    sys.argv = ["placeram"] + request["argv"]
+    try:
+        main()
+        returncode = 0
+    except SystemExit as e:
+        if e.code is None:
+            returncode = 0
+        elif isinstance(e.code, int):
+            returncode = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+
+    if request.get("metrics") is not None:
+        with open(request["metrics"], "w", encoding="utf8") as f:
+            json.dump(metrics, f, indent=2)
+    return returncode
+
+
+def handle(connection: socket.socket, digest: str):
+    """
+    Serves one request in a child process, with its output sent back over
+    ``connection`` as it is printed.
+    """
+    with connection.makefile("rb") as f:
+        line = f.readline()
+    if len(line) == 0:
+        # Checked whether the worker is serving
+        return
+    request = json.loads(line)
+    if request.get("status"):
+        connection.sendall(json.dumps({"digest": digest}).encode("utf8") + b"\n")
+        return
+    if placer_digest() != digest:
+        connection.sendall(
+            b"placeram has changed since the placement worker started: restart it.\n"
+            + END_OF_OUTPUT
+            + str(STALE).encode("utf8")
+            + b"\n"
+        )
+        return
+
+    # Both Python's and OpenROAD's own output
+    for fd in [1, 2]:
+        os.dup2(connection.fileno(), fd)
+    sys.stdout.reconfigure(line_buffering=True)
+    sys.stderr.reconfigure(line_buffering=True)
+    try:
+        returncode = place(request)
+    except Exception:
+        traceback.print_exc()
+        returncode = os.EX_SOFTWARE
+    sys.stdout.flush()
+    sys.stderr.flush()
+    connection.sendall(END_OF_OUTPUT + str(returncode).encode("utf8") + b"\n")
+
+
+def serve(path: str):
+    # Hashed as the rest of placeram is imported, so it describes the code
+    # every request runs
+    digest = placer_digest()
+
+    # Imported once, here, so every request starts with them imported
+    from . import cli  # noqa: F401
+
+    if is_serving(path):
+        print(f"A placement worker is already serving at '{path}'.", file=sys.stderr)
+        exit(os.EX_UNAVAILABLE)
+    if os.path.exists(path):
+        os.unlink(path)
+
+    # Requests are reaped as soon as they exit
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt()
+
+    signal.signal(signal.SIGTERM, stop)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen()
+        print(f"Serving placements at '{path}'…", file=sys.stderr)
+        try:
+            while True:
+                connection, _ = server.accept()
+                if os.fork() == 0:
+                    server.close()
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    try:
+                        handle(connection, digest)
+                    finally:
+                        os._exit(0)
+                connection.close()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+    print("Stopped.", file=sys.stderr)
+
+
+def request(path: str, argv: List[str], metrics: Optional[str]) -> int:
+    """
+    Places with the worker at ``path``, copying the output of the placement
+    to stdout, and returns its exit code.
+    """
+    message = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "metrics": metrics and os.path.abspath(metrics),
+    }
+    status = b""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        connection.sendall(json.dumps(message).encode("utf8") + b"\n")
+        ended = False
+        while True:
+            chunk = connection.recv(1 << 16)
+            if len(chunk) == 0:
+                break
+            if not ended and END_OF_OUTPUT in chunk:
+                chunk, _, status = chunk.partition(END_OF_OUTPUT)
+                ended = True
+            elif ended:
+                status += chunk
+                continue
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.flush()
+    if not ended:
+        print("The placement worker exited unexpectedly.", file=sys.stderr)
+        return os.EX_SOFTWARE
+    return int(status)
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command("serve")
+@click.option("--socket", "path", default=default_socket, show_default=True)
+def serve_cmd(path):
+    """
+    Serves placements until interrupted. Run with ``openroad -python``.
+    """
+    serve(path)
+
+
+@cli.command("request", context_settings={"ignore_unknown_options": True})
+@click.option("--socket", "path", default=default_socket, show_default=True)
+@click.option(
+    "--metrics",
+    default=None,
+    help="A JSON file to write the metrics to, like OpenROAD's -metrics.",
+)
+@click.argument("argv", nargs=-1, type=click.UNPROCESSED)
+def request_cmd(path, metrics, argv):
+    """
+    Places with a running worker. Takes the arguments of placeram.
+    """
+    exit(request(path, list(argv), metrics))
+
+
+if __name__ == "__main__":
+    cli()
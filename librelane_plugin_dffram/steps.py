@@ -3,36 +3,140 @@
 # Copyright ©2020-2025, The American University in Cairo
 # Copyright ©2023 Efabless Corporation
 import os
+import sys
+import json
 import math
+import shutil
+import hashlib
+import subprocess
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Mapping, Optional, Tuple
 from decimal import Decimal
 
 import yaml
+from librelane.common import GenericDictEncoder, Path as ViewPath
 from librelane.config import Variable, Config
-from librelane.logging import warn
+from librelane.logging import info, warn
 from librelane.state import DesignFormat
-from librelane.steps import OpenROAD, OdbpyStep, Step
+from librelane.steps import OpenROAD, OdbpyStep, Step, Yosys
+
+from placeram.plan_cache import placer_digest
+from placeram.worker import default_socket, is_serving, serving_digest
+
+from .cache import file_digest, tool_fingerprint
+from .pieces import Model, Piece, elaboration_script, parse_parameters, piece_name
 
 __file_dir__ = Path(__file__).absolute().parent
 
+ram_size = Variable(
+    "RAM_SIZE",
+    str,
+    "The size of the RAM macro being hardened the format {words}x{bits}",
+)
+building_blocks = Variable(
+    "BUILDING_BLOCKS",
+    str,
+    "The set of building blocks being used.",
+    default="ram",
+)
+ram_variant = Variable(
+    "RAM_VARIANT",
+    Optional[str],
+    "The variant of the building blocks being used (such as 1RW1R), if any.",
+)
+ram_use_latch = Variable(
+    "RAM_USE_LATCH",
+    bool,
+    "Whether the RAM macro stores bits in latches rather than flip-flops.",
+    default=True,
+)
+minimum_height = Variable(
+    "MINIMUM_HEIGHT",
+    type=Decimal,
+    description="A minimum height to be applied",
+    default=0,
+    units="µm",
+)
+
+plan_cache = Variable(
+    "DFFRAM_PLAN_CACHE",
+    Optional[str],
+    "A local directory to cache PlaceRAM's placement plans in, keyed by a fingerprint of the netlist, the rows and the platform. Designs placed before are placed from it instead of being placed anew. Caching is disabled if unset.",
+)
+
+placer_profile = Variable(
+    "DFFRAM_PLACER_PROFILE",
+    bool,
+    "Profile PlaceRAM: report the time of each of its phases and Placeable classes, and how many rows, fills and taps it places and odb calls it makes, as dffram__placer__* metrics, and write them as trace events to placeram.profile.json in the step directory.",
+    default=False,
+)
+
+# PlaceRAM shrinks the floorplan to the placement anyway, so spare rows cost
+# nothing and keep placement going should the estimate fall short.
+ESTIMATE_HEADROOM = Decimal("1.1")
+
+
+def estimate_core_size(config: Mapping) -> Optional[Tuple[Decimal, Decimal]]:
+    """
+    Predicts the core width and height PlaceRAM will place the design in, in
+    µm, with ``placeram.estimate``: no synthesis or OpenROAD is needed.
+
+    Returns None if the design cannot be estimated, e.g. on platforms whose
+    building blocks are not modeled by ``placeram/synthetic.py``.
+    """
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(__file_dir__ / "scripts" / "odbpy")
+    cmd = [
+        sys.executable,
+        "-m",
+        "placeram.estimate",
+        "--building-blocks",
+        f"{config['PDK']}:{config['STD_CELL_LIBRARY']}:{config['BUILDING_BLOCKS']}",
+        "--size",
+        config["RAM_SIZE"],
+        "--latch" if config["RAM_USE_LATCH"] else "--dff",
+    ]
+    if config["RAM_VARIANT"] is not None:
+        cmd += ["--variant", config["RAM_VARIANT"]]
+    for lef in config.get("CELL_LEFS") or []:
+        cmd += ["--input-lef", str(lef)]
+
+    result = subprocess.run(
+        cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="utf8"
+    )
+    if result.returncode != 0:
+        warn(f"Could not estimate the core area: {result.stderr.strip()}")
+        return None
+    estimate = json.loads(result.stdout)
+    return Decimal(str(estimate["core_width"])), Decimal(str(estimate["core_height"]))
+
+
+def placer_socket() -> Optional[str]:
+    """
+    Returns the socket of the running placement worker (``placeram.worker``),
+    if there is one and it runs the placeram on disk.
+    """
+    path = default_socket()
+    if not is_serving(path):
+        return None
+    if serving_digest(path) != placer_digest():
+        warn(
+            f"placeram has changed since the placement worker at '{path}' started: restart it. Placing without it…"
+        )
+        return None
+    return path
+
 
 @Step.factory.register()
 class PlaceRAM(OdbpyStep):
     id = "DFFRAM.PlaceRAM"
 
     config_vars = [
-        Variable(
-            "RAM_SIZE",
-            str,
-            "The size of the RAM macro being hardened the format {words}x{bits}",
-        ),
-        Variable(
-            "BUILDING_BLOCKS",
-            str,
-            "The set of building blocks being used.",
-            default="ram",
-        ),
+        ram_size,
+        building_blocks,
+        minimum_height,
+        plan_cache,
+        placer_profile,
     ]
 
     def get_script_path(self):
@@ -44,14 +148,59 @@ class PlaceRAM(OdbpyStep):
             f"{self.config['PDK']}:{self.config['STD_CELL_LIBRARY']}:{self.config['BUILDING_BLOCKS']}",
             "--size",
             self.config["RAM_SIZE"],
+            # The floorplan is shrunk to the placement by PlaceRAM itself,
+            # so Floorplan only has to run once.
+            "--resize-floorplan",
+            "--minimum-height",
+            str(self.config["MINIMUM_HEIGHT"]),
         ]
+        if self.config["DFFRAM_PLAN_CACHE"] is not None:
+            raw += ["--plan-cache", self.config["DFFRAM_PLAN_CACHE"]]
+        if self.config["DFFRAM_PLACER_PROFILE"]:
+            raw += [
+                "--profile-trace",
+                os.path.join(self.step_dir, "placeram.profile.json"),
+            ]
         raw.insert(raw.index("placeram"), "-m")
+
+        socket_path = placer_socket()
+        if socket_path is not None:
+            info(f"Placing with the placement worker at '{socket_path}'…")
+            metrics_path = raw[raw.index("-metrics") + 1]
+            raw = [
+                sys.executable,
+                "-m",
+                "placeram.worker",
+                "request",
+                "--socket",
+                socket_path,
+                "--metrics",
+                metrics_path,
+                "--",
+            ] + raw[raw.index("placeram") + 1 :]
         return raw
 
     def run(self, state_in, **kwargs):
         kwargs, env = self.extract_env(kwargs)
         env["PYTHONPATH"] = str(__file_dir__ / "scripts" / "odbpy")
-        return super().run(state_in, env=env, **kwargs)
+        views_updates, metrics_updates = super().run(state_in, env=env, **kwargs)
+
+        estimated = [
+            state_in.metrics.get("dffram__estimated__core_width"),
+            state_in.metrics.get("dffram__estimated__core_height"),
+        ]
+        placed = [
+            metrics_updates.get("dffram__suggested__core_width"),
+            metrics_updates.get("dffram__suggested__core_height"),
+        ]
+        if None not in estimated + placed and not all(
+            math.isclose(float(a), float(b), abs_tol=1e-3)
+            for a, b in zip(estimated, placed)
+        ):
+            warn(
+                f"The estimated core area of {estimated[0]}µm x {estimated[1]}µm does not match the placement's {placed[0]}µm x {placed[1]}µm: placeram/synthetic.py may be out of date with the models."
+            )
+        return views_updates, metrics_updates
 
 
 def calculate_halo(config: Config):
@@ -108,22 +257,25 @@ class Floorplan(OpenROAD.Floorplan):
             units="µm",
             default=2.5,
         ),
-        Variable(
-            "MINIMUM_HEIGHT",
-            type=Decimal,
-            description="A minimum height to be applied",
-            default=0,
-            units="µm",
-        ),
+        minimum_height,
+        ram_size,
+        building_blocks,
+        ram_variant,
+        ram_use_latch,
     ]
 
     def run(self, state_in, **kwargs):
-        core_width = Decimal(
-            state_in.metrics.get("dffram__suggested__core_width") or 20000
-        )
-        core_height = Decimal(
-            state_in.metrics.get("dffram__suggested__core_height") or 20000
-        )
+        core_width = state_in.metrics.get("dffram__suggested__core_width")
+        core_height = state_in.metrics.get("dffram__suggested__core_height")
+        estimate = None
+        if core_width is None or core_height is None:
+            estimate = estimate_core_size(self.config)
+        if estimate is not None:
+            core_width, core_height = estimate
+            core_height *= ESTIMATE_HEADROOM
+        # Nothing to go by: a core large enough for any size
+        core_width = Decimal(core_width or 20000)
+        core_height = Decimal(core_height or 20000)
 
         horizontal_halo, vertical_halo, _, site_height = calculate_halo(self.config)
 
@@ -142,4 +294,223 @@ class Floorplan(OpenROAD.Floorplan):
             f"{horizontal_halo} {vertical_halo} {horizontal_halo + core_width} {vertical_halo + core_height}"
         )
         env["FP_SIZING"] = "absolute"
-        return super().run(state_in, env=env, **kwargs)
+        views_updates, metrics_updates = super().run(state_in, env=env, **kwargs)
+        if estimate is not None:
+            metrics_updates["dffram__estimated__core_width"] = float(estimate[0])
+            metrics_updates["dffram__estimated__core_height"] = float(estimate[1])
+        return views_updates, metrics_updates
+
+
+synth_piece_cache = Variable(
+    "DFFRAM_SYNTH_PIECE_CACHE",
+    Optional[str],
+    "A local directory to keep the flattened netlists of the parts of the model that are shared across sizes in, such as the RAM512 in both the 1024 and 2048-word RAMs, so they are elaborated once. Everything is elaborated anew if unset.",
+)
+
+
+@Step.factory.register()
+class Synthesis(Yosys.Synthesis):
+    """
+    Elaborates the model from flattened pieces, each cached in
+    ``DFFRAM_SYNTH_PIECE_CACHE`` and shared by every size and variant that
+    instantiates it with the same parameters (see ``pieces.py``.) Only the
+    modules above the largest shared piece are elaborated for each size.
+
+    Not part of any flow until ``tests/test_pieces.py`` has passed against
+    Yosys.
+    """
+
+    id = "DFFRAM.Synthesis"
+
+    config_vars = Yosys.Synthesis.config_vars + [synth_piece_cache]
+
+    composed_config_path: Optional[str] = None
+
+    def get_command(self, state_in) -> List[str]:
+        cmd = super().get_command(state_in)
+        if self.composed_config_path is not None:
+            cmd[cmd.index("--config-in") + 1] = self.composed_config_path
+        return cmd
+
+    def elaborate_piece(
+        self,
+        piece: Piece,
+        sources: List[str],
+        children: List[str],
+        libs: List[str],
+        output: str,
+    ):
+        name = piece_name(piece)
+        defines = (self.config["VERILOG_DEFINES"] or []) + [
+            f"PDK_{self.config['PDK']}",
+            f"SCL_{self.config['STD_CELL_LIBRARY']}",
+            "__librelane__",
+            "__pnr__",
+        ]
+        script = elaboration_script(
+            piece[0],
+            dict(piece[1]),
+            sources + children,
+            libs,
+            output,
+            defines=defines,
+            includes=self.config["VERILOG_INCLUDE_DIRS"] or [],
+            piece=name,
+        )
+        script_path = os.path.join(self.step_dir, "pieces", f"{name}.ys")
+        with open(script_path, "w") as f:
+            f.write("\n".join(script) + "\n")
+        self.run_subprocess(
+            ["yosys", "-q", "-s", script_path],
+            log_to=os.path.join(self.step_dir, "pieces", f"{name}.log"),
+        )
+
+    def run(self, state_in, **kwargs):
+        cache_dir = self.config["DFFRAM_SYNTH_PIECE_CACHE"]
+        if cache_dir is None or not self.config["SYNTH_ELABORATE_ONLY"]:
+            return super().run(state_in, **kwargs)
+
+        originals = [str(file) for file in self.config["VERILOG_FILES"]]
+        texts = [open(file, encoding="utf8").read() for file in originals]
+        model = Model(
+            texts,
+            parse_parameters(self.config["SYNTH_PARAMETERS"] or []),
+        )
+        top = self.config["DESIGN_NAME"]
+        if top not in model.bodies or len(model.pieces_of(top)) == 0:
+            return super().run(state_in, **kwargs)
+
+        pieces_dir = os.path.join(self.step_dir, "pieces")
+        os.makedirs(pieces_dir, exist_ok=True)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # The rewritten sources are hashed as they are written: they differ
+        # for every size and variant, so there is no point remembering them
+        sources = []
+        source_digests = []
+        for i, (file, text) in enumerate(zip(originals, texts)):
+            source = os.path.join(pieces_dir, f"{i}-{os.path.basename(file)}")
+            rewritten = model.rewrite(text).encode("utf8")
+            with open(source, "wb") as f:
+                f.write(rewritten)
+            sources.append(source)
+            source_digests.append(hashlib.sha256(rewritten).hexdigest())
+
+        libs = [
+            str(lib)
+            for lib in self.toolbox.filter_views(self.config, self.config["LIB"])
+        ]
+        common = {
+            "sources": source_digests,
+            "libs": [file_digest(lib) for lib in libs],
+            "defines": self.config["VERILOG_DEFINES"],
+            "includes": self.config["VERILOG_INCLUDE_DIRS"],
+            "pdk": [self.config["PDK"], self.config["STD_CELL_LIBRARY"]],
+            "yosys": tool_fingerprint("yosys"),
+        }
+
+        keys: Dict[Piece, str] = {}
+        netlists: Dict[Piece, str] = {}
+        reused = 0
+        for piece in model.order(top):
+            children = model.pieces_of(piece[0])
+            key = json.dumps(
+                {
+                    "piece": piece,
+                    "children": [keys[child] for child in children],
+                    **common,
+                },
+                sort_keys=True,
+                cls=GenericDictEncoder,
+            )
+            keys[piece] = hashlib.sha256(key.encode("utf8")).hexdigest()
+            name = piece_name(piece)
+            netlists[piece] = os.path.join(
+                os.path.abspath(cache_dir), f"{name}-{keys[piece][:16]}.nl.v"
+            )
+            if os.path.isfile(netlists[piece]):
+                reused += 1
+                os.utime(netlists[piece])
+                continue
+            info(f"Elaborating {name}…")
+            output = os.path.join(pieces_dir, f"{name}.nl.v")
+            self.elaborate_piece(
+                piece,
+                sources,
+                [netlists[child] for child in children],
+                libs,
+                output,
+            )
+            staging = f"{netlists[piece]}.{os.getpid()}"
+            shutil.copyfile(output, staging)
+            os.replace(staging, netlists[piece])
+
+        composed = sources + [netlists[piece] for piece in model.pieces_of(top)]
+        with open(os.path.join(self.step_dir, "config.json"), encoding="utf8") as f:
+            raw = json.load(f)
+        raw["VERILOG_FILES"] = composed
+        self.composed_config_path = os.path.join(self.step_dir, "config.composed.json")
+        with open(self.composed_config_path, "w", encoding="utf8") as f:
+            json.dump(raw, f, indent=4)
+        self.config = self.config.copy(VERILOG_FILES=composed)
+
+        views_updates, metrics_updates = super().run(state_in, **kwargs)
+        metrics_updates["dffram__synthesis__pieces_reused"] = reused
+        metrics_updates["dffram__synthesis__pieces_elaborated"] = len(keys) - reused
+        return views_updates, metrics_updates
+
+
+@Step.factory.register()
+class GenerateNetlist(Step):
+    """
+    Writes the flattened netlist of the model with ``placeram.netlist``
+    instead of elaborating it with Yosys. The netlist has the cells and
+    instance names Yosys would produce with ``SYNTH_ELABORATE_ONLY`` and
+    ``SYNTH_ELABORATE_FLATTEN``; ``verification/equivalence.py`` checks that
+    it does.
+
+    Not part of any flow until ``tests/test_equivalence.py`` has passed
+    against Yosys.
+    """
+
+    id = "DFFRAM.GenerateNetlist"
+    name = "Netlist Generation"
+
+    inputs = []  # The model is part of the configuration
+    outputs = [DesignFormat.NETLIST]
+
+    config_vars = [
+        var
+        for var in Yosys.Synthesis.config_vars
+        if var.name in ["VERILOG_FILES", "VERILOG_DEFINES", "SYNTH_PARAMETERS"]
+    ]
+
+    def run(self, state_in, **kwargs):
+        netlist = os.path.join(self.step_dir, f"{self.config['DESIGN_NAME']}.nl.v")
+        defines = (self.config["VERILOG_DEFINES"] or []) + [
+            f"PDK_{self.config['PDK']}",
+            f"SCL_{self.config['STD_CELL_LIBRARY']}",
+            "__librelane__",
+            "__pnr__",
+        ]
+        cmd = [
+            sys.executable,
+            "-m",
+            "placeram.netlist",
+            "generate",
+            "--top",
+            self.config["DESIGN_NAME"],
+            "--output",
+            netlist,
+            "--metrics",
+        ]
+        for parameter in self.config["SYNTH_PARAMETERS"] or []:
+            cmd += ["--parameter", parameter]
+        for define in defines:
+            cmd += ["--define", define.split("=", 1)[0]]
+        cmd += [str(file) for file in self.config["VERILOG_FILES"]]
+
+        env = os.environ.copy()
+        env["PYTHONPATH"] = str(__file_dir__ / "scripts" / "odbpy")
+        metrics_updates = self.run_subprocess(cmd, env=env)
+        return {DesignFormat.NETLIST: ViewPath(netlist)}, metrics_updates
@@ -0,0 +1,70 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import os
+import sys
+import glob
+import shutil
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ODBPY = os.path.join(ROOT, "librelane_plugin_dffram", "scripts", "odbpy")
+sys.path.insert(0, ODBPY)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "verification"))
+
+# placeram is tested on the mock database, as placeram.bench does
+try:
+    import odb  # noqa: F401
+except ImportError:
+    from placeram import mock_odb
+
+    sys.modules["odb"] = mock_odb
+
+
+@pytest.fixture
+def liberty():
+    """
+    A typical corner liberty file of sky130_fd_sc_hd, for the tests that run
+    Yosys. They are skipped if Yosys or the PDK is missing.
+    """
+    if shutil.which("yosys") is None:
+        pytest.skip("Yosys is not installed")
+    pdk_root = os.getenv("PDK_ROOT") or os.path.join(ROOT, "pdks")
+    libs = glob.glob(
+        os.path.join(
+            pdk_root, "sky130A", "libs.ref", "sky130_fd_sc_hd", "lib", "*tt*.lib"
+        )
+    )
+    if len(libs) == 0:
+        pytest.skip(f"No typical corner liberty file under {pdk_root}")
+    return libs[0]
+
+
+class Placement(object):
+    """
+    A synthetic design placed on the mock database by placeram.bench.
+    """
+
+    def __init__(
+        self,
+        size: str,
+        variant=None,
+        building_blocks: str = "sky130A:sky130_fd_sc_hd:ram",
+    ):
+        from placeram.bench import load_design, place
+
+        self.design, words, register_file = load_design(
+            building_blocks, size, variant, True, []
+        )
+        self.instances = self.design.block.getInsts()
+        self.masters, self.plan, self.rows, self.last_row = place(
+            self.design, words, register_file
+        )
+
+
+@pytest.fixture
+def placement(monkeypatch):
+    # The platforms and models are looked up from the working directory
+    monkeypatch.chdir(ROOT)
+    return Placement
@@ -0,0 +1,174 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import io
+import os
+from decimal import Decimal
+
+import pytest
+
+from conftest import ROOT
+from librelane.state import DesignFormat, State
+from librelane_plugin_dffram.banks import (
+    MINIMUM_CHANNEL,
+    BankedRAM,
+    die_size,
+    macro_config,
+)
+from placeram.netlist import generate
+from placeram.synthetic import SyntheticNetlist
+
+DEFINES = ["PDK_sky130A", "SCL_sky130_fd_sc_hd", "__librelane__", "__pnr__"]
+
+SITE_WIDTH = Decimal("0.46")
+SITE_HEIGHT = Decimal("2.72")
+
+
+def definitions() -> str:
+    path = os.path.join(
+        ROOT, "platforms", "sky130A", "sky130_fd_sc_hd", "block_definitions.v"
+    )
+    with open(path, encoding="utf8") as f:
+        return f.read()
+
+
+def bank(banked: BankedRAM) -> str:
+    """
+    A stand-in for the hardened bank, with a ``PIN`` cell on every bit of
+    every port so the flat netlist shows what each bit is connected to.
+    """
+    ports = [("CLK", None), ("WE0", banked.width // 8), ("Di0", banked.width)]
+    for port in banked.ports:
+        ports += [
+            (f"EN{port}", None),
+            (f"A{port}", banked.bank_bits),
+            (f"Do{port}", banked.width),
+        ]
+    header = []
+    body = []
+    for name, width in ports:
+        direction = "output" if name.startswith("Do") else "input"
+        if width is None:
+            header.append(f"{direction} {name}")
+            body.append(f"PIN {name}_PIN (.X({name}));")
+        else:
+            header.append(f"{direction} [{width - 1}:0] {name}")
+            body.append(
+                f"for (i = 0; i < {width}; i = i + 1) begin : {name}_PIN PIN p (.X({name}[i])); end"
+            )
+    return "\n".join(
+        [f"module {banked.bank_design} ({', '.join(header)});", "generate", "genvar i;"]
+        + body
+        + ["endgenerate", "endmodule"]
+    )
+
+
+def bits(netlist, instance: str, port: str):
+    cells = {cell.name: cell for cell in netlist.cells}
+    if f"{instance}.{port}_PIN" in cells:
+        return [cells[f"{instance}.{port}_PIN"].pins["X"].name]
+    result = []
+    while f"{instance}.{port}_PIN[{len(result)}].p" in cells:
+        result.append(cells[f"{instance}.{port}_PIN[{len(result)}].p"].pins["X"].name)
+    return result
+
+
+def cells_on(netlist, net: str):
+    return [
+        cell.name
+        for cell in netlist.cells
+        if any(pin.name == net for pin in cell.pins.values())
+    ]
+
+
+@pytest.mark.parametrize("variant", [None, "1RW1R"])
+def test_two_bank_top_level(variant):
+    banked = BankedRAM("RAM1024", "RAM512", 1024, 512, 32, variant)
+    assert banked.count == 2
+    top = io.StringIO()
+    banked.write_verilog(top, "VPWR", "VGND")
+    assert ".VPWR(VPWR)" in top.getvalue()
+    netlist = generate(
+        [definitions(), bank(banked), top.getvalue()], "RAM1024", {}, DEFINES
+    )
+
+    for i, instance in enumerate(banked.instances):
+        assert bits(netlist, instance, "CLK") == ["CLK"]
+        assert bits(netlist, instance, "WE0") == [f"WE0[{b}]" for b in range(4)]
+        assert bits(netlist, instance, "Di0") == [f"Di0[{b}]" for b in range(32)]
+        for port in banked.ports:
+            # Every bank sees the low address bits and is enabled by its
+            # own output of the decoder
+            assert bits(netlist, instance, f"A{port}") == [
+                f"A{port}[{b}]" for b in range(9)
+            ]
+            assert bits(netlist, instance, f"EN{port}") == [f"SEL{port}[{i}]"]
+            assert any(
+                cell.startswith(f"DEC{port}.")
+                for cell in cells_on(netlist, f"SEL{port}[{i}]")
+            )
+            outputs = bits(netlist, instance, f"Do{port}")
+            assert outputs == [f"Do{port}_pre[{i}][{b}]" for b in range(32)]
+            for output in outputs:
+                assert any(
+                    cell.startswith(f"Do{port}MUX_0_0.")
+                    for cell in cells_on(netlist, output)
+                )
+
+    for port in banked.ports:
+        # The top address bit selects the bank, on both sides
+        selecting = cells_on(netlist, f"A{port}[9]")
+        assert any(cell.startswith(f"DEC{port}.") for cell in selecting)
+        assert any(cell.startswith(f"Do{port}MUX_0_0.") for cell in selecting)
+        assert any(
+            cell.startswith(f"DEC{port}.") for cell in cells_on(netlist, f"EN{port}")
+        )
+        for b in range(32):
+            assert any(
+                cell.startswith(f"Do{port}MUX_0_0.")
+                for cell in cells_on(netlist, f"Do{port}[{b}]")
+            )
+
+
+def test_two_bank_macro_placement(tmp_path):
+    banked = BankedRAM("RAM1024", "RAM512", 1024, 512, 32, None)
+    sites = banked.logic_sites(definitions(), SyntheticNetlist().library(), DEFINES)
+    assert sites > 0
+
+    views = {}
+    for format, extension in [
+        (DesignFormat.GDS, "gds"),
+        (DesignFormat.LEF, "lef"),
+        (DesignFormat.NETLIST, "nl.v"),
+        (DesignFormat.POWERED_NETLIST, "pnl.v"),
+    ]:
+        views[format] = str(tmp_path / f"RAM512.{extension}")
+    views[DesignFormat.LIB] = {"nom_tt_025C_1v80": str(tmp_path / "RAM512.lib")}
+    state = State(views, metrics={"design__die__bbox": "0.0 0.0 412.16 302.64"})
+    width, height = die_size(state)
+    assert (width, height) == (Decimal("412.16"), Decimal("302.64"))
+
+    halo = Decimal(10)
+    (die_width, die_height), locations = banked.floorplan(
+        width, height, SITE_WIDTH, SITE_HEIGHT, halo, halo, sites
+    )
+    # Side by side, a channel apart, on the site grid and within the halos
+    (x0, y0), (x1, y1) = locations["BANK0"], locations["BANK1"]
+    assert (x0, y0) == (halo, halo)
+    assert y1 == y0
+    assert x1 - (x0 + width) >= MINIMUM_CHANNEL
+    assert (x1 - x0) % SITE_WIDTH == 0
+    assert die_width % SITE_WIDTH == 0 and die_height % SITE_HEIGHT == 0
+    assert die_width >= x1 + width + halo
+    assert die_height >= y0 + height + halo
+
+    macro = macro_config(state, locations)
+    assert macro["gds"] == [views[DesignFormat.GDS]]
+    assert macro["lef"] == [views[DesignFormat.LEF]]
+    assert macro["nl"] == [views[DesignFormat.NETLIST]]
+    assert macro["pnl"] == [views[DesignFormat.POWERED_NETLIST]]
+    assert macro["lib"] == {"nom_tt_025C_1v80": [str(tmp_path / "RAM512.lib")]}
+    assert "spef" not in macro
+    assert macro["instances"] == {
+        "BANK0": {"location": [x0, y0], "orientation": "N"},
+        "BANK1": {"location": [x1, y1], "orientation": "N"},
+    }
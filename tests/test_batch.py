@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import threading
+
+from librelane_plugin_dffram.batch import Job, backfill, schedule
+
+GiB = 1 << 30
+
+
+class Recorder(object):
+    """
+    Runs jobs for ``schedule``, recording the threads and memory in use
+    whenever one starts.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = []
+        self.started = []
+        self.peaks = []
+
+    def __call__(self, job, threads):
+        with self.lock:
+            self.running.append((job, threads))
+            self.started.append((job.tag, threads))
+            self.peaks.append(
+                (
+                    sum(threads for _, threads in self.running),
+                    sum(job.memory for job, _ in self.running),
+                )
+            )
+        # Long enough for the jobs started alongside to overlap
+        threading.Event().wait(0.05)
+        with self.lock:
+            self.running.remove((job, threads))
+        return 0 if job.words != 8 else 1
+
+
+def ram(words, width):
+    return Job("ram", words, width, None, True)
+
+
+def test_backfill():
+    small = [ram(32, 32), ram(32, 32), ram(256, 32)]
+    assert backfill(small, 0) == 0
+    assert backfill(small, small[0].memory * 2) == 2
+    assert backfill(small, 100 * GiB) == 3
+
+
+def test_stays_within_cpus_and_memory():
+    jobs = [ram(2048, 64), ram(2048, 32)] + [ram(32, 32) for _ in range(4)]
+    recorder = Recorder()
+    memory = jobs[0].memory + 3 * jobs[-1].memory
+    results = schedule(jobs, 8, memory, recorder)
+    # Identical jobs share a tag
+    assert len(results) == 3
+    assert all(code == 0 for code in results.values())
+    assert len(recorder.started) == len(jobs)
+    for threads, used in recorder.peaks:
+        assert threads <= 8
+        assert used <= memory
+    # Largest first
+    assert recorder.started[0][0] == jobs[0].tag
+
+
+def test_small_jobs_backfill_next_to_a_large_one():
+    large = ram(2048, 64)
+    jobs = [large] + [ram(32, 32) for _ in range(3)]
+    recorder = Recorder()
+    schedule(jobs, 16, 64 * GiB, recorder)
+    # The large job leaves a thread for each small one, which all start
+    # alongside it rather than after it
+    assert recorder.started[0] == (large.tag, 13)
+    assert recorder.peaks[-1] == (16, sum(job.memory for job in jobs))
+
+
+def test_too_large_jobs_run_alone_with_every_thread():
+    large = ram(2048, 64)
+    recorder = Recorder()
+    schedule([large, ram(32, 32)], 16, large.memory // 2, recorder)
+    assert recorder.started[0] == (large.tag, 16)
+    assert recorder.peaks[1][1] == ram(32, 32).memory
+
+
+def test_exit_codes_by_tag():
+    recorder = Recorder()
+    results = schedule([ram(8, 32), ram(32, 32)], 2, 100 * GiB, recorder)
+    assert results == {ram(8, 32).tag: 1, ram(32, 32).tag: 0}
@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import json
+
+from benchmark import FINAL_METRICS, Design, run_design
+
+# Leaves a run directory behind as dffram.py does, with the runtime.txt and
+# process statistics of a step formatted by librelane itself
+DFFRAM = """
+import os
+import sys
+import json
+
+from librelane.common import format_elapsed_time, format_size
+
+tag = sys.argv[sys.argv.index("--run-tag") + 1]
+run_dir = os.path.join("build", "sky130A-sky130_fd_sc_hd-latch", "RAM32", "runs", tag)
+step_dir = os.path.join(run_dir, "06-dffram-placeram")
+os.makedirs(step_dir)
+os.makedirs(os.path.join(run_dir, "final"))
+with open(os.path.join(step_dir, "runtime.txt"), "w") as f:
+    f.write(format_elapsed_time(3.25))
+stats = {
+    "time": {
+        "cpu_time_user": format_elapsed_time(2.5),
+        "cpu_time_system": format_elapsed_time(0.5),
+        "runtime": format_elapsed_time(3.2),
+    },
+    "peak_resources": {"memory_rss": format_size(300 * 1024 * 1024)},
+}
+with open(os.path.join(step_dir, "openroad.process_stats.json"), "w") as f:
+    json.dump(stats, f)
+os.makedirs(os.path.join(run_dir, "07-openroad-ioplacement"))
+with open(os.path.join(run_dir, "final", "metrics.json"), "w") as f:
+    json.dump({"design__core__area": 1234.5, "design__xor_difference__count": 0}, f)
+"""
+
+
+def test_run_design(tmp_path, monkeypatch):
+    (tmp_path / "dffram.py").write_text(DFFRAM)
+    monkeypatch.chdir(tmp_path)
+    design = Design(32, 32, "DEFAULT")
+
+    result = run_design(design, "benchmark", str(tmp_path))
+
+    assert "error" not in result
+    assert result["bits"] == 1024
+    assert result["run_tag"] == "benchmark_32x32_DEFAULT"
+    assert result["wall_time"] > 0 and result["cpu_time"] > 0
+    assert result["peak_rss"] > 0
+    # Only the steps that ran, with the resources of their subprocesses
+    assert result["steps"] == [
+        {
+            "step": "06-dffram-placeram",
+            "wall_time": 3.25,
+            "cpu_time": 3.0,
+            "peak_rss": 300 * 1024 * 1024,
+        }
+    ]
+    assert result["metrics"] == {
+        name: (1234.5 if name == "design__core__area" else None)
+        for name in FINAL_METRICS
+    }
+    json.dumps(result)
+
+
+def test_run_design_failure(tmp_path, monkeypatch):
+    (tmp_path / "dffram.py").write_text("import sys\nsys.exit(3)\n")
+    monkeypatch.chdir(tmp_path)
+
+    result = run_design(Design(8, 32, "1RW1R"), "benchmark", str(tmp_path))
+
+    assert result["error"] == "dffram.py exited with code 3"
+    assert "steps" not in result
@@ -0,0 +1,166 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import os
+
+import pytest
+from librelane.state import DesignFormat, State
+
+from librelane_plugin_dffram import cache as step_cache
+from librelane_plugin_dffram.cache import HITS, MISSES, StepCache
+
+
+class Step(object):
+    """
+    What StepCache.key uses of a step.
+    """
+
+    def __init__(self, config, implementation="Dummy"):
+        self.config = config
+        self.implementation = implementation
+
+    def get_implementation_id(self):
+        return self.implementation
+
+
+@pytest.fixture
+def files(tmp_path):
+    netlist = tmp_path / "in.nl.v"
+    netlist.write_text("module top; endmodule\n")
+    sdc = tmp_path / "in.sdc"
+    sdc.write_text("create_clock\n")
+    return netlist, sdc
+
+
+def test_key(tmp_path, files):
+    netlist, sdc = files
+    cache = StepCache(str(tmp_path / "cache"), 1 << 20)
+    state = State({DesignFormat.NETLIST: str(netlist)}, metrics={"a": 1})
+    config = {"SDC": str(sdc), "DFFRAM_STEP_CACHE": "one", "CLOCK_PERIOD": 10}
+    key = cache.key(Step(config), state)
+
+    # Neither where the cache is nor how often it hit matter
+    moved = dict(config, DFFRAM_STEP_CACHE="two")
+    assert cache.key(Step(moved), state) == key
+    counted = State(state, metrics={"a": 1, HITS: 3, MISSES: 2})
+    assert cache.key(Step(config), counted) == key
+
+    # Files are keyed by what they hold rather than where they are
+    copy = tmp_path / "copy.sdc"
+    copy.write_text(sdc.read_text())
+    assert cache.key(Step(dict(config, SDC=str(copy))), state) == key
+
+    assert cache.key(Step(dict(config, CLOCK_PERIOD=5)), state) != key
+    assert cache.key(Step(config, "Other"), state) != key
+    assert cache.key(Step(config), State(state, metrics={"a": 2})) != key
+    sdc.write_text("create_clock -period 5\n")
+    assert cache.key(Step(config), state) != key
+    sdc.write_text("create_clock\n")
+    netlist.write_text("module top(); endmodule\n")
+    assert cache.key(Step(config), state) != key
+
+
+class PluginStep(Step):
+    """
+    A step of the plugin, which reads files from the working directory.
+    """
+
+    __module__ = "librelane_plugin_dffram.steps"
+
+
+def test_plugin_steps_key_what_they_read(tmp_path, monkeypatch):
+    plugin = tmp_path / "plugin"
+    (plugin / "__pycache__").mkdir(parents=True)
+    (plugin / "steps.py").write_text("")
+    (plugin / "rx.yml").write_text("Bit: {store: STORAGE}\n")
+    monkeypatch.setattr(step_cache, "__file_dir__", str(plugin))
+
+    work = tmp_path / "work"
+    tech = work / "platforms" / "sky130A" / "sky130_fd_sc_hd" / "tech.yml"
+    blocks = work / "models" / "ram" / "config.yml"
+    for path in [tech, blocks]:
+        path.parent.mkdir(parents=True)
+        path.write_text("")
+    monkeypatch.chdir(work)
+
+    cache = StepCache(str(tmp_path / "cache"), 1 << 20)
+    step = PluginStep(
+        {
+            "PDK": "sky130A",
+            "STD_CELL_LIBRARY": "sky130_fd_sc_hd",
+            "BUILDING_BLOCKS": "ram",
+        }
+    )
+    state = State({}, metrics={"a": 1})
+    key = cache.key(step, state)
+
+    # What PlaceRAM only reports, such as its profile
+    profiled = State(state, metrics={"a": 1, "dffram__placer__time__phase:place": 2.5})
+    assert cache.key(step, profiled) == key
+    (plugin / "__pycache__" / "steps.pyc").write_text("")
+    assert cache.key(step, state) == key
+
+    for path in [plugin / "rx.yml", tech, blocks]:
+        path.write_text(path.read_text() + "# edited\n")
+        edited = cache.key(step, state)
+        assert edited != key, path
+        key = edited
+
+
+def make_step_dir(path, size=100):
+    os.makedirs(path / "reports")
+    (path / "config.json").write_text("{}")
+    (path / "out.nl.v").write_text("x" * size)
+    (path / "reports" / "stat.rpt").write_text("cells 1\n")
+    return path
+
+
+def test_store_and_restore(tmp_path, files):
+    netlist, _ = files
+    cache = StepCache(str(tmp_path / "cache"), 1 << 20)
+    step_dir = make_step_dir(tmp_path / "run1")
+    views = {
+        DesignFormat.NETLIST: str(step_dir / "out.nl.v"),
+        DesignFormat.SDC: str(netlist),
+    }
+    cache.store("ab" * 32, str(step_dir), views, {"m": 1, HITS: 4})
+
+    assert cache.restore("cd" * 32, str(tmp_path / "run2")) is None
+    restored_dir = tmp_path / "run2"
+    views_updates, metrics_updates = cache.restore("ab" * 32, str(restored_dir))
+    assert metrics_updates == {"m": 1}
+    # Views in the step directory follow it, others stay where they were
+    assert str(views_updates["nl"]) == str(restored_dir / "out.nl.v")
+    assert str(views_updates["sdc"]) == str(netlist)
+    assert (restored_dir / "reports" / "stat.rpt").read_text() == "cells 1\n"
+    # Written by the step itself before it runs
+    assert not (restored_dir / "config.json").exists()
+
+    # Not restored if a view outside the step directory is gone
+    netlist.unlink()
+    assert cache.restore("ab" * 32, str(tmp_path / "run3")) is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    root = tmp_path / "cache"
+    step_dir = make_step_dir(tmp_path / "run", size=1000)
+    keys = [f"{i:02x}" * 32 for i in range(4)]
+    cache = StepCache(str(root), 1 << 20)
+    for key in keys[:3]:
+        cache.store(key, str(step_dir), {}, {})
+    entry_size = cache.entries()[0][1]
+
+    # Used in the order 1, 0, 2
+    for age, key in zip([30, 20, 10], keys[1:2] + keys[0:1] + keys[2:3]):
+        path = os.path.join(cache.entry_dir(key), "entry.json")
+        os.utime(path, (1e9 - age, 1e9 - age))
+
+    # Room for three entries: storing a fourth evicts the least recently used
+    cache.max_size = entry_size * 3
+    cache.store(keys[3], str(step_dir), {}, {})
+    left = {os.path.basename(entry) for _, _, entry in cache.entries()}
+    assert left == {keys[0], keys[2], keys[3]}
+
+    # Entries larger than the whole cache are not stored
+    cache.max_size = entry_size - 1
+    cache.store("ff" * 32, str(step_dir), {}, {})
+    assert not os.path.exists(cache.entry_dir("ff" * 32))
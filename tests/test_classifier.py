@@ -0,0 +1,157 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import pytest
+
+from placeram import bench, data
+from placeram.classifier import Classifier, SieveNode
+from placeram.placeable import DataError
+
+RAM_SIZES = ["8x32", "32x32", "128x32", "256x32", "512x32", "1024x32", "2048x64"]
+
+
+def leaves(value, path=()):
+    """
+    Yields the path to and the instance of every leaf of a sieved tree.
+    """
+    if isinstance(value, SieveNode):
+        for variable, element in value.elements.items():
+            yield from leaves(element, path + (value.kind[0].__name__, variable))
+    elif isinstance(value, dict):
+        for key, element in value.items():
+            yield from leaves(element, path + (key,))
+    elif value is not None:
+        yield path, value
+
+
+def paths(instances, words):
+    kind, kwargs = data.hierarchy_kind(words)
+    root = Classifier(kind, **kwargs).classify(instances)
+    return {instance.getName(): path for path, instance in leaves(root)}
+
+
+@pytest.mark.parametrize("size", ["8x32", "32x32", "512x8"])
+def test_every_instance_is_sieved_once(placement, size):
+    instances = placement(size).instances
+    words = int(size.split("x")[0])
+    kind, kwargs = data.hierarchy_kind(words)
+    root = Classifier(kind, **kwargs).classify(instances)
+    sieved = [instance for _, instance in leaves(root)]
+    assert len(sieved) == len(instances)
+    assert set(map(id, sieved)) == set(map(id, instances))
+
+
+def test_paths(placement):
+    found = paths(placement("32x32").instances, 32)
+    assert found["DIBUF\\[1\\].__cell__"] == ("Block", "dibufs", "1")
+    name = (
+        "SLICE_16\\[1\\].RAM16.SLICE\\[0\\].RAM8.WORD\\[3\\].W"
+        + ".BYTE\\[2\\].B.BIT\\[5\\].STORAGE"
+    )
+    assert found[name] == (
+        "Block",
+        "slice_16",
+        "1",
+        "Slice_16",
+        "slices",
+        "0",
+        "Slice",
+        "words",
+        "3",
+        "Word",
+        "bytes",
+        "2",
+        "Byte",
+        "bits",
+        "5",
+        "Bit",
+        "store",
+    )
+
+
+def test_order_does_not_matter(placement):
+    # The memos of prefixes and suffixes are filled in another order
+    instances = placement("32x32").instances
+    assert paths(list(reversed(instances)), 32) == paths(instances, 32)
+
+
+def test_unknown_instances_are_rejected(placement):
+    from placeram import mock_odb
+
+    placed = placement("8x32")
+    master = next(iter(placed.design.masters.values()))
+    stray = mock_odb.dbInst_create(placed.design.block, master, "STRAY\\[0\\]")
+    kind, kwargs = data.hierarchy_kind(8)
+    with pytest.raises(DataError, match="Unknown element"):
+        Classifier(kind, **kwargs).classify(list(placed.instances) + [stray])
+
+
+class Sieve(Classifier):
+    """
+    Sieves like Placeable.sieve did before the classifier: every level
+    searches the full name of each of its instances with its patterns, in
+    order, and hands the instances matching a child down to be sieved again.
+    """
+
+    def classify(self, instances):
+        return self.sieve(self.root, instances)
+
+    def sieve(self, node, instances):
+        children = {}
+        for instance in instances:
+            name = instance.getName()
+            for sieve, rx in node.patterns:
+                result = rx.search(name)
+                if result is not None:
+                    break
+            else:
+                raise DataError(
+                    "Unknown element in %s: %s" % (node.kind[0].__name__, name)
+                )
+            access_order = [result.group(ordinal) for ordinal in sieve.groups_rx_order]
+            if sieve.child is None:
+                node.store(sieve, access_order, instance)
+            else:
+                child = node.descend(self, sieve, access_order)
+                children.setdefault(id(child), (child, []))[1].append(instance)
+        for child, members in children.values():
+            self.sieve(child, members)
+        return node
+
+
+def recording(classifier, found):
+    """
+    ``classifier``, recording the path to every instance it sieves into
+    ``found`` before the hierarchy built from it consumes the tree.
+    """
+
+    class Recording(classifier):
+        def classify(self, instances):
+            root = super().classify(instances)
+            found.update((instance.getName(), path) for path, instance in leaves(root))
+            return root
+
+    return Recording
+
+
+@pytest.mark.parametrize(
+    "building_blocks,size,variant",
+    [("ram", size, variant) for size in RAM_SIZES for variant in [None, "1RW1R"]]
+    + [("rf", "32x32", "2R1W")],
+)
+def test_same_as_sieving_every_level(
+    placement, monkeypatch, building_blocks, size, variant
+):
+    building_blocks = f"sky130A:sky130_fd_sc_hd:{building_blocks}"
+    placed = {}
+    found = {}
+    for classifier in [Classifier, Sieve]:
+        found[classifier] = {}
+        monkeypatch.setattr(
+            bench, "Classifier", recording(classifier, found[classifier])
+        )
+        placed[classifier] = placement(size, variant, building_blocks=building_blocks)
+
+    assert len(found[Classifier]) == len(placed[Classifier].instances)
+    assert found[Classifier] == found[Sieve]
+    assert placed[Classifier].plan.names == placed[Sieve].plan.names
+    assert placed[Classifier].plan.arrays() == placed[Sieve].plan.arrays()
@@ -0,0 +1,153 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from librelane.common import set_tpe
+from librelane.flows import FlowException
+from librelane.state import State
+
+from librelane_plugin_dffram.dag import DAGFlow
+
+
+class ProgressBar(object):
+    def set_max_stage_count(self, count):
+        pass
+
+    def get_ordinal_prefix(self):
+        return "1-"
+
+    def start_stage(self, name):
+        pass
+
+    def end_stage(self, increment_ordinal=True):
+        pass
+
+
+def dummy(id, metrics, waits_for=None):
+    """
+    A step that sets ``metrics`` and adds one to ``count``, after
+    ``waits_for`` is set if given.
+    """
+
+    class Dummy(object):
+        def __init__(self, config, state_in):
+            self.state_in = state_in
+            self.state_out = None
+
+        def start(self, toolbox=None, step_dir=None):
+            if waits_for is not None:
+                assert waits_for.wait(10)
+            updated = dict(self.state_in.metrics)
+            updated.update(metrics)
+            updated["count"] = updated.get("count", 0) + 1
+            self.state_out = State(self.state_in, metrics=updated)
+            started.append(id)
+            return self.state_out
+
+    Dummy.id = Dummy.name = id
+    return Dummy
+
+
+started = []
+
+
+def flow(steps, dependencies, config=None, tmp_path=None):
+    class Flow(DAGFlow):
+        Steps = steps
+        Dependencies = dependencies
+        Accumulated = ["count"]
+        gating_config_vars = {}
+
+    # Only what run() and selected() use of a Flow
+    instance = Flow.__new__(Flow)
+    instance.config = config or {}
+    instance.toolbox = None
+    instance.run_dir = str(tmp_path)
+    instance.progress_bar = ProgressBar()
+    return instance
+
+
+@pytest.fixture(autouse=True)
+def workers():
+    started.clear()
+    set_tpe(ThreadPoolExecutor(4))
+
+
+def test_dependencies():
+    A, B, C, D = [dummy(id, {}) for id in "ABCD"]
+    assert flow([A, B, C, D], {"C": ["A"], "D": ["B", "C"]}).dependencies() == [
+        [],
+        [0],
+        [0],
+        [1, 2],
+    ]
+    with pytest.raises(FlowException, match="not an earlier step"):
+        flow([A, B], {"A": ["B"]}).dependencies()
+
+
+def test_merged_in_flow_order(tmp_path):
+    # B finishes after C, but C is after B in the flow, so C's value wins
+    b_may_finish = threading.Event()
+    steps = [
+        dummy("A", {"x": "A"}),
+        dummy("B", {"x": "B"}, waits_for=b_may_finish),
+        dummy("C", {"x": "C", "c": 1}),
+        dummy("D", {}),
+    ]
+
+    class Release(steps[2]):
+        def start(self, **kwargs):
+            result = super().start(**kwargs)
+            b_may_finish.set()
+            return result
+
+    steps[2] = Release
+    final, ran = flow(
+        steps, {"B": ["A"], "C": ["A"], "D": ["B", "C"]}, tmp_path=tmp_path
+    ).run(State())
+    assert started.index("C") < started.index("B")
+    assert final.metrics["x"] == "C"
+    assert final.metrics["c"] == 1
+    # Summed across steps rather than the last value kept
+    assert final.metrics["count"] == 4
+    assert [step.__class__.id for step in ran] == ["A", "B", "C", "D"]
+
+
+def test_steps_see_only_their_ancestors(tmp_path):
+    seen = {}
+
+    def recording(id, metrics):
+        Step = dummy(id, metrics)
+
+        class Recording(Step):
+            def start(self, **kwargs):
+                seen[id] = dict(self.state_in.metrics)
+                return super().start(**kwargs)
+
+        return Recording
+
+    steps = [recording("A", {"a": 1}), recording("B", {"b": 1}), recording("C", {})]
+    flow(steps, {"B": [], "C": ["A"]}, tmp_path=tmp_path).run(State())
+    assert "a" not in seen["B"]
+    assert seen["C"]["a"] == 1 and "b" not in seen["C"]
+
+
+def test_selected_matches_case_insensitively():
+    steps = [
+        dummy(id, {})
+        for id in ["Yosys.Synthesis", "DFFRAM.PlaceRAM", "Checker.XOR", "OpenROAD.STA"]
+    ]
+    instance = flow(steps, {})
+    assert instance.selected("dffram.placeram", "CHECKER.XOR", None) == [
+        False,
+        True,
+        True,
+        False,
+    ]
+    assert instance.selected(None, None, ["checker.*"]) == [True, True, False, True]
+    with pytest.raises(FlowException, match="matched multiple steps"):
+        instance.selected("*.*", None, None)
+    with pytest.raises(FlowException, match="no step"):
+        instance.selected("Magic.DRC", None, None)
@@ -0,0 +1,14 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import pytest
+
+from equivalence import CASES, check
+
+
+@pytest.mark.parametrize(
+    "model,top,parameters",
+    CASES,
+    ids=[f"{top}-{'-'.join(map(str, p.values()))}" for _, top, p in CASES],
+)
+def test_generated_matches_yosys(tmp_path, liberty, model, top, parameters):
+    assert check(model, top, parameters, liberty, str(tmp_path)) == []
@@ -0,0 +1,75 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import random
+
+from placeram.occupancy import RowOccupancy
+
+
+def intervals_are_canonical(occupancy):
+    widths = [occupancy.width(i) for i in range(occupancy.count)]
+    expected_starts = [
+        i for i in range(occupancy.count) if i == 0 or widths[i] != widths[i - 1]
+    ]
+    return occupancy.starts == expected_starts and occupancy.widths == [
+        widths[i] for i in expected_starts
+    ]
+
+
+def test_queries_match_brute_force():
+    generator = random.Random(42)
+    sw = 5
+    count = 60
+    occupancy = RowOccupancy(
+        [sw * generator.randrange(4) for _ in range(count)], [0] * count, sw
+    )
+    for _ in range(2000):
+        index = generator.randrange(count)
+        if generator.random() < 0.7:
+            occupancy.advance(index, sw * generator.randrange(1, 3), False)
+        else:
+            # Moved without advance(), as Row.fill_rows does
+            occupancy.x[index] += sw
+            occupancy.mark_moved(index)
+
+        start = generator.randrange(count)
+        end = generator.randrange(start + 1, count + 1)
+        widths = [occupancy.x[i] // sw for i in range(count)]
+        assert occupancy.max(start, end) == max(widths[start:end])
+        threshold = generator.randrange(max(widths) + 2)
+        assert occupancy.below(start, end, threshold) == [
+            i for i in range(start, end) if widths[i] < threshold
+        ]
+        assert intervals_are_canonical(occupancy)
+
+
+def test_cursors():
+    occupancy = RowOccupancy([0, 0], [0, 7], 1)
+    occupancy.advance(1, 3, False)
+    occupancy.advance(1, 1, True)
+    assert occupancy.x == [0, 4]
+    assert occupancy.since_last_tap == [0, 0]
+    assert occupancy.cell_counter == [0, 2]
+    assert occupancy.pending == [1]
+    occupancy.refresh()
+    assert occupancy.pending == [] and occupancy.moved == [False, False]
+    assert (occupancy.starts, occupancy.widths) == ([0, 1], [0, 4])
+
+
+def test_padding_a_range_merges_its_intervals():
+    occupancy = RowOccupancy([1, 3, 2, 3, 1, 3], [0] * 6, 1)
+    assert len(occupancy.starts) == 6
+    widest = occupancy.max(1, 5)
+    for index in occupancy.below(1, 5, widest):
+        occupancy.x[index] = widest
+        occupancy.mark_moved(index)
+    assert occupancy.below(1, 5, widest) == []
+    assert (occupancy.starts, occupancy.widths) == ([0, 1], [1, 3])
+
+
+def test_row_arrays_keep_their_own_cursors(placement):
+    first = placement("8x32")
+    used = first.rows.used()
+    second = placement("32x32")
+    assert first.rows[0].occupancy is first.rows.occupancy
+    assert second.rows.occupancy is not first.rows.occupancy
+    assert first.rows.used() == used
@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import itertools
+
+import pytest
+
+from placeram.packing import FillPacker
+
+# Taps are told apart from fills by their size
+FILLS = [8, 4, 2]
+TAP = 1
+RUN_LIMIT = 10
+
+
+def runs(packing, since_last_tap):
+    """
+    The length of every run of fills in ``packing``, in sites.
+    """
+    result = [since_last_tap]
+    for sites in packing:
+        if sites == TAP:
+            result.append(0)
+        else:
+            result[-1] += sites
+    return result
+
+
+def valid(packing, gap, since_last_tap, end_limit):
+    lengths = runs(packing, since_last_tap)
+    return (
+        sum(packing) == gap and max(lengths) <= RUN_LIMIT and lengths[-1] <= end_limit
+    )
+
+
+def fewest(gap, since_last_tap, end_limit):
+    """
+    The fewest cells any valid packing of ``gap`` takes, by brute force.
+    """
+    for count in range(gap + 1):
+        for packing in itertools.product(FILLS + [TAP], repeat=count):
+            if valid(packing, gap, since_last_tap, end_limit):
+                return count
+
+
+@pytest.fixture
+def packer():
+    return FillPacker(FILLS, [TAP], RUN_LIMIT)
+
+
+@pytest.mark.parametrize("since_last_tap", [0, 3, 10])
+@pytest.mark.parametrize("end_limit", [2, 10])
+def test_packings_are_valid_and_optimal(packer, since_last_tap, end_limit):
+    assert packer.pack(0, since_last_tap, end_limit) == ()
+    for gap in range(1, 16):
+        packing = packer.pack(gap, since_last_tap, end_limit)
+        assert valid(packing, gap, since_last_tap, end_limit), (gap, packing)
+        assert len(packing) == fewest(gap, since_last_tap, end_limit), (gap, packing)
+
+
+def test_packings_are_memoized(packer):
+    first = packer.pack(40, 3)
+    assert packer.pack(40, 3) is first
+    assert FillPacker.get(FILLS, [TAP], RUN_LIMIT) is FillPacker.get(
+        list(reversed(FILLS)), [TAP], RUN_LIMIT
+    )
+
+
+def test_no_worse_than_greedy(packer):
+    for gap in range(2, 60):
+        greedy = packer.greedy(gap, TAP)
+        assert sum(greedy) == gap
+        assert len(packer.pack(gap, 0)) <= len(greedy)
+
+
+def cells_by_row(placed):
+    """
+    The x, width and whether it is a tap of every cell of every row, by y,
+    sorted by x.
+    """
+    plan, masters = placed.plan, placed.masters
+    site_width = placed.design.site.getWidth()
+    rows = {}
+    for i, ordinal in enumerate(plan.instance):
+        master = masters.of(plan.instances[ordinal])
+        rows.setdefault(plan.y[i], []).append((plan.x[i], master.width, master.is_tap))
+    # Whatever their kind, fills of the tap's size are created as taps
+    fills = placed.design.fill_cells_by_sites
+    for i, sites in enumerate(plan.fill_sites):
+        rows.setdefault(plan.fill_y[i], []).append(
+            (plan.fill_x[i], sites * site_width, masters[fills[sites].getName()].is_tap)
+        )
+    return {y: sorted(cells) for y, cells in rows.items()}
+
+
+def greedy(monkeypatch):
+    from placeram.row import Row
+
+    monkeypatch.setattr(
+        Row, "pack", staticmethod(lambda gap, _: Row.packer.greedy(gap, Row.tap_width))
+    )
+
+
+SIZES = ["8x32", "32x32", "128x32", "256x32", "512x32"]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_placed_rows_are_tapped_and_packed(placement, size):
+    placed = placement(size)
+    rows = placed.rows
+    origins = {rows[i].y: rows[i].xmin for i in range(len(rows))}
+    tap_distance = placed.design.tap_distance
+    for y, cells in cells_by_row(placed).items():
+        row = sorted(origins).index(y)
+        # Odd rows start as if they were a full tap distance from a tap
+        run = 0 if row % 2 == 0 else tap_distance
+        x = origins[y]
+        for cell_x, width, is_tap in cells:
+            assert cell_x == x, f"Gap or overlap in row {row} at {x}"
+            x += width
+            if is_tap:
+                run = 0
+            else:
+                run += width
+                assert run <= tap_distance, f"Untapped run in row {row} at {x}"
+
+
+@pytest.mark.parametrize("size", SIZES + ["32x32:rf"])
+def test_no_more_cells_than_greedy(placement, monkeypatch, size):
+    size, _, blocks = size.partition(":")
+    building_blocks = f"sky130A:sky130_fd_sc_hd:{blocks or 'ram'}"
+    packed = placement(size, building_blocks=building_blocks)
+    greedy(monkeypatch)
+    greedy_packed = placement(size, building_blocks=building_blocks)
+    assert len(packed.plan.fill_kind) <= len(greedy_packed.plan.fill_kind)
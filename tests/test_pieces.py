@@ -0,0 +1,112 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import os
+import subprocess
+
+import pytest
+
+from conftest import ROOT
+from librelane_plugin_dffram.pieces import (
+    Model,
+    elaboration_script,
+    piece_name,
+)
+from placeram.netlist import compare
+
+DEFINES = ["PDK_sky130A", "SCL_sky130_fd_sc_hd", "__librelane__", "__pnr__"]
+
+
+def sources(model="ram"):
+    return [
+        os.path.join(
+            ROOT, "platforms", "sky130A", "sky130_fd_sc_hd", "block_definitions.v"
+        ),
+        os.path.join(ROOT, "models", model, "model.v"),
+    ]
+
+
+def yosys(script, path):
+    with open(path, "w") as f:
+        f.write("\n".join(script) + "\n")
+    subprocess.check_call(["yosys", "-q", "-s", path])
+
+
+def test_pieces_of_every_variant():
+    texts = [open(source, encoding="utf8").read() for source in sources()]
+    model = Model(texts, {"WSIZE": "4", "USE_LATCH": "1"})
+    assert [piece[0] for piece in model.order("RAM2048")] == [
+        "RAM8",
+        "RAM16",
+        "RAM32",
+        "RAM128",
+        "RAM512",
+    ]
+    assert "RAM32_1RW1R" in [piece[0] for piece in model.order("RAM128_1RW1R")]
+    rewritten = model.rewrite(texts[1])
+    assert "RAM512__USE_LATCH_1__WSIZE_4" in rewritten
+
+
+def test_register_file_has_no_pieces():
+    texts = [open(source, encoding="utf8").read() for source in sources("rf")]
+    model = Model(texts, {"WSIZE": "32"})
+    assert model.pieces_of("DFFRF_2R1W") == []
+
+
+# 32x32, 512x32 and 1RW1R 32x32, as dffram.py elaborates them
+@pytest.mark.parametrize(
+    "top,wsize",
+    [
+        ("RAM32", "4"),
+        ("RAM512", "4"),
+        ("RAM32_1RW1R", "4"),
+        ("RAM128", "1"),
+        ("RAM128_1RW1R", "1"),
+    ],
+)
+def test_composed_matches_full_synthesis(tmp_path, liberty, top, wsize):
+    parameters = {"WSIZE": wsize, "USE_LATCH": "1"}
+    originals = sources()
+    texts = [open(source, encoding="utf8").read() for source in originals]
+
+    full = str(tmp_path / "full.nl.v")
+    yosys(
+        elaboration_script(top, parameters, originals, [liberty], full, DEFINES),
+        str(tmp_path / "full.ys"),
+    )
+
+    # As DFFRAM.Synthesis does it: every piece over the pieces below it,
+    # then the top over the rewritten sources and its own pieces
+    model = Model(texts, parameters)
+    rewritten = []
+    for i, text in enumerate(texts):
+        rewritten.append(str(tmp_path / f"{i}.v"))
+        with open(rewritten[-1], "w", encoding="utf8") as f:
+            f.write(model.rewrite(text))
+    netlists = {}
+    for piece in model.order(top):
+        name = piece_name(piece)
+        netlists[piece] = str(tmp_path / f"{name}.nl.v")
+        children = [netlists[child] for child in model.pieces_of(piece[0])]
+        script = elaboration_script(
+            piece[0],
+            dict(piece[1]),
+            rewritten + children,
+            [liberty],
+            netlists[piece],
+            DEFINES,
+            piece=name,
+        )
+        yosys(script, str(tmp_path / f"{name}.ys"))
+    composed = str(tmp_path / "composed.nl.v")
+    pieces = [netlists[piece] for piece in model.pieces_of(top)]
+    yosys(
+        elaboration_script(
+            top, parameters, rewritten + pieces, [liberty], composed, DEFINES
+        ),
+        str(tmp_path / "composed.ys"),
+    )
+
+    differences = compare(
+        open(full, encoding="utf8").read(), open(composed, encoding="utf8").read()
+    )
+    assert differences == []
@@ -0,0 +1,76 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import io
+
+import pytest
+
+from placeram.plan import PlacementPlan, PlanError
+
+
+def saved(plan: PlacementPlan) -> bytes:
+    f = io.BytesIO()
+    plan.save(f)
+    return f.getvalue()
+
+
+def test_round_trip(placement):
+    placed = placement("32x32")
+    plan = placed.plan
+    plan.width, plan.height = placed.rows.widest(), 1234
+
+    loaded = PlacementPlan.load(io.BytesIO(saved(plan)))
+    assert loaded.names == plan.names
+    assert loaded.arrays() == plan.arrays()
+    assert (loaded.width, loaded.height) == (plan.width, 1234)
+    assert [loaded.fill_name(i) for i in range(10)] == [
+        plan.fill_name(i) for i in range(10)
+    ]
+
+    # Bound back to the same instances by name
+    by_name = {instance.getName(): instance for instance in placed.instances}
+    loaded.resolve(by_name.get)
+    assert loaded.instances == placed.instances
+
+
+def test_load_rejects_broken_plans(placement):
+    data = saved(placement("32x32").plan)
+    with pytest.raises(PlanError, match="Not a placement plan"):
+        PlacementPlan.load(io.BytesIO(b"NOTAPLAN" + data[8:]))
+    header = PlacementPlan.HEADER.size
+    # Anywhere: in the header, its name table's length, names or arrays
+    for end in [4, header, header + 4, header + 8, header + 20, len(data) - 1]:
+        with pytest.raises(PlanError, match="Truncated"):
+            PlacementPlan.load(io.BytesIO(data[:end]))
+
+    loaded = PlacementPlan.load(io.BytesIO(data))
+    with pytest.raises(PlanError, match="not found"):
+        loaded.resolve(lambda name: None)
+
+
+def test_translate_round_trip(placement):
+    plan = placement("32x32").plan
+    before = saved(plan)
+    plan.translate(100, -200)
+    assert plan.x[0] == PlacementPlan.load(io.BytesIO(before)).x[0] + 100
+    plan.translate(-100, 200)
+    assert saved(plan) == before
+
+
+def test_load_rejects_out_of_range_entries(placement):
+    plan = placement("8x32").plan
+    plan.instance[0] = len(plan.names)
+    with pytest.raises(PlanError, match="Unknown instance"):
+        PlacementPlan.load(io.BytesIO(saved(plan)))
+
+    plan.instance[0] = 0
+    plan.fill_kind[0] = len(PlacementPlan.FILL_NAMES)
+    with pytest.raises(PlanError, match="Unknown fill kind"):
+        PlacementPlan.load(io.BytesIO(saved(plan)))
+
+
+def test_check_fills(placement):
+    placed = placement("8x32")
+    plan = placed.plan
+    plan.check_fills(placed.design.fill_cells_by_sites)
+    with pytest.raises(PlanError, match="No fill or tap cell of 1 sites"):
+        plan.check_fills([size for size in set(plan.fill_sites) if size != 1])
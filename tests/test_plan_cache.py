@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import io
+
+from placeram.plan import PlacementPlan
+from placeram.plan_cache import PlanCache, fingerprint
+
+
+def saved(plan: PlacementPlan) -> bytes:
+    f = io.BytesIO()
+    plan.save(f)
+    return f.getvalue()
+
+
+def test_cache_is_relative_to_the_first_row(tmp_path, placement):
+    plan = placement("32x32").plan
+    cache = PlanCache(str(tmp_path))
+    assert cache.load("key", 0, 0) is None
+
+    before = saved(plan)
+    cache.store("key", plan, {"metric": 1}, 1000, 2000)
+    assert saved(plan) == before
+
+    loaded, metrics = cache.load("key", 1000, 2000)
+    assert metrics == {"metric": 1}
+    assert saved(loaded) == before
+    moved, _ = cache.load("key", 0, 0)
+    assert moved.x[0] == plan.x[0] - 1000
+    assert moved.y[0] == plan.y[0] - 2000
+
+
+def test_cache_ignores_broken_entries(tmp_path, placement):
+    cache = PlanCache(str(tmp_path))
+    cache.store("key", placement("32x32").plan, {}, 0, 0)
+    plan_path, _ = cache.paths("key")
+    with open(plan_path, "r+b") as f:
+        f.truncate(100)
+    assert cache.load("key", 0, 0) is None
+
+
+def test_fingerprint_invalidation(tmp_path):
+    tech = tmp_path / "tech.yml"
+    blocks = tmp_path / "config.yml"
+    tech.write_text("tap_distance: 14\n")
+    blocks.write_text("widths: [32]\n")
+    instances = [("A", "sky130_fd_sc_hd__inv_1"), ("B", "sky130_fd_sc_hd__buf_1")]
+    masters = [("sky130_fd_sc_hd__inv_1", 460, 2720)]
+    rows = [(0, 0, "R0", 1000), (0, 2720, "MX", 1000)]
+    settings = {"minimum_height": 0}
+
+    def key(**kwargs):
+        arguments = {
+            "instances": instances,
+            "masters": masters,
+            "rows": rows,
+            "tech_file": str(tech),
+            "blocks_file": str(blocks),
+            "settings": settings,
+        }
+        arguments.update(kwargs)
+        return fingerprint(**arguments)
+
+    original = key()
+    # Only the set of instances matters
+    assert key(instances=list(reversed(instances))) == original
+
+    assert key(instances=instances[:1]) != original
+    assert key(instances=[("A", "sky130_fd_sc_hd__inv_2"), instances[1]]) != original
+    assert key(masters=[("sky130_fd_sc_hd__inv_1", 920, 2720)]) != original
+    assert key(rows=rows[:1]) != original
+    assert key(settings={"minimum_height": 100}) != original
+
+    tech.write_text("tap_distance: 15\n")
+    assert key() != original
+    tech.write_text("tap_distance: 14\n")
+    assert key() == original
+    blocks.write_text("widths: [64]\n")
+    assert key() != original
+
+
+def test_fingerprint_follows_the_placer(tmp_path, monkeypatch):
+    import placeram.plan_cache as plan_cache
+
+    tech = tmp_path / "tech.yml"
+    tech.write_text("")
+    arguments = ([], [], [], str(tech), str(tech), {})
+    original = fingerprint(*arguments)
+    monkeypatch.setattr(plan_cache, "placer_digest", lambda: "edited")
+    assert fingerprint(*arguments) != original
+
+
+def test_placer_digest_covers_its_data(tmp_path, monkeypatch):
+    import shutil
+    import placeram.plan_cache as plan_cache
+
+    placer = tmp_path / "placeram"
+    shutil.copytree(
+        plan_cache.__dir__, placer, ignore=shutil.ignore_patterns("__pycache__")
+    )
+    monkeypatch.setattr(plan_cache, "__dir__", str(placer))
+    original = plan_cache.placer_digest()
+    (placer / "__pycache__").mkdir()
+    (placer / "__pycache__" / "row.cpython.pyc").write_bytes(b"\0")
+    assert plan_cache.placer_digest() == original
+    rx = placer / "rx.yml"
+    rx.write_text(rx.read_text() + "\n# edited\n")
+    assert plan_cache.placer_digest() != original
@@ -0,0 +1,58 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import types
+
+import placeram.bench  # noqa: F401 -- imports the Placeable classes to time
+from placeram import mock_odb
+from placeram.row import Row
+from placeram.profiling import Profiler
+
+
+def test_profile_placement(placement):
+    place, get_name = Row.__dict__["place"], mock_odb.dbInst.__dict__["getName"]
+    profiler = Profiler(enabled=True)
+    profiler.instrument(mock_odb)
+    try:
+        placement("32x32")
+    finally:
+        profiler.restore()
+    assert Row.__dict__["place"] is place
+    assert mock_odb.dbInst.__dict__["getName"] is get_name
+
+    metrics = profiler.metrics()
+    assert metrics["dffram__placer__row_place_calls"] > 0
+    assert metrics["dffram__placer__swig_calls"] > 0
+    assert profiler.swig_calls["dbInst_create"] > 0
+    assert profiler.swig_calls["dbInst.getMaster"] > 0
+    assert any(
+        name.startswith("dffram__placer__time__init__class:") for name in metrics
+    )
+
+
+def test_profile_swig_module():
+    class dbThing(object):
+        @staticmethod
+        def create():
+            return dbThing()
+
+        def getName(self):
+            return "thing"
+
+    # Types of a SWIG -builtin extension cannot be patched, as int cannot
+    module = types.ModuleType("odb")
+    dbThing.__module__ = "odb"
+    module.dbThing = dbThing
+    immutable = types.ModuleType("builtins")
+    immutable.int = int
+
+    profiler = Profiler(enabled=True)
+    profiler.instrument_odb(module)
+    profiler.instrument_odb(immutable)
+    try:
+        assert module.dbThing.create().getName() == "thing"
+    finally:
+        profiler.restore()
+    assert profiler.swig_calls == {"dbThing.create": 1, "dbThing.getName": 1}
+    assert isinstance(dbThing.__dict__["create"], staticmethod)
+    assert dbThing.create().getName() == "thing"
+    assert profiler.swig_calls["dbThing.create"] == 1
@@ -0,0 +1,61 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+import re
+
+import pytest
+
+from placeram import mock_odb, utilization
+from placeram.plan import PlacementPlan
+from placeram.row import Row
+from placeram.masters import MasterTable
+from placeram.utilization import row_metrics
+
+
+def test_row_metrics(placement, monkeypatch):
+    placed = placement("32x32")
+    design, plan, rows = placed.design, placed.plan, placed.rows
+    # As the Placer does once the design is placed
+    plan.width = rows.widest()
+    plan.height = rows.ymax[placed.last_row - 1] - rows[0].y
+    site_height = design.site.getHeight()
+    row_count = plan.height // site_height
+
+    # Power pins on every cell, which the PDN connects to, and two signal
+    # pins on all but the taps
+    tap = design.fill_cell_data["tap"]
+    for name, master in design.masters.items():
+        master.mterms = [
+            mock_odb.dbMTerm("VPWR", "POWER"),
+            mock_odb.dbMTerm("VGND", "GROUND"),
+        ]
+        if re.match(tap, name) is None:
+            master.mterms += [mock_odb.dbMTerm("A"), mock_odb.dbMTerm("X")]
+    masters = MasterTable(
+        design.masters.values(), design.site.getWidth(), design.fill_cell_data
+    )
+    masters.index_instances(placed.instances)
+    assert all(master.pins in [0, 2] for master in masters.by_name.values())
+
+    # One band over every row
+    monkeypatch.setattr(utilization, "PIN_DENSITY_BAND_ROWS", row_count)
+    metrics = row_metrics(plan, masters, Row.fill_masters, site_height, 1000)
+
+    low = metrics["dffram__placer__row_utilization__min"]
+    mean = metrics["dffram__placer__row_utilization__mean"]
+    high = metrics["dffram__placer__row_utilization__max"]
+    assert 0 <= low <= mean <= high <= 1
+    histogram = [
+        value
+        for name, value in metrics.items()
+        if name.startswith("dffram__placer__row_utilization__histogram__bin:")
+    ]
+    assert len(histogram) == utilization.HISTOGRAM_BINS
+    assert sum(histogram) == row_count
+
+    taps = plan.fill_kind.count(PlacementPlan.TAP)
+    assert taps > 0
+    assert metrics["dffram__placer__row_taps__mean"] * row_count == taps
+
+    pins = 2 * len(plan.instance)
+    area = plan.width * plan.height / 1000**2
+    assert metrics["dffram__placer__pin_density__max"] == pytest.approx(pins / area)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright ©2020-2025, The American University in Cairo
+"""
+Checks that the netlists written by placeram.netlist are structurally
+equivalent to the ones Yosys elaborates from the same models, for the small
+sizes of every building block set.
+"""
+
+import os
+import sys
+import glob
+import subprocess
+import tempfile
+
+import click
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+__plugin_dir__ = os.path.join(__dir__, "..", "librelane_plugin_dffram")
+sys.path.insert(0, os.path.join(__plugin_dir__, "scripts", "odbpy"))
+sys.path.insert(0, __plugin_dir__)
+
+from pieces import elaboration_script  # noqa: E402
+from placeram.netlist import compare, generate  # noqa: E402
+
+# (model, top module, parameters)
+CASES = [
+    ("ram", "RAM8", {"WSIZE": 1, "USE_LATCH": 1}),
+    ("ram", "RAM8", {"WSIZE": 4, "USE_LATCH": 0}),
+    ("ram", "RAM32", {"WSIZE": 4, "USE_LATCH": 1}),
+    ("ram", "RAM32_1RW1R", {"WSIZE": 4, "USE_LATCH": 1}),
+    ("ram", "RAM128", {"WSIZE": 1, "USE_LATCH": 1}),
+    ("ram", "RAM512", {"WSIZE": 4, "USE_LATCH": 1}),
+    ("rf", "DFFRF_2R1W", {"WSIZE": 32}),
+]
+
+
+def yosys_netlist(top, parameters, sources, lib, defines, output):
+    """
+    Elaborates ``top`` the way the flow's synthesis does with
+    ``SYNTH_ELABORATE_ONLY`` and ``SYNTH_ELABORATE_FLATTEN``.
+    """
+    script = elaboration_script(top, parameters, sources, [lib], output, defines)
+    subprocess.check_call(["yosys", "-q", "-p", "; ".join(script)])
+
+
+def check(model, top, parameters, lib, tmp, pdk="sky130A", scl="sky130_fd_sc_hd"):
+    """
+    Returns the differences between the netlist Yosys elaborates for ``top``
+    and the one placeram.netlist generates, if any.
+    """
+    root = os.path.join(__dir__, "..")
+    definitions = os.path.join(root, "platforms", pdk, scl, "block_definitions.v")
+    sources = [definitions, os.path.join(root, "models", model, "model.v")]
+    defines = [f"PDK_{pdk}", f"SCL_{scl}", "__librelane__", "__pnr__"]
+    reference = os.path.join(tmp, f"{top}.yosys.nl.v")
+    yosys_netlist(top, parameters, sources, lib, defines, reference)
+    texts = [open(source, encoding="utf8").read() for source in sources]
+    generated = os.path.join(tmp, f"{top}.nl.v")
+    with open(generated, "w", encoding="utf8") as f:
+        generate(texts, top, parameters, defines).write_verilog(f)
+    return compare(
+        open(reference, encoding="utf8").read(),
+        open(generated, encoding="utf8").read(),
+    )
+
+
+@click.command()
+@click.option("--pdk", default="sky130A")
+@click.option("--scl", default="sky130_fd_sc_hd")
+@click.option(
+    "--pdk-root",
+    default=os.getenv("PDK_ROOT") or os.path.join(__dir__, "..", "pdks"),
+)
+def main(pdk, scl, pdk_root):
+    libs = glob.glob(os.path.join(pdk_root, pdk, "libs.ref", scl, "lib", "*tt*.lib"))
+    if len(libs) == 0:
+        print(f"No typical corner liberty file found for {pdk}/{scl}.")
+        sys.exit(-1)
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for model, top, parameters in CASES:
+            differences = check(model, top, parameters, libs[0], tmp, pdk, scl)
+            label = f"{top} {parameters}"
+            print(f"{label}: {'equivalent' if len(differences) == 0 else 'MISMATCH'}")
+            for difference in differences:
+                print(f"    {difference}")
+            failed += len(differences) != 0
+    sys.exit(failed)
+
+
+if __name__ == "__main__":
+    main()